@@ -1,11 +1,12 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin, GroupAdmin as BaseGroupAdmin
 from django.contrib.auth.models import User, Group
 
 from unfold.admin import ModelAdmin
 from unfold.forms import AdminPasswordChangeForm, UserChangeForm, UserCreationForm
 
-from school.models import Student, Course, Enrollment
+from school.models import Student, Course, Enrollment, Job
+from school.validators import validate_cpf_batch
 
 
 admin.site.unregister(User)
@@ -18,6 +19,16 @@ class Students(ModelAdmin):
     search_fields = ('name', 'cpf', 'rg', 'mobile')
     list_per_page = 25
     ordering = ('id', 'name', 'birthday')
+    actions = ('validate_cpfs',)
+
+    @admin.action(description='Validate CPF of selected students')
+    def validate_cpfs(self, request, queryset):
+        students = list(queryset.values_list('id', 'cpf'))
+        invalid = [f'{student_id} ({cpf})' for (student_id, cpf), is_valid in zip(students, validate_cpf_batch([cpf for _, cpf in students])) if not is_valid]
+        if invalid:
+            self.message_user(request, f"{len(invalid)} of {len(students)} students have an invalid CPF: {', '.join(invalid[:20])}", messages.WARNING)
+        else:
+            self.message_user(request, f'All {len(students)} CPFs are valid', messages.SUCCESS)
 
 
 class Courses(ModelAdmin):
@@ -34,6 +45,14 @@ class Enrollments(ModelAdmin):
     ordering = ('id', 'period')
 
 
+class Jobs(ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'attempts', 'max_attempts', 'created_by', 'created_at', 'finished_at')
+    list_display_links = ('id', 'kind')
+    list_filter = ('status', 'kind')
+    ordering = ('-id',)
+    readonly_fields = ('started_at', 'finished_at', 'worker')
+
+
 @admin.register(User)
 class UserAdmin(BaseUserAdmin, ModelAdmin):
     # Forms loaded from `unfold.forms`
@@ -50,3 +69,4 @@ class GroupAdmin(BaseGroupAdmin, ModelAdmin):
 admin.site.register(Student, Students)
 admin.site.register(Course, Courses)
 admin.site.register(Enrollment, Enrollments)
+admin.site.register(Job, Jobs)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class SchoolConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'school'
+
+    def ready(self):
+        from school import checks, imports, signals  # noqa: F401
@@ -0,0 +1,124 @@
+from typing import Any, Dict, List, Optional, Type
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import close_old_connections
+from django.db.models import QuerySet
+from django.http import Http404, HttpRequest, HttpResponse
+from django.views import View
+from rest_framework.generics import GenericAPIView
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from school.fast_serializers import FastSerializer
+from school.views import CourseViewSet, EnrollmentViewSet, ListCoursesEnrollments, ListEnrollmentsStudents, StudentViewSet
+
+
+def initial(view: GenericAPIView, request: Request, *args: Any, **kwargs: Any) -> None:
+    """DRF checks (content negotiation, version, authentication, permissions and throttles) of view, in a worker thread."""
+    try:
+        view.initial(request, *args, **kwargs)
+    finally:
+        # worker threads are not request threads: close their connection as Django does at the end of a request
+        close_old_connections()
+
+
+class AsyncReadView(View):
+    """
+    Async (ASGI) twin of the read paths of a DRF view: list, and retrieve when detail is True.
+
+    view_class gives authentication, permissions, throttles, queryset, filters, pagination and serializer, so
+    both paths answer the same. What differs is the I/O:
+    - DRF checks run in one worker thread, not bound to the event loop thread (password hashing of basic auth and
+      permission queries block, and many requests must hash in parallel)
+    - rows and counts are fetched with the async ORM (async for, acount, aget)
+
+    Not served here: response cache, conditional GET (ETag, 304) and exports (?export=), all stay on the sync routes.
+    """
+    view_class: Type[GenericAPIView] = None
+    detail: bool = False
+    http_method_names: List[str] = ['get', 'head', 'options']
+
+    def build_view(self, request: HttpRequest, *args: Any, **kwargs: Any) -> GenericAPIView:
+        view: GenericAPIView = self.view_class()
+        view.action_map = {'get': 'retrieve' if self.detail else 'list'}
+        view.args = args
+        view.kwargs = kwargs
+        view.format_kwarg = None
+        view.headers = view.default_response_headers
+        view.request = view.initialize_request(request, *args, **kwargs)
+
+        return view
+
+    async def get(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        view: GenericAPIView = self.build_view(request, *args, **kwargs)
+        try:
+            await sync_to_async(initial, thread_sensitive=False)(view, view.request, *args, **kwargs)
+            response: Response = await (self.retrieve(view) if self.detail else self.list(view))
+        except Exception as exc:
+            response = view.handle_exception(exc)
+
+        response = view.finalize_response(view.request, response, *args, **kwargs)
+
+        return response.render()
+
+    async def list(self, view: GenericAPIView) -> Response:
+        queryset: QuerySet = view.filter_queryset(view.get_queryset())
+        fast: Optional[FastSerializer] = view.get_fast_serializer() if hasattr(view, 'get_fast_serializer') else None
+        fieldset: Optional[List[str]] = None
+        if fast is not None:
+            fieldset = view.get_fast_fieldset()
+            queryset = fast.values(queryset, fieldset)
+
+        paginator: Any = view.paginator
+        rows: Optional[List[Any]] = None
+        if paginator is not None:
+            if hasattr(paginator, 'apaginate_queryset'):
+                rows = await paginator.apaginate_queryset(queryset, view.request, view=view)
+            else:
+                rows = await sync_to_async(paginator.paginate_queryset)(queryset, view.request, view=view)
+
+        paginated: bool = rows is not None
+        if not paginated:
+            rows = [row async for row in queryset]
+
+        data: List[Any] = fast.serialize(rows, view.request, fieldset) if fast is not None else view.get_serializer(rows, many=True).data
+
+        return paginator.get_paginated_response(data) if paginated else Response(data)
+
+    async def retrieve(self, view: GenericAPIView) -> Response:
+        queryset: QuerySet = view.filter_queryset(view.get_queryset())
+        lookup: Dict[str, Any] = {view.lookup_field: view.kwargs[view.lookup_url_kwarg or view.lookup_field]}
+        try:
+            instance: Any = await queryset.aget(**lookup)
+        except (ObjectDoesNotExist, ValueError, TypeError):
+            raise Http404(f'No {queryset.model._meta.object_name} matches the given query.')
+
+        view.check_object_permissions(view.request, instance)
+
+        return Response(view.get_serializer(instance).data)
+
+
+class AsyncStudentView(AsyncReadView):
+    """Async list and detail of students. Same parameters (version, search, ordering, pagination) as StudentViewSet."""
+    view_class = StudentViewSet
+
+
+class AsyncCourseView(AsyncReadView):
+    """Async list and detail of courses."""
+    view_class = CourseViewSet
+
+
+class AsyncEnrollmentView(AsyncReadView):
+    """Async list and detail of enrollments."""
+    view_class = EnrollmentViewSet
+
+
+class AsyncListEnrollmentsStudents(AsyncReadView):
+    """Async enrollments of a student."""
+    view_class = ListEnrollmentsStudents
+
+
+class AsyncListCoursesEnrollments(AsyncReadView):
+    """Async enrollments of a course."""
+    view_class = ListCoursesEnrollments
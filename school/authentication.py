@@ -0,0 +1,80 @@
+import hashlib
+import hmac
+from typing import Any, Optional, Tuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from rest_framework.authentication import BasicAuthentication, TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+AUTH_CACHE_ALIAS: str = 'default'
+
+
+def token_cache_key(key: str) -> str:
+    # tokens are credentials: only their digest is written in the cache
+    return f"school:auth:token:{hashlib.sha256(key.encode()).hexdigest()}"
+
+
+def basic_cache_key(userid: str, password: str) -> str:
+    digest: str = hmac.new(settings.SECRET_KEY.encode(), f'{userid}:{password}'.encode(), hashlib.sha256).hexdigest()
+
+    return f'school:auth:basic:{digest}'
+
+
+def credential_fingerprint(user: Any) -> str:
+    """Digest of the username and password hash: a new password (or username) does not match cached credentials."""
+    return hashlib.sha256(f'{user.get_username()}:{user.password}'.encode()).hexdigest()
+
+
+def invalidate_user_tokens(user_id: Any) -> None:
+    keys = Token.objects.filter(user_id=user_id).values_list('key', flat=True)
+    caches[AUTH_CACHE_ALIAS].delete_many([token_cache_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    'Authorization: Token <key>' (keys from POST school/auth/token/ or manage.py drf_create_token), with the token
+    and its user cached for TOKEN_CACHE_TIMEOUT seconds: no query per request. Invalidated by school.signals when the
+    token is deleted or its user saved.
+    """
+
+    def authenticate_credentials(self, key: str) -> Tuple[Any, Token]:
+        cache = caches[AUTH_CACHE_ALIAS]
+        cache_key: str = token_cache_key(key)
+        token: Optional[Token] = cache.get(cache_key)
+        if token is None:
+            user, token = super().authenticate_credentials(key)
+            cache.set(cache_key, token, timeout=settings.TOKEN_CACHE_TIMEOUT)
+
+        return token.user, token
+
+
+class CachedBasicAuthentication(BasicAuthentication):
+    """
+    BasicAuthentication with verified credentials cached for BASIC_AUTH_CACHE_TIMEOUT seconds (0 disables it), so the
+    password is hashed (PBKDF2) once per TTL instead of on every request. A hit costs one query by primary key.
+
+    The cache key is an HMAC (SECRET_KEY) of username and password, and the entry holds the user id and a fingerprint
+    of username and password hash: a changed password, username or an inactive user miss at once. Failures are never
+    cached.
+    """
+
+    def authenticate_credentials(self, userid: str, password: str, request: Any = None) -> Tuple[Any, None]:
+        timeout: int = settings.BASIC_AUTH_CACHE_TIMEOUT
+        if not timeout:
+            return super().authenticate_credentials(userid, password, request)
+
+        cache = caches[AUTH_CACHE_ALIAS]
+        cache_key: str = basic_cache_key(userid, password)
+        entry: Optional[Tuple[Any, str]] = cache.get(cache_key)
+        if entry is not None:
+            user: Any = get_user_model()._default_manager.filter(pk=entry[0]).first()
+            if user is not None and user.is_active and hmac.compare_digest(credential_fingerprint(user), entry[1]):
+                return user, None
+
+        user, auth = super().authenticate_credentials(userid, password, request)
+        cache.set(cache_key, (user.pk, credential_fingerprint(user)), timeout=timeout)
+
+        return user, auth
@@ -0,0 +1,61 @@
+import datetime
+import json
+import math
+import subprocess
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+
+
+def percentile(values: List[float], rank: float) -> float:
+    """Nearest rank percentile (rank between 0 and 100) of values."""
+    if not values:
+        return 0.0
+
+    ordered: List[float] = sorted(values)
+    index: int = max(0, math.ceil(rank / 100 * len(ordered)) - 1)
+
+    return ordered[index]
+
+
+def summarize(timings: List[float], elapsed: float, queries: Optional[List[int]] = None, statuses: Optional[Dict[int, int]] = None) -> Dict[str, Any]:
+    """Latency (ms) percentiles, throughput and queries per request of one benchmarked route or function."""
+    summary: Dict[str, Any] = {
+        'requests': len(timings),
+        'p50_ms': round(percentile(timings, 50) * 1000, 3),
+        'p95_ms': round(percentile(timings, 95) * 1000, 3),
+        'p99_ms': round(percentile(timings, 99) * 1000, 3),
+        'mean_ms': round(sum(timings) / len(timings) * 1000, 3) if timings else 0.0,
+        'requests_per_second': round(len(timings) / elapsed, 2) if elapsed else 0.0,
+    }
+    if queries is not None:
+        summary['queries_per_request'] = round(sum(queries) / len(queries), 2) if queries else 0.0
+    if statuses is not None:
+        summary['statuses'] = {str(code): total for code, total in sorted(statuses.items())}
+
+    return summary
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def write_results(filename: str, kind: str, parameters: Dict[str, Any], results: Dict[str, Any]) -> None:
+    """Save results as JSON, with enough metadata to diff runs between releases."""
+    with open(filename, 'w') as f:
+        json.dump({
+            'kind': kind,
+            'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'parameters': parameters,
+            'results': results,
+        }, f, indent=4)
+
+
+def print_results(results: Dict[str, Dict[str, Any]], write: Any) -> None:
+    write(f"{'name':<40} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9} {'queries':>8}")
+    for name, summary in results.items():
+        write(f"{name:<40} {summary['requests']:>6} {summary['p50_ms']:>9} {summary['p95_ms']:>9} {summary['p99_ms']:>9} {summary['requests_per_second']:>9} {summary.get('queries_per_request', '-'):>8}")
@@ -0,0 +1,159 @@
+import datetime
+import hashlib
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Type
+
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import Model
+from django.http import HttpResponseBase
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.status import HTTP_200_OK, HTTP_304_NOT_MODIFIED
+
+
+API_CACHE_ALIAS: str = 'api'
+
+
+def model_version_key(model: Type[Model]) -> str:
+    return f'school:version:{model._meta.label_lower}'
+
+
+def model_modified_key(model: Type[Model]) -> str:
+    return f'school:modified:{model._meta.label_lower}'
+
+
+def get_model_changes(models: Sequence[Type[Model]]) -> Tuple[List[int], float]:
+    """
+    Current version of each model and time (epoch seconds) of the last change of any of them, read in one round trip.
+
+    A missing version (never written or evicted) starts from the current time in ms, so it never goes back to a value already used in a cache key.
+    A missing change time starts from now, so it is never older than the last change.
+    """
+    cache = caches[API_CACHE_ALIAS]
+    version_keys: List[str] = [model_version_key(model) for model in models]
+    modified_keys: List[str] = [model_modified_key(model) for model in models]
+    values: Dict[str, Any] = cache.get_many(version_keys + modified_keys)
+    for key in version_keys:
+        if key not in values:
+            cache.add(key, time.time_ns() // 1000000, timeout=None)
+            values[key] = cache.get(key)
+    for key in modified_keys:
+        if key not in values:
+            cache.add(key, time.time(), timeout=None)
+            values[key] = cache.get(key)
+
+    return [values[key] for key in version_keys], max((values[key] for key in modified_keys), default=0.0)
+
+
+def get_model_versions(models: Sequence[Type[Model]]) -> List[int]:
+    """Current version of each model (see get_model_changes)."""
+    return get_model_changes(models)[0]
+
+
+def bump_model_version(model: Type[Model]) -> None:
+    cache = caches[API_CACHE_ALIAS]
+    try:
+        cache.incr(model_version_key(model))
+    except ValueError:
+        get_model_versions([model])
+        cache.incr(model_version_key(model))
+    cache.set(model_modified_key(model), time.time(), timeout=None)
+
+
+def invalidate_model(model: Type[Model]) -> None:
+    """Bump the version now and again after commit, so a read between the write and the commit can not keep stale data cached."""
+    bump_model_version(model)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: bump_model_version(model))
+
+
+class CachedResponseMixin:
+    """
+    Cache list and retrieve responses (GET/HEAD only) until data of any model in cache_models changes.
+
+    Cache key uses: path, query string, API version, authenticated user and the current version of cache_models.
+    Versions are bumped by save/delete signals (see school.signals), so there is no stale window after a write.
+    """
+    cache_models: Sequence[Type[Model]] = ()
+
+    def response_cache_key(self, request: Request) -> str:
+        user: str = str(request.user.pk) if request.user and request.user.is_authenticated else 'anon'
+        query: str = '&'.join(f'{key}={value}' for key, value in sorted(request.query_params.lists()))
+        versions: str = '.'.join(str(version) for version in get_model_versions(self.cache_models))
+        digest: str = hashlib.sha1(f'{request.path}?{query}'.encode()).hexdigest()
+
+        return f'school:response:{request.version}:{user}:{versions}:{digest}'
+
+    def cached_response(self, handler: Callable[..., Response], request: Request, *args: Any, **kwargs: Any) -> Response:
+        cache = caches[API_CACHE_ALIAS]
+        key: str = self.response_cache_key(request)
+        data: Any = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response: Response = handler(request, *args, **kwargs)
+        if response.status_code == HTTP_200_OK:
+            cache.set(key, response.data)
+
+        return response
+
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+
+class ConditionalGetMixin:
+    """
+    Conditional GET on list and retrieve: ETag and Last-Modified are computed without reading rows or serializing, so
+    a request with a matching If-None-Match (or If-Modified-Since) is answered 304 Not Modified with no body.
+
+    - list: versions of cache_models and the time of their last change (both bumped by save/delete signals)
+    - retrieve: updated_at of the object, one column read by primary key
+
+    ETags also depend on path, query string, API version, media type and authenticated user, as the body does.
+    """
+    cache_models: Sequence[Type[Model]] = ()
+
+    def conditional_etag(self, request: Request, stamp: str) -> str:
+        user: str = str(request.user.pk) if request.user and request.user.is_authenticated else 'anon'
+        query: str = '&'.join(f'{key}={value}' for key, value in sorted(request.query_params.lists()))
+        renderer: str = request.accepted_renderer.format if getattr(request, 'accepted_renderer', None) else ''
+
+        return quote_etag(hashlib.sha1(f'{request.path}?{query}:{request.version}:{renderer}:{user}:{stamp}'.encode()).hexdigest())
+
+    def conditional_response(self, handler: Callable[..., Response], etag: str, last_modified: float, request: Request, *args: Any, **kwargs: Any) -> HttpResponseBase:
+        response: Optional[HttpResponseBase] = get_conditional_response(request._request, etag=etag, last_modified=int(last_modified))
+        if response is None:
+            response = handler(request, *args, **kwargs)
+
+        if response.status_code in (HTTP_200_OK, HTTP_304_NOT_MODIFIED):
+            response.headers.setdefault('ETag', etag)
+            response.headers.setdefault('Last-Modified', http_date(last_modified))
+
+        return response
+
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> HttpResponseBase:
+        versions, modified = get_model_changes(self.cache_models)
+        etag: str = self.conditional_etag(request, '.'.join(str(version) for version in versions))
+
+        return self.conditional_response(super().list, etag, modified, request, *args, **kwargs)
+
+    def retrieve(self, request: Request, *args: Any, **kwargs: Any) -> HttpResponseBase:
+        lookup: Dict[str, Any] = {self.lookup_field: self.kwargs[self.lookup_url_kwarg or self.lookup_field]}
+        try:
+            updated_at: Optional[datetime.datetime] = self.filter_queryset(self.get_queryset()).filter(**lookup).values_list('updated_at', flat=True).first()
+        except (ValueError, TypeError, ValidationError):
+            updated_at = None
+        if updated_at is None:
+            # not found or invalid lookup: the handler answers
+            return super().retrieve(request, *args, **kwargs)
+
+        etag: str = self.conditional_etag(request, updated_at.isoformat())
+
+        return self.conditional_response(super().retrieve, etag, updated_at.timestamp(), request, *args, **kwargs)
@@ -0,0 +1,40 @@
+from typing import Any, List
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.checks import Error, Tags, register
+from django.core.exceptions import ImproperlyConfigured
+
+
+CHECK_KEY: str = 'school:check:cache'
+
+
+def cache_backend_errors() -> List[Error]:
+    """Write and read back a key in every configured cache alias."""
+    errors: List[Error] = []
+    for alias, conf in settings.CACHES.items():
+        try:
+            cache = caches[alias]
+            cache.set(CHECK_KEY, alias, timeout=5)
+            reachable: bool = cache.get(CHECK_KEY) == alias
+            reason: str = 'value written was not read back'
+        except Exception as e:
+            reachable = False
+            reason = str(e)
+
+        if not reachable:
+            errors.append(Error(f"Cache '{alias}' ({conf['BACKEND']} at {conf.get('LOCATION', '')}) is not reachable: {reason}", hint='Check CACHE_BACKEND and REDIS_URL in .env', id='school.E001'))
+
+    return errors
+
+
+@register(Tags.caches)
+def check_cache_backends(app_configs: Any, **kwargs: Any) -> List[Error]:
+    return cache_backend_errors()
+
+
+def ensure_cache_backends() -> None:
+    """Fail the server startup (wsgi/asgi) when any cache alias is not reachable."""
+    errors: List[Error] = cache_backend_errors()
+    if errors:
+        raise ImproperlyConfigured('\n'.join(error.msg for error in errors))
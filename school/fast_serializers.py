@@ -0,0 +1,125 @@
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Type
+
+from django.db.models import QuerySet
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.serializers import Serializer
+
+from school.instrumentation import add_serializer_time
+from school.models import Enrollment, Student
+from school.photos import variant_urls
+from school.serializer import (
+    CourseSerializer, EnrollmentSerializer, ListCoursesEnrollmentsSerializer, ListEnrollmentsStudentsSerializer,
+    StudentSerializer, StudentSerializerV2, StudentSerializerV3, StudentSerializerV4,
+)
+
+# converter of a not None value, with the request (for absolute urls)
+Converter = Callable[[Any, Optional[Request]], Any]
+# (output name, values() path, converter or None when the value is output as is)
+FastField = Tuple[str, str, Optional[Converter]]
+
+
+def iso_date(value: Any, request: Optional[Request]) -> Any:
+    """As DRF DateField with the default ISO 8601 format."""
+    return value.isoformat()
+
+
+def photo_url(value: Any, request: Optional[Request]) -> Any:
+    """As DRF ImageField: absolute url of the file, None without file."""
+    if not value:
+        return None
+
+    url: str = Student._meta.get_field('photo').storage.url(value)
+
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+PERIOD_LABELS: Dict[str, str] = {name: str(label) for name, label in Enrollment._meta.get_field('period').flatchoices}
+
+
+def period_display(value: Any, request: Optional[Request]) -> Any:
+    """As Enrollment.get_period_display()."""
+    return PERIOD_LABELS.get(value, value)
+
+
+class FastSerializer:
+    """
+    Read only serialization of values() rows through a precompiled field map, skipping DRF field introspection and
+    per-field to_representation. Output must be the same as the serializer it replaces (see test_fast_serializers).
+    """
+
+    def __init__(self, fields: Sequence[FastField]) -> None:
+        self.fields: Tuple[FastField, ...] = tuple(fields)
+
+    def select(self, fieldset: Optional[List[str]] = None) -> Tuple[FastField, ...]:
+        if fieldset is None:
+            return self.fields
+
+        return tuple(field for field in self.fields if field[0] in fieldset)
+
+    def values(self, queryset: QuerySet, fieldset: Optional[List[str]] = None) -> QuerySet:
+        """values() of the fields, plus the ordering fields (read by keyset pagination)."""
+        paths: List[str] = [path for _, path, _ in self.select(fieldset)]
+        for field in queryset.query.order_by:
+            if isinstance(field, str) and field.lstrip('-') not in paths:
+                paths.append(field.lstrip('-'))
+
+        return queryset.values(*paths)
+
+    def serialize(self, rows: Iterable[Dict[str, Any]], request: Optional[Request] = None, fieldset: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        begin: float = perf_counter()
+        fields: Tuple[FastField, ...] = self.select(fieldset)
+        if not any(converter for _, _, converter in fields):
+            data: List[Dict[str, Any]] = [{name: row[path] for name, path, _ in fields} for row in rows]
+        else:
+            data = []
+            for row in rows:
+                item: Dict[str, Any] = {}
+                for name, path, converter in fields:
+                    value: Any = row[path]
+                    item[name] = converter(value, request) if converter is not None and value is not None else value
+                data.append(item)
+        add_serializer_time(begin)
+
+        return data
+
+
+STUDENT_FIELDS: Tuple[FastField, ...] = (('id', 'id', None), ('name', 'name', None), ('rg', 'rg', None), ('cpf', 'cpf', None), ('birthday', 'birthday', iso_date))
+
+FAST_SERIALIZERS: Dict[Type[Serializer], FastSerializer] = {
+    StudentSerializer: FastSerializer(STUDENT_FIELDS),
+    StudentSerializerV2: FastSerializer(STUDENT_FIELDS + (('mobile', 'mobile', None),)),
+    StudentSerializerV3: FastSerializer(STUDENT_FIELDS + (('mobile', 'mobile', None), ('photo', 'photo', photo_url), ('photo_variants', 'photo_variants', variant_urls))),
+    StudentSerializerV4: FastSerializer(STUDENT_FIELDS + (('mobile', 'mobile', None), ('photo', 'photo', photo_url), ('photo_variants', 'photo_variants', variant_urls), ('email', 'email', None))),
+    CourseSerializer: FastSerializer((('id', 'id', None), ('course_code', 'course_code', None), ('description', 'description', None), ('level', 'level', None))),
+    EnrollmentSerializer: FastSerializer((('id', 'id', None), ('period', 'period', None), ('student', 'student_id', None), ('course', 'course_id', None))),
+    ListEnrollmentsStudentsSerializer: FastSerializer((('course', 'course__description', None), ('period', 'period', period_display), ('student', 'student__name', None))),
+    ListCoursesEnrollmentsSerializer: FastSerializer((
+        ('course', 'course__description', None), ('student_id', 'student_id', None), ('student_name', 'student__name', None), ('student_cpf', 'student__cpf', None),
+        ('student_rg', 'student__rg', None), ('student_birthday', 'student__birthday', None), ('student_mobile', 'student__mobile', None), ('student_email', 'student__email', None),
+    )),
+}
+
+
+class FastListMixin:
+    """GET lists are read with values() and serialized by FAST_SERIALIZERS when the serializer class has a field map."""
+
+    def get_fast_serializer(self) -> Optional[FastSerializer]:
+        return FAST_SERIALIZERS.get(self.get_serializer_class())
+
+    def get_fast_fieldset(self) -> Optional[List[str]]:
+        return self.get_fieldset() if hasattr(self, 'get_fieldset') else None
+
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        fast: Optional[FastSerializer] = self.get_fast_serializer()
+        if fast is None:
+            return super().list(request, *args, **kwargs)
+
+        fieldset: Optional[List[str]] = self.get_fast_fieldset()
+        queryset: QuerySet = fast.values(self.filter_queryset(self.get_queryset()), fieldset)
+        page: Optional[List[Dict[str, Any]]] = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(fast.serialize(page, request, fieldset))
+
+        return Response(fast.serialize(queryset, request, fieldset))
@@ -0,0 +1,161 @@
+import gzip
+import json
+import os
+import sys
+from typing import Any, Callable, Dict, IO, Iterable, Iterator, List, Optional, Tuple
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.serializers.python import Serializer as PythonSerializer
+from django.db.models import Model
+
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+FORMATS: Dict[str, str] = {'.ndjson': 'ndjson', '.jsonl': 'ndjson', '.json': 'json'}
+COMPRESSIONS: List[str] = ['.gz', '.zst']
+# characters read at a time from JSON arrays
+READ_SIZE: int = 1 << 16
+
+# called with the number of objects read or written so far
+Progress = Callable[[int], None]
+
+
+def split_path(path: str) -> Tuple[str, str]:
+    """(format, compression) of a fixture path, e.g. students.ndjson.gz -> ('ndjson', '.gz')."""
+    base, compression = os.path.splitext(path)
+    if compression not in COMPRESSIONS:
+        base, compression = path, ''
+
+    return FORMATS.get(os.path.splitext(base)[1], ''), compression
+
+
+def open_fixture(path: str, mode: str) -> IO[str]:
+    """Text stream of a fixture file (mode 'r' or 'w'), (de)compressed by its suffix: .gz or .zst. '-' is stdin/stdout."""
+    if path == '-':
+        return sys.stdin if mode == 'r' else sys.stdout
+
+    _, compression = split_path(path)
+    if compression == '.gz':
+        return gzip.open(path, f'{mode}t', encoding='utf-8')
+    if compression == '.zst':
+        if zstandard is None:
+            raise ValueError('zstandard is not installed: pip install zstandard, or use .gz')
+        return zstandard.open(path, f'{mode}t', encoding='utf-8')
+
+    return open(path, mode, encoding='utf-8')
+
+
+def iter_ndjson(stream: IO[str]) -> Iterator[Dict[str, Any]]:
+    for number, line in enumerate(stream, start=1):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                raise ValueError(f'Line {number}: {e}') from e
+
+
+def iter_json_array(stream: IO[str], read_size: int = READ_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Objects of a JSON array (the dumpdata and save_fixtures format) decoded one at a time: memory holds one object
+    and one read, whatever the size of the file.
+    """
+    decoder = json.JSONDecoder()
+    buffer: str = ''
+    position: int = 0
+    started: bool = False
+    eof: bool = False
+    while True:
+        # skip whitespace and separators
+        while position < len(buffer) and buffer[position] in ' \t\r\n,[]':
+            if buffer[position] == '[':
+                started = True
+            elif buffer[position] == ']':
+                return
+            position += 1
+
+        if position < len(buffer):
+            if not started:
+                raise ValueError('A JSON fixture must be an array of objects')
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except ValueError:
+                # object cut by the read (or invalid, when there is nothing left to read)
+                if eof:
+                    raise
+            else:
+                yield item
+                continue
+
+        if eof:
+            if started:
+                raise ValueError('JSON array is not closed')
+            return
+        chunk: str = stream.read(read_size)
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+def iter_fixture_objects(stream: IO[str], fixture_format: str) -> Iterator[Dict[str, Any]]:
+    """Serialized objects ({'model', 'pk', 'fields'}) of an NDJSON or JSON array fixture."""
+    return iter_ndjson(stream) if fixture_format == 'ndjson' else iter_json_array(stream)
+
+
+def serialize_objects(objects: Iterable[Model], batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+    """Django serialization of objects, in batches: pk also in fields, as save_fixtures always wrote it."""
+    serializer = PythonSerializer()
+    batch: List[Model] = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            yield from serialize_batch(serializer, batch)
+            batch = []
+    yield from serialize_batch(serializer, batch)
+
+
+def serialize_batch(serializer: PythonSerializer, batch: List[Model]) -> List[Dict[str, Any]]:
+    items: List[Dict[str, Any]] = serializer.serialize(batch) if batch else []
+    for item in items:
+        item['fields']['id'] = item['pk']
+
+    return items
+
+
+class FixtureWriter:
+    """
+    Writes objects as NDJSON (one compact object per line) or as one JSON array, indented as the files of
+    school/fixtures, as they come (pass queryset.iterator()): write() can be called once per model, finish() ends the
+    array.
+    """
+
+    def __init__(self, stream: IO[str], fixture_format: str) -> None:
+        self.stream = stream
+        self.fixture_format: str = fixture_format
+        self.total: int = 0
+        if fixture_format == 'json':
+            stream.write('[')
+
+    def write(self, objects: Iterable[Model], progress: Optional[Progress] = None, progress_every: int = 10000) -> int:
+        """Returns how many objects were written by this call; progress is called with that count."""
+        count: int = 0
+        for item in serialize_objects(objects):
+            if self.fixture_format == 'json':
+                indented: str = json.dumps(item, cls=DjangoJSONEncoder, indent=4).replace('\n', '\n    ')
+                self.stream.write(f"{',' if self.total else ''}\n    {indented}")
+            else:
+                self.stream.write(json.dumps(item, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':')))
+                self.stream.write('\n')
+            self.total += 1
+            count += 1
+            if progress is not None and count % progress_every == 0:
+                progress(count)
+
+        return count
+
+    def finish(self) -> None:
+        if self.fixture_format == 'json':
+            self.stream.write('\n]' if self.total else ']')
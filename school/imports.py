@@ -0,0 +1,112 @@
+import csv
+import io
+import uuid
+from typing import Any, Dict, Iterator, List, Tuple, Type
+
+from django.core.files.base import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from rest_framework.serializers import ListSerializer, ValidationError
+
+from school.jobs import JobFailed, enqueue, job_handler, save_progress
+from school.models import Enrollment, Job, Student
+from school.serializer import BulkEnrollmentSerializer, BulkStudentSerializer
+
+
+IMPORT_JOB: str = 'import_csv'
+# imports/<model>/: (model, bulk serializer, required columns, optional columns)
+IMPORTS: Dict[str, Tuple[Type[Any], Type[ListSerializer], List[str], List[str]]] = {
+    'students': (Student, BulkStudentSerializer, ['name', 'rg', 'cpf', 'birthday'], ['mobile', 'email']),
+    'enrollments': (Enrollment, BulkEnrollmentSerializer, ['student', 'course', 'period'], []),
+}
+IMPORT_DIR: str = 'imports'
+# rows validated together and inserted in one transaction, with the job progress
+IMPORT_BATCH_SIZE: int = 1000
+# rows with errors listed in the result (all of them are counted)
+MAX_REPORTED_ERRORS: int = 100
+
+# (line of the CSV file, row)
+Line = Tuple[int, Dict[str, Any]]
+
+
+def enqueue_import(name: str, upload: File, user: Any = None) -> Job:
+    """Stores an uploaded CSV file and queues its import: the request returns without reading it."""
+    path: str = default_storage.save(f'{IMPORT_DIR}/{name}-{uuid.uuid4().hex}.csv', upload)
+
+    return enqueue(IMPORT_JOB, {'model': name, 'path': path, 'filename': getattr(upload, 'name', '')}, user=user)
+
+
+def iter_batches(reader: csv.DictReader, columns: List[str], skip: int) -> Iterator[List[Line]]:
+    batch: List[Line] = []
+    for index, row in enumerate(reader):
+        if index < skip:
+            continue
+        # empty cells are missing values: defaults apply (mobile, email)
+        batch.append((reader.line_num, {column: row[column].strip() for column in columns if row.get(column) not in (None, '')}))
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_batch(serializer_class: Type[ListSerializer], batch: List[Line]) -> Tuple[int, List[Dict[str, Any]]]:
+    """(rows created, errors): valid rows of a batch are created, invalid ones reported with their line."""
+    errors: List[Dict[str, Any]] = []
+    serializer: ListSerializer = serializer_class(data=[row for _, row in batch])
+    if not serializer.is_valid():
+        row_errors: Any = serializer.errors
+        if not isinstance(row_errors, list):
+            raise JobFailed(f'Invalid batch: {row_errors}')
+        errors = [{'line': line, 'errors': error} for (line, _), error in zip(batch, row_errors) if error]
+        batch = [line for line, error in zip(batch, row_errors) if not error]
+        if not batch:
+            return 0, errors
+
+        # rows rejected only for a duplicate of an invalid one are valid by themselves
+        serializer = serializer_class(data=[row for _, row in batch])
+        if not serializer.is_valid():
+            raise ValidationError(serializer.errors)
+
+    return len(serializer.save()), errors
+
+
+@job_handler(IMPORT_JOB)
+def import_csv(job: Job) -> Dict[str, Any]:
+    """
+    Imports a CSV file (header row with the columns of IMPORTS) in batches of IMPORT_BATCH_SIZE rows. Each batch is
+    committed with the progress of the job, so a retried import resumes after the last committed batch.
+    """
+    name: str = job.payload.get('model', '')
+    if name not in IMPORTS:
+        raise JobFailed(f"Unknown import '{name}'. Available: {', '.join(IMPORTS)}")
+    _, serializer_class, required, optional = IMPORTS[name]
+
+    progress: Dict[str, Any] = job.result or {'rows': 0, 'created': 0, 'invalid': 0, 'errors': []}
+    try:
+        f = default_storage.open(job.payload['path'], 'rb')
+    except FileNotFoundError as e:
+        raise JobFailed(f'File of the import not found: {e}')
+
+    with f, io.TextIOWrapper(f, encoding='utf-8-sig', newline='') as text:
+        try:
+            reader = csv.DictReader(text)
+            missing: List[str] = [column for column in required if column not in (reader.fieldnames or [])]
+            if missing:
+                raise JobFailed(f"Missing columns: {', '.join(missing)}. Expected: {', '.join(required + optional)}")
+
+            for batch in iter_batches(reader, required + optional, skip=progress['rows']):
+                with transaction.atomic():
+                    created, errors = import_batch(serializer_class, batch)
+                    progress['rows'] += len(batch)
+                    progress['created'] += created
+                    progress['invalid'] += len(errors)
+                    progress['errors'] = (progress['errors'] + errors)[:MAX_REPORTED_ERRORS]
+                    # raises JobLost (the batch is rolled back) when the job was requeued as stale
+                    save_progress(job, progress)
+        except (csv.Error, UnicodeDecodeError) as e:
+            raise JobFailed(f"Invalid CSV file ({progress['rows']} rows imported): {e}")
+
+    default_storage.delete(job.payload['path'])
+
+    return progress
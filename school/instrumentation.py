@@ -0,0 +1,296 @@
+import logging
+import threading
+from bisect import bisect_left
+from collections import Counter
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpRequest, HttpResponse
+
+
+logger = logging.getLogger(__name__)
+
+# API versions reported as they are: anything else is 'default', so clients can not create new series at will
+VERSION_LABELS: Tuple[str, ...] = ('v1', 'v2', 'v3', 'v4')
+METRICS_CACHE_ALIAS: str = 'metrics'
+# upper bounds (seconds) of the request duration histogram
+DURATION_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class RequestMetrics:
+    """Measures of the request being handled: queries are added by record_query, serializer time by the serializers."""
+
+    def __init__(self) -> None:
+        self.started: float = perf_counter()
+        self.total: float = 0.0
+        self.db_time: float = 0.0
+        self.serializer_time: float = 0.0
+        self.serializing: bool = False
+        self.queries: List[Tuple[str, Any, float]] = []
+        self.statements: Counter = Counter()
+
+    def add_query(self, sql: str, params: Any, duration: float) -> None:
+        self.db_time += duration
+        self.queries.append((sql, params, duration))
+        self.statements[(sql, repr(params))] += 1
+
+    @property
+    def duplicates(self) -> int:
+        """Queries repeating an earlier one of the request (same SQL and parameters): N+1 candidates."""
+        return len(self.queries) - len(self.statements)
+
+    def stop(self) -> None:
+        self.total = perf_counter() - self.started
+
+
+current_metrics: ContextVar[Optional[RequestMetrics]] = ContextVar('school_request_metrics', default=None)
+
+
+def record_query(execute: Callable, sql: str, params: Any, many: bool, context: Dict[str, Any]) -> Any:
+    """Execute wrapper of every connection (installed by school.signals): times queries run inside a measured request."""
+    metrics: Optional[RequestMetrics] = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+
+    begin: float = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query(sql, params, perf_counter() - begin)
+
+
+class TimedSerializerMixin:
+    """Adds the time of to_representation to the request metrics. Nested serializers (and list items) count once."""
+
+    def to_representation(self, instance: Any) -> Any:
+        metrics: Optional[RequestMetrics] = current_metrics.get()
+        if metrics is None or metrics.serializing:
+            return super().to_representation(instance)
+
+        metrics.serializing = True
+        begin: float = perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            metrics.serializing = False
+            metrics.serializer_time += perf_counter() - begin
+
+
+def add_serializer_time(begin: float) -> None:
+    """Serializer time of code not going through to_representation (FastSerializer), begun at perf_counter() begin."""
+    metrics: Optional[RequestMetrics] = current_metrics.get()
+    if metrics is not None and not metrics.serializing:
+        metrics.serializer_time += perf_counter() - begin
+
+
+class MetricsRegistry:
+    """
+    Totals per (view, API version) read by the Prometheus endpoint, in the metrics cache alias: shared by the
+    processes of a server (uvicorn or gunicorn workers), whichever one answers the scrape, and kept when one restarts.
+
+    On Redis (django_redis) each series is a hash incremented in one round trip per request (HINCRBY, HINCRBYFLOAT)
+    and the series are a set. Other caches (locmem in tests and development) keep a dict per series with get/set,
+    consistent within a process only.
+    """
+    fields: Tuple[str, ...] = ('requests', 'slow', 'seconds', 'db_seconds', 'queries', 'duplicates', 'serializer_seconds')
+
+    def __init__(self, alias: str = METRICS_CACHE_ALIAS) -> None:
+        self.alias: str = alias
+        self.lock = threading.Lock()
+
+    @property
+    def cache(self) -> Any:
+        return caches[self.alias]
+
+    def redis_client(self) -> Any:
+        client: Any = getattr(self.cache, 'client', None)
+
+        return client.get_client(write=True) if hasattr(client, 'get_client') else None
+
+    def empty(self) -> Dict[str, Any]:
+        return {**dict.fromkeys(self.fields, 0), 'buckets': [0] * len(DURATION_BUCKETS)}
+
+    def observe(self, view: str, version: str, metrics: RequestMetrics, slow: bool) -> None:
+        deltas: Dict[str, Any] = {
+            'requests': 1, 'slow': int(slow), 'seconds': metrics.total, 'db_seconds': metrics.db_time, 'queries': len(metrics.queries),
+            'duplicates': metrics.duplicates, 'serializer_seconds': metrics.serializer_time,
+        }
+        bucket: int = bisect_left(DURATION_BUCKETS, metrics.total)
+        series: str = f'{view}|{version}'
+
+        redis: Any = self.redis_client()
+        if redis is not None:
+            key: str = self.cache.make_key(f'series:{series}')
+            pipeline: Any = redis.pipeline(transaction=False)
+            for field, value in deltas.items():
+                if isinstance(value, float):
+                    pipeline.hincrbyfloat(key, field, value)
+                elif value:
+                    pipeline.hincrby(key, field, value)
+            if bucket < len(DURATION_BUCKETS):
+                pipeline.hincrby(key, f'bucket:{bucket}', 1)
+            pipeline.sadd(self.cache.make_key('series'), series)
+            pipeline.execute()
+            return
+
+        with self.lock:
+            totals: Dict[str, Any] = self.cache.get(f'series:{series}') or self.empty()
+            for field, value in deltas.items():
+                totals[field] += value
+            if bucket < len(DURATION_BUCKETS):
+                totals['buckets'][bucket] += 1
+            names: List[str] = self.cache.get('series', [])
+            if series not in names:
+                self.cache.set('series', sorted([*names, series]), timeout=None)
+            self.cache.set(f'series:{series}', totals, timeout=None)
+
+    def clear(self) -> None:
+        """Every series, of every process (the alias holds nothing else)."""
+        self.cache.clear()
+
+    def snapshot(self) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        redis: Any = self.redis_client()
+        if redis is None:
+            names: List[str] = self.cache.get('series', [])
+            stored: Dict[str, Dict[str, Any]] = self.cache.get_many([f'series:{series}' for series in names])
+            return {tuple(series.split('|', 1)): stored.get(f'series:{series}', self.empty()) for series in names}
+
+        names = sorted(name.decode() for name in redis.smembers(self.cache.make_key('series')))
+        pipeline: Any = redis.pipeline(transaction=False)
+        for series in names:
+            pipeline.hgetall(self.cache.make_key(f'series:{series}'))
+        snapshot: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for series, hash_fields in zip(names, pipeline.execute()):
+            values: Dict[str, str] = {field.decode(): value.decode() for field, value in hash_fields.items()}
+            totals: Dict[str, Any] = self.empty()
+            for field in self.fields:
+                totals[field] = float(values.get(field, 0)) if field.endswith('seconds') else int(values.get(field, 0))
+            totals['buckets'] = [int(values.get(f'bucket:{index}', 0)) for index in range(len(DURATION_BUCKETS))]
+            snapshot[tuple(series.split('|', 1))] = totals
+
+        return snapshot
+
+    def exposition(self) -> str:
+        """Prometheus text format 0.0.4."""
+        series: Dict[Tuple[str, str], Dict[str, Any]] = self.snapshot()
+        lines: List[str] = []
+
+        def family(name: str, kind: str, help_text: str, key: str) -> None:
+            lines.extend([f'# HELP {name} {help_text}', f'# TYPE {name} {kind}'])
+            for (view, version), totals in sorted(series.items()):
+                lines.append(f'{name}{{view="{view}",version="{version}"}} {totals[key]}')
+
+        family('school_requests_total', 'counter', 'Requests handled.', 'requests')
+        family('school_slow_requests_total', 'counter', 'Requests above SLOW_REQUEST_MS.', 'slow')
+        family('school_db_seconds_total', 'counter', 'Time spent in database queries.', 'db_seconds')
+        family('school_db_queries_total', 'counter', 'Database queries.', 'queries')
+        family('school_db_duplicate_queries_total', 'counter', 'Queries repeating an earlier query of the same request.', 'duplicates')
+        family('school_serializer_seconds_total', 'counter', 'Time spent serializing responses.', 'serializer_seconds')
+
+        name: str = 'school_request_duration_seconds'
+        lines.extend([f'# HELP {name} Wall time of requests.', f'# TYPE {name} histogram'])
+        for (view, version), totals in sorted(series.items()):
+            labels: str = f'view="{view}",version="{version}"'
+            cumulative: int = 0
+            for bound, count in zip(DURATION_BUCKETS, totals['buckets']):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {totals["requests"]}')
+            lines.append(f'{name}_sum{{{labels}}} {totals["seconds"]}')
+            lines.append(f'{name}_count{{{labels}}} {totals["requests"]}')
+
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+
+def view_label(request: HttpRequest) -> str:
+    match: Any = getattr(request, 'resolver_match', None)
+
+    return match.view_name if match is not None and match.view_name else 'unresolved'
+
+
+def version_label(request: HttpRequest) -> str:
+    version: str = str(request.GET.get('version', '')).lower()
+
+    return version if version in VERSION_LABELS else 'default'
+
+
+def server_timing(metrics: RequestMetrics) -> str:
+    return (
+        f'total;dur={metrics.total * 1000:.3f}, '
+        f'db;dur={metrics.db_time * 1000:.3f};desc="{len(metrics.queries)} queries ({metrics.duplicates} duplicates)", '
+        f'serializer;dur={metrics.serializer_time * 1000:.3f}'
+    )
+
+
+def log_slow_request(request: HttpRequest, response: HttpResponse, metrics: RequestMetrics) -> None:
+    statements: str = '\n'.join(f'  {duration * 1000:.3f} ms: {sql} {params!r}' for sql, params, duration in metrics.queries)
+    logger.warning(
+        'Slow request %s %s (%s): %.1f ms, db %.1f ms in %d queries (%d duplicates), serializer %.1f ms\n%s',
+        request.method, request.get_full_path(), response.status_code, metrics.total * 1000, metrics.db_time * 1000,
+        len(metrics.queries), metrics.duplicates, metrics.serializer_time * 1000, statements,
+    )
+
+
+class InstrumentationMiddleware:
+    """
+    Measures every request: wall time, database time, queries and duplicated queries, serializer time. Sent back in
+    a Server-Timing header (SERVER_TIMING setting), added to REGISTRY per view and API version (shared by every
+    process, served by school.views.MetricsView) and logged with their SQL to 'school.instrumentation' above SLOW_REQUEST_MS.
+
+    Sync and async: metrics live in a context variable, copied to the threads running sync code of async views.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+        self.is_async: bool = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> Any:
+        if self.is_async:
+            return self.__acall__(request)
+
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            response: HttpResponse = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            response: HttpResponse = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+
+        return self.finish(request, response, metrics)
+
+    def finish(self, request: HttpRequest, response: HttpResponse, metrics: RequestMetrics) -> HttpResponse:
+        # streamed responses (exports) are measured until their first byte
+        metrics.stop()
+        slow: bool = metrics.total * 1000 >= settings.SLOW_REQUEST_MS
+        try:
+            REGISTRY.observe(view_label(request), version_label(request), metrics, slow)
+        except Exception:
+            # metrics must not fail the request (cache server down)
+            logger.exception('Metrics of %s %s not stored', request.method, request.path)
+        if slow:
+            log_slow_request(request, response, metrics)
+        if settings.SERVER_TIMING:
+            response['Server-Timing'] = server_timing(metrics)
+
+        return response
+
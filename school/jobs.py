@@ -0,0 +1,183 @@
+import datetime
+import logging
+import os
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.db.models import F, QuerySet
+from django.utils import timezone
+
+from school.models import Job
+
+
+logger = logging.getLogger(__name__)
+
+# kind: function of the job, returning its result (JSON). Registered with @job_handler(kind)
+Handler = Callable[[Job], Any]
+JOB_HANDLERS: Dict[str, Handler] = {}
+# ready jobs a worker tries to claim at a time: others may claim the first ones
+CLAIM_CANDIDATES: int = 10
+
+
+class JobFailed(Exception):
+    """Raised by handlers for errors a retry would not fix (bad input): the job fails without more attempts."""
+
+
+class JobLost(Exception):
+    """The job is no longer RUNNING by this worker (requeued as stale, maybe claimed by another): nothing is written to it."""
+
+
+def job_handler(kind: str) -> Callable[[Handler], Handler]:
+    def register(handler: Handler) -> Handler:
+        JOB_HANDLERS[kind] = handler
+        return handler
+
+    return register
+
+
+def worker_name() -> str:
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'[:64]
+
+
+def enqueue(kind: str, payload: Dict[str, Any], user: Any = None, max_attempts: Optional[int] = None) -> Job:
+    """New pending job, claimed by the next idle worker (run_jobs)."""
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind '{kind}'. Available: {', '.join(sorted(JOB_HANDLERS))}")
+
+    return Job.objects.create(
+        kind=kind, payload=payload, created_by=user if user is not None and user.is_authenticated else None,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+
+
+def claim_job(worker: str) -> Optional[Job]:
+    """
+    Oldest ready job, set RUNNING by this worker. The UPDATE only matches a job still PENDING, so when workers race
+    for one, a single one gets it (no lock held, SQLite included).
+    """
+    now: datetime.datetime = timezone.now()
+    ready: List[int] = list(Job.objects.filter(status=Job.Status.PENDING.name, run_after__lte=now).order_by('id').values_list('id', flat=True)[:CLAIM_CANDIDATES])
+    for pk in ready:
+        claimed: int = Job.objects.filter(pk=pk, status=Job.Status.PENDING.name).update(
+            status=Job.Status.RUNNING.name, attempts=F('attempts') + 1, worker=worker, started_at=now, finished_at=None,
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+
+    return None
+
+
+def retry_delay(attempts: int) -> float:
+    """Seconds before the next attempt: settings.JOB_RETRY_DELAY doubled after each failed one."""
+    return settings.JOB_RETRY_DELAY * 2 ** max(attempts - 1, 0)
+
+
+def owned_job(job: Job) -> QuerySet:
+    """The job, as long as the worker that claimed it still runs it: updates of a lost job match no row."""
+    return Job.objects.filter(pk=job.pk, worker=job.worker, status=Job.Status.RUNNING.name)
+
+
+def save_progress(job: Job, result: Any) -> None:
+    """
+    Partial result of a running job (handlers resuming after it when retried). started_at is refreshed too: a job
+    making progress is not stale, however long it runs. Raises JobLost, rolling back the caller's transaction.
+    """
+    if not owned_job(job).update(result=result, started_at=timezone.now()):
+        raise JobLost(f'Job {job.pk} is no longer run by {job.worker}')
+    job.result = result
+
+
+def finish_job(job: Job, status: str, result: Any = None, error: str = '') -> None:
+    job.status = status
+    job.error = error
+    job.finished_at = timezone.now()
+    fields: List[str] = ['status', 'error', 'finished_at']
+    if status == Job.Status.SUCCEEDED.name:
+        job.result = result
+        fields.append('result')
+    if not owned_job(job).update(**{field: getattr(job, field) for field in fields}):
+        logger.warning('Job %s (%s) is no longer run by %s: %s not stored', job.pk, job.kind, job.worker, status)
+
+
+def retry_job(job: Job, error: str) -> None:
+    job.status = Job.Status.PENDING.name
+    job.error = error
+    job.run_after = timezone.now() + datetime.timedelta(seconds=retry_delay(job.attempts))
+    if not owned_job(job).update(status=job.status, error=error, run_after=job.run_after):
+        logger.warning('Job %s (%s) is no longer run by %s: retry not stored', job.pk, job.kind, job.worker)
+
+
+def run_job(job: Job) -> None:
+    """Runs a claimed job: SUCCEEDED with its result, PENDING again (later) on errors while attempts are left, FAILED."""
+    handler: Optional[Handler] = JOB_HANDLERS.get(job.kind)
+    if handler is None:
+        finish_job(job, Job.Status.FAILED.name, error=f"Unknown job kind '{job.kind}'")
+        return
+
+    try:
+        result: Any = handler(job)
+    except JobLost as e:
+        logger.warning('Job %s (%s) stopped: %s', job.pk, job.kind, e)
+    except JobFailed as e:
+        finish_job(job, Job.Status.FAILED.name, error=str(e))
+    except Exception as e:
+        error: str = f'{type(e).__name__}: {e}'
+        if job.attempts < job.max_attempts:
+            logger.warning('Job %s (%s) attempt %s of %s failed, retried in %.0fs: %s', job.pk, job.kind, job.attempts, job.max_attempts, retry_delay(job.attempts), error)
+            retry_job(job, error)
+        else:
+            logger.exception('Job %s (%s) failed after %s attempts', job.pk, job.kind, job.attempts)
+            finish_job(job, Job.Status.FAILED.name, error=error)
+    else:
+        finish_job(job, Job.Status.SUCCEEDED.name, result=result)
+
+
+def requeue_stale_jobs() -> int:
+    """
+    Jobs RUNNING without progress (see save_progress) for more than settings.JOB_TIMEOUT seconds (their worker died):
+    PENDING again, or FAILED without attempts left.
+    """
+    started_before: datetime.datetime = timezone.now() - datetime.timedelta(seconds=settings.JOB_TIMEOUT)
+    stale = Job.objects.filter(status=Job.Status.RUNNING.name, started_at__lt=started_before)
+    failed: int = stale.filter(attempts__gte=F('max_attempts')).update(status=Job.Status.FAILED.name, error='Timed out', finished_at=timezone.now())
+    requeued: int = stale.update(status=Job.Status.PENDING.name, error='Timed out')
+    if failed or requeued:
+        logger.warning('%s stale jobs requeued, %s failed', requeued, failed)
+
+    return requeued + failed
+
+
+def run_worker(poll_interval: Optional[float] = None, once: bool = False, stop: Optional[threading.Event] = None) -> int:
+    """
+    Claims and runs jobs one at a time until stop is set, or, with once, until no job is ready. Returns how many
+    jobs were run.
+    """
+    worker: str = worker_name()
+    poll_interval = settings.JOB_POLL_INTERVAL if poll_interval is None else poll_interval
+    done: int = 0
+    requeue_stale_jobs()
+    while stop is None or not stop.is_set():
+        # a worker lives longer than CONN_MAX_AGE: as between requests (not inside a transaction, as in tests)
+        if not connection.in_atomic_block:
+            close_old_connections()
+        job: Optional[Job] = claim_job(worker)
+        if job is None:
+            if once:
+                break
+            requeue_stale_jobs()
+            if stop is not None:
+                stop.wait(poll_interval)
+            else:
+                time.sleep(poll_interval)
+            continue
+
+        started: float = time.perf_counter()
+        run_job(job)
+        done += 1
+        logger.info('Job %s (%s) ran in %.2fs', job.pk, job.kind, time.perf_counter() - started)
+
+    return done
@@ -0,0 +1,262 @@
+import base64
+import datetime
+import json
+import os
+import random
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework.views import APIView
+
+from school.benchmarks import print_results, summarize, write_results
+from school.models import Course, Enrollment, Student
+
+# (name, method, url, body factory by request index)
+Route = Tuple[str, str, str, Optional[Callable[[int], Dict]]]
+
+
+def student_body(student: Student) -> Dict:
+    # names from Faker may have titles like "Sr." or "Dra.", refused by the name validation
+    name: str = ''.join(char for char in student.name if char.isalpha() or char.isspace()).strip()
+
+    return {'name': name, 'rg': student.rg, 'cpf': student.cpf, 'birthday': str(student.birthday), 'mobile': student.mobile, 'email': student.email}
+
+
+class Command(BaseCommand):
+    help = 'Benchmark latency (p50/p95/p99), requests/sec and queries per request of every school route, in-process (seeded test database) or against a running server (--server).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=2000, help='Students to seed (in-process only)')
+        parser.add_argument('--courses', type=int, default=5, help='Courses to seed (in-process only)')
+        parser.add_argument('--enrollments', type=int, default=100, help='Enrollments per course to seed (in-process only)')
+        parser.add_argument('--requests', type=int, default=100, help='Measured requests per route')
+        parser.add_argument('--warmup', type=int, default=5, help='Requests per route before measuring')
+        parser.add_argument('--cold', action='store_true', help='Clear the response cache before each request')
+        parser.add_argument('--server', help='Base url of a running server, e.g. http://localhost:8000. Only GET routes unless --writes.')
+        parser.add_argument('--auth', choices=['basic', 'token'], default='basic', help='Authentication against --server: basic, or a token obtained with username and password')
+        parser.add_argument('--writes', action='store_true', help='Also benchmark POST routes against --server')
+        parser.add_argument('--async', dest='async_routes', action='store_true', help='Benchmark the async (ASGI) twins of the GET routes')
+        parser.add_argument('--concurrency', type=int, default=1, help='Concurrent clients (only with --server)')
+        parser.add_argument('--username', default=os.getenv('API_USER', 'admin'))
+        parser.add_argument('--password', default=os.getenv('API_PASS', ''))
+        parser.add_argument('--seed', type=int, default=10, help='Random seed, for reproducible routes and data')
+        parser.add_argument('--output', default=f"benchmark-{datetime.datetime.now().strftime('%Y-%m-%dT%H-%M-%S')}.json", help='JSON file with the results')
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        if options['server']:
+            mode: str = 'server'
+            results: Dict[str, Dict[str, Any]] = self.run_server(options)
+        else:
+            mode = 'in-process'
+            results = self.run_in_process(options)
+
+        print_results(results, self.stdout.write)
+        parameters: Dict[str, Any] = {key: options[key] for key in ('students', 'courses', 'enrollments', 'requests', 'warmup', 'cold', 'server', 'auth', 'seed', 'async_routes', 'concurrency')}
+        parameters['mode'] = mode
+        write_results(options['output'], kind='api', parameters=parameters, results=results)
+        self.stdout.write(self.style.SUCCESS(f"Results saved at {options['output']}"))
+
+    def seed(self, options: Dict[str, Any]) -> Dict[str, Any]:
+        from seeds import build_courses, build_enrollments, build_students, bulk_persist_entities
+
+        if options['courses'] * options['enrollments'] > options['students']:
+            raise CommandError('Each student is enrolled in one course at most: --students must be at least --courses * --enrollments')
+
+        self.stdout.write(f"Seeding {options['students']} students, {options['courses']} courses and {options['enrollments']} enrollments per course")
+        students: List[Student] = bulk_persist_entities(build_students(total=options['students'], seed=options['seed']))
+        courses: List[Course] = bulk_persist_entities(build_courses(total=options['courses'], seed=options['seed']))
+        enrollments: List[Enrollment] = bulk_persist_entities(build_enrollments(total=options['enrollments'], courses=courses, students=students, seed=options['seed']))
+
+        enrolled = {enrollment.student_id for enrollment in enrollments}
+        return {
+            'students': students,
+            'courses': courses,
+            'enrollments': enrollments,
+            'not_enrolled': [student for student in students if student.id not in enrolled],
+        }
+
+    def routes(self, students: List[Dict], courses: List[Dict], enrollments: List[Dict], total_students: int, writes: Optional[Dict[str, Callable[[int], Dict]]] = None, async_routes: bool = False) -> List[Route]:
+        def url(name: str, **kwargs: Any) -> str:
+            if async_routes:
+                model, route = name.split('-', 1)
+                name = f'{model}-async-{route}'
+            return reverse(name, kwargs=kwargs or None)
+
+        student: Dict = random.choice(students)
+        course: Dict = random.choice(courses)
+        enrollment: Dict = random.choice(enrollments)
+        students_url: str = url('Students-list')
+        enrollments_url: str = url('Enrollments-list')
+        last_page: int = max(1, (total_students + 9) // 10)
+
+        routes: List[Route] = [
+            ('students-list', 'GET', students_url, None),
+            ('students-list-cursor', 'GET', f'{students_url}?pagination=cursor', None),
+            ('students-list-deep-page', 'GET', f'{students_url}?page={last_page}', None),
+            ('students-detail', 'GET', url('Students-detail', pk=student['id']), None),
+            ('students-search-name', 'GET', f"{students_url}?search={student['name'].split()[-1]}", None),
+            ('students-search-cpf', 'GET', f"{students_url}?search={student['cpf']}", None),
+            ('students-ordering', 'GET', f'{students_url}?ordering=-birthday', None),
+            ('students-enrollments', 'GET', url('Students-enrollments', pk=enrollment['student']), None),
+            ('courses-list', 'GET', url('Courses-list'), None),
+            ('courses-detail', 'GET', url('Courses-detail', pk=course['id']), None),
+            ('courses-enrollments', 'GET', url('Courses-enrollments', pk=enrollment['course']), None),
+            ('enrollments-list', 'GET', enrollments_url, None),
+            ('enrollments-detail', 'GET', url('Enrollments-detail', pk=enrollment['id']), None),
+            ('enrollments-search', 'GET', f"{enrollments_url}?search={course['course_code']}", None),
+            ('enrollments-ordering', 'GET', f'{enrollments_url}?ordering=course__course_code', None),
+        ]
+        for name, body in (writes or {}).items():
+            routes.append((name, 'POST', reverse('Students-list') if name.startswith('students') else reverse('Enrollments-list'), body))
+
+        return routes
+
+    def write_bodies(self, dataset: Dict[str, Any], total: int) -> Dict[str, Callable[[int], Dict]]:
+        """Bodies of POST routes: new students, and enrollments of students not enrolled yet."""
+        from seeds import build_students
+
+        new_students: List[Student] = build_students(total=total)
+        pairs: List[Tuple[int, int]] = [(student.id, course.id) for student in dataset['not_enrolled'] for course in dataset['courses']]
+        random.shuffle(pairs)
+        if len(pairs) < total:
+            raise CommandError(f'Only {len(pairs)} free (student, course) pairs for {total} enrollment creations: seed more students')
+
+        return {
+            'students-create': lambda i: student_body(new_students[i]),
+            'enrollments-create': lambda i: {'student': pairs[i][0], 'course': pairs[i][1], 'period': Enrollment.Period.MORNING.name},
+        }
+
+    def measure(self, request: Callable[[int], int], options: Dict[str, Any], count_queries: bool) -> Dict[str, Any]:
+        for i in range(options['warmup']):
+            request(i)
+
+        timings: List[float] = []
+        queries: List[int] = []
+        statuses: Counter = Counter()
+        started: float = time.perf_counter()
+        for i in range(options['warmup'], options['warmup'] + options['requests']):
+            if options['cold']:
+                caches['api'].clear()
+            with CaptureQueriesContext(connection) as captured:
+                begin: float = time.perf_counter()
+                status: int = request(i)
+                timings.append(time.perf_counter() - begin)
+            queries.append(len(captured))
+            statuses[status] += 1
+        elapsed: float = time.perf_counter() - started
+
+        return summarize(timings, elapsed, queries=queries if count_queries else None, statuses=statuses)
+
+    def measure_concurrently(self, request: Callable[[int], int], options: Dict[str, Any]) -> Dict[str, Any]:
+        """--concurrency clients share the requests: throughput of the server, latency seen by each client."""
+        def timed(i: int) -> Tuple[float, int]:
+            begin: float = time.perf_counter()
+            status: int = request(i)
+            return time.perf_counter() - begin, status
+
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            list(executor.map(timed, range(options['warmup'])))
+            started: float = time.perf_counter()
+            answers: List[Tuple[float, int]] = list(executor.map(timed, range(options['warmup'], options['warmup'] + options['requests'])))
+            elapsed: float = time.perf_counter() - started
+
+        return summarize([timing for timing, _ in answers], elapsed, statuses=Counter(status for _, status in answers))
+
+    def run_in_process(self, options: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        setup_test_environment()
+        databases = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+        try:
+            dataset: Dict[str, Any] = self.seed(options)
+            client: APIClient = APIClient()
+            client.force_authenticate(User.objects.create_superuser('benchmark'))
+
+            total: int = options['warmup'] + options['requests']
+            routes: List[Route] = self.routes(
+                students=[{'id': s.id, 'name': s.name, 'cpf': s.cpf} for s in dataset['students']],
+                courses=[{'id': c.id, 'course_code': c.course_code} for c in dataset['courses']],
+                enrollments=[{'id': e.id, 'student': e.student_id, 'course': e.course_id} for e in dataset['enrollments']],
+                total_students=len(dataset['students']),
+                writes=self.write_bodies(dataset, total),
+                async_routes=options['async_routes'],
+            )
+
+            results: Dict[str, Dict[str, Any]] = {}
+            # the benchmark measures the api, not the throttling
+            with mock.patch.object(APIView, 'check_throttles', lambda view, request: None):
+                for name, method, url, body in routes:
+                    def request(i: int, method: str = method, url: str = url, body: Optional[Callable[[int], Dict]] = body) -> int:
+                        if method == 'POST':
+                            return client.post(url, data=body(i), format='json').status_code
+                        return client.get(url).status_code
+
+                    self.stdout.write(f'{method} {url}')
+                    results[name] = self.measure(request, options, count_queries=True)
+        finally:
+            teardown_databases(databases, verbosity=0)
+            teardown_test_environment()
+
+        return results
+
+    def run_server(self, options: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        base_url: str = options['server'].rstrip('/')
+        credentials: str = base64.b64encode(f"{options['username']}:{options['password']}".encode()).decode()
+        # replaced by a token with --auth token
+        authorization: str = f'Basic {credentials}'
+
+        def call(method: str, url: str, body: Optional[Dict] = None) -> Tuple[int, Any]:
+            data: Optional[bytes] = json.dumps(body).encode() if body is not None else None
+            http_request = urllib.request.Request(f'{base_url}{url}', data=data, method=method, headers={'Authorization': authorization, 'Content-Type': 'application/json', 'Accept': 'application/json'})
+            try:
+                with urllib.request.urlopen(http_request) as response:
+                    return response.status, response.read()
+            except urllib.error.HTTPError as e:
+                return e.code, e.read()
+
+        def first_page(url: str) -> Tuple[List[Dict], int]:
+            status, content = call('GET', url)
+            if status != 200:
+                raise CommandError(f'GET {url} answered {status}: {content[:200]}')
+            page: Dict = json.loads(content)
+            return page['results'], page.get('count', len(page['results']))
+
+        if options['auth'] == 'token':
+            status, content = call('POST', reverse('Auth-token'), {'username': options['username'], 'password': options['password']})
+            if status != 200:
+                raise CommandError(f"POST {reverse('Auth-token')} answered {status}: {content[:200]}")
+            authorization = f"Token {json.loads(content)['token']}"
+
+        students, total_students = first_page(reverse('Students-list'))
+        courses, _ = first_page(reverse('Courses-list'))
+        enrollments, _ = first_page(reverse('Enrollments-list'))
+        if not (students and courses and enrollments):
+            raise CommandError('Server has no data: seed it first (python seeds.py)')
+
+        writes: Optional[Dict[str, Callable[[int], Dict]]] = None
+        if options['writes']:
+            from seeds import build_students
+            new_students: List[Student] = build_students(total=options['warmup'] + options['requests'])
+            writes = {'students-create': lambda i: student_body(new_students[i])}
+
+        results: Dict[str, Dict[str, Any]] = {}
+        for name, method, url, body in self.routes(students, courses, enrollments, total_students, writes=writes, async_routes=options['async_routes']):
+            self.stdout.write(f'{method} {base_url}{url}')
+            request: Callable[[int], int] = lambda i, method=method, url=url, body=body: call(method, url, body(i) if body else None)[0]
+            if options['concurrency'] > 1:
+                results[name] = self.measure_concurrently(request, options)
+            else:
+                results[name] = self.measure(request, options, count_queries=False)
+
+        return results
@@ -0,0 +1,74 @@
+import datetime
+import random
+import time
+from typing import Any, Callable, Dict, List, Sequence
+
+from django.core.management.base import BaseCommand
+from validate_docbr import CPF
+
+from school.benchmarks import summarize, write_results
+from school.validators import cpf_check_digits, is_valid_cpf, numpy, validate_cpf, validate_cpf_batch
+
+
+def docbr_batch(cpf_numbers: Sequence[str]) -> List[bool]:
+    """Former path: a new validate_docbr CPF object for each value."""
+    return [CPF().validate(cpf_number) for cpf_number in cpf_numbers]
+
+
+def sample_cpfs(total: int, rng: random.Random) -> List[str]:
+    """Valid CPFs, a third of them masked, and one in ten with a wrong check digit."""
+    cpf_numbers: List[str] = []
+    for _ in range(total):
+        digits: str = f'{rng.randrange(10 ** 9):09d}'
+        first, second = cpf_check_digits(digits)
+        if rng.random() < 0.1:
+            second = (second + 1) % 10
+        cpf_number: str = f'{digits}{first}{second}'
+        if rng.random() < 0.33:
+            cpf_number = f'{cpf_number[:3]}.{cpf_number[3:6]}.{cpf_number[6:9]}-{cpf_number[9:]}'
+        cpf_numbers.append(cpf_number)
+
+    return cpf_numbers
+
+
+class Command(BaseCommand):
+    help = 'Micro-benchmark of CPF validation: validate_docbr against the check-digit routine, its memo and the batch (NumPy) API.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cpfs', type=int, default=50000, help='CPFs validated per round (the memo holds CPF_CACHE_SIZE of them)')
+        parser.add_argument('--rounds', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=10)
+        parser.add_argument('--output', default=f"benchmark-cpf-{datetime.datetime.now().strftime('%Y-%m-%dT%H-%M-%S')}.json", help='JSON file with the results')
+
+    def handle(self, *args, **options):
+        cpf_numbers: List[str] = sample_cpfs(options['cpfs'], random.Random(options['seed']))
+        expected: List[bool] = docbr_batch(cpf_numbers)
+        validate_cpf.cache_clear()
+        strategies: Dict[str, Callable[[Sequence[str]], List[bool]]] = {
+            'validate_docbr': docbr_batch,
+            'is_valid_cpf': lambda values: [is_valid_cpf(value) for value in values],
+            # after the first round every value is memoized (repeated PUTs)
+            'validate_cpf (memo)': lambda values: [validate_cpf(value) for value in values],
+            'validate_cpf_batch (numpy)' if numpy is not None else 'validate_cpf_batch': validate_cpf_batch,
+        }
+
+        results: Dict[str, Dict[str, Any]] = {}
+        self.stdout.write(f"{'name':<30} {'p50 ms':>9} {'ns/cpf':>9} {'speedup':>8}")
+        for name, strategy in strategies.items():
+            if strategy(cpf_numbers) != expected:
+                self.stderr.write(f'{name} does not agree with validate_docbr')
+
+            timings: List[float] = []
+            started: float = time.perf_counter()
+            for _ in range(options['rounds']):
+                begin: float = time.perf_counter()
+                strategy(cpf_numbers)
+                timings.append(time.perf_counter() - begin)
+            results[name] = summarize(timings, time.perf_counter() - started)
+            results[name]['ns_per_cpf'] = round(results[name]['p50_ms'] * 1e6 / len(cpf_numbers), 1)
+
+            speedup: float = results['validate_docbr']['p50_ms'] / results[name]['p50_ms'] if results[name]['p50_ms'] else 0.0
+            self.stdout.write(f"{name:<30} {results[name]['p50_ms']:>9} {results[name]['ns_per_cpf']:>9} {speedup:>7.1f}x")
+
+        write_results(options['output'], kind='cpf', parameters={key: options[key] for key in ('cpfs', 'rounds', 'seed')}, results=results)
+        self.stdout.write(self.style.SUCCESS(f"Results saved at {options['output']}"))
@@ -0,0 +1,89 @@
+import datetime
+import io
+import time
+from typing import Any, Callable, Dict, List
+
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from school.benchmarks import summarize, write_results
+from school.models import Enrollment, Student
+from school.parsers import MessagePackParser, ORJSONParser
+from school.renderers import MessagePackRenderer, ORJSONRenderer, msgpack, orjson
+from school.serializer import StudentSerializerV4
+from seeds import build_students
+
+
+def student_page(rows: int, seed: int) -> Dict[str, Any]:
+    """A paginated response body of StudentSerializerV4 rows (dates, photo urls, nullable e-mails)."""
+    students: List[Student] = build_students(total=rows, seed=seed)
+    for pk, student in enumerate(students, start=1):
+        student.id = pk
+        student.photo = f'photos/{student.cpf}.png' if pk % 2 else ''
+    results: Any = StudentSerializerV4(students, many=True, context={'request': APIRequestFactory().get('/')}).data
+
+    return {'count': rows, 'next': 'http://testserver/school/students/?page=2', 'previous': None, 'results': results}
+
+
+def bulk_body(rows: int) -> List[Dict[str, Any]]:
+    """A bulk enrollment POST body."""
+    periods: List[str] = [period.name for period in Enrollment.Period]
+
+    return [{'student': pk, 'course': pk % 50 + 1, 'period': periods[pk % len(periods)]} for pk in range(1, rows + 1)]
+
+
+class Command(BaseCommand):
+    help = 'Micro-benchmark of response rendering and request parsing: DRF JSON against orjson and MessagePack.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Rows of the rendered page and of the parsed bulk body')
+        parser.add_argument('--rounds', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=10)
+        parser.add_argument('--output', default=f"benchmark-renderers-{datetime.datetime.now().strftime('%Y-%m-%dT%H-%M-%S')}.json", help='JSON file with the results')
+
+    def measure(self, name: str, function: Callable[[], Any], rounds: int, baseline: str, results: Dict[str, Dict[str, Any]], size: int) -> None:
+        timings: List[float] = []
+        started: float = time.perf_counter()
+        for _ in range(rounds):
+            begin: float = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - begin)
+        results[name] = summarize(timings, time.perf_counter() - started)
+        results[name]['bytes'] = size
+
+        speedup: float = results[baseline]['p50_ms'] / results[name]['p50_ms'] if results[name]['p50_ms'] else 0.0
+        self.stdout.write(f"{name:<30} {results[name]['p50_ms']:>9} {results[name]['p95_ms']:>9} {size:>9} {speedup:>7.1f}x")
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stderr.write('orjson is not installed: ORJSONRenderer falls back to the json module')
+
+        page: Dict[str, Any] = student_page(options['rows'], options['seed'])
+        body: List[Dict[str, Any]] = bulk_body(options['rows'])
+        renderers: Dict[str, Any] = {'render JSONRenderer': JSONRenderer(), 'render ORJSONRenderer': ORJSONRenderer()}
+        parsers: Dict[str, Any] = {'parse JSONParser': (JSONParser(), JSONRenderer()), 'parse ORJSONParser': (ORJSONParser(), JSONRenderer())}
+        if msgpack is not None:
+            renderers['render MessagePackRenderer'] = MessagePackRenderer()
+            parsers['parse MessagePackParser'] = (MessagePackParser(), MessagePackRenderer())
+        else:
+            self.stderr.write('msgpack is not installed: MessagePack is not measured')
+
+        results: Dict[str, Dict[str, Any]] = {}
+        self.stdout.write(f"{'name':<30} {'p50 ms':>9} {'p95 ms':>9} {'bytes':>9} {'speedup':>8}")
+        expected: bytes = JSONRenderer().render(page)
+        for name, renderer in renderers.items():
+            content: bytes = renderer.render(page)
+            if isinstance(renderer, JSONRenderer) and content != expected:
+                self.stderr.write(f'{name} does not render the same bytes as JSONRenderer')
+            self.measure(name, lambda: renderer.render(page), options['rounds'], 'render JSONRenderer', results, len(content))
+
+        for name, (parser, renderer) in parsers.items():
+            content = renderer.render(body)
+            if parser.parse(io.BytesIO(content)) != body:
+                self.stderr.write(f'{name} does not read back the rendered body')
+            self.measure(name, lambda: parser.parse(io.BytesIO(content)), options['rounds'], 'parse JSONParser', results, len(content))
+
+        write_results(options['output'], kind='renderers', parameters={key: options[key] for key in ('rows', 'rounds', 'seed')}, results=results)
+        self.stdout.write(self.style.SUCCESS(f"Results saved at {options['output']}"))
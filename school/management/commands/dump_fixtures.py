@@ -0,0 +1,64 @@
+import time
+from typing import IO, List, Type
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Model
+
+from school.fixture_streams import FixtureWriter, Progress, open_fixture, split_path
+
+
+# in dependency order, so the file loads as it is written
+DEFAULT_MODELS: List[str] = ['school.student', 'school.course', 'school.enrollment']
+
+
+class Command(BaseCommand):
+    help = (
+        'Stream rows to a fixture file, in constant memory: NDJSON (.ndjson, .jsonl) or JSON array (.json, as '
+        'school/fixtures), compressed by suffix (.gz, .zst). Read back with load_fixtures or loaddata (.json).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', default=DEFAULT_MODELS, help=f"Models (app_label.model), in this order. Default: {' '.join(DEFAULT_MODELS)}")
+        parser.add_argument('--output', '-o', required=True, help="File, e.g. school.ndjson.gz, or '-' for stdout")
+        parser.add_argument('--format', choices=['ndjson', 'json'], help='Default: from the output suffix')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows read per query')
+        parser.add_argument('--progress-every', type=int, default=100000, help='Rows between progress lines (stderr)')
+
+    def handle(self, *args, **options):
+        try:
+            models: List[Type[Model]] = [apps.get_model(label) for label in options['models']]
+        except (LookupError, ValueError) as e:
+            raise CommandError(e)
+
+        fixture_format: str = options['format'] or split_path(options['output'])[0]
+        if not fixture_format:
+            raise CommandError(f"Unknown format of {options['output']}: use a .ndjson, .jsonl or .json suffix (.gz, .zst compressed) or --format")
+
+        started: float = time.perf_counter()
+        try:
+            stream: IO[str] = open_fixture(options['output'], 'w')
+        except ValueError as e:
+            raise CommandError(e)
+
+        try:
+            # JSON: one array for every model, as dumpdata
+            writer = FixtureWriter(stream, fixture_format)
+            for model in models:
+                label: str = model._meta.label_lower
+                queryset = model._default_manager.order_by('pk')
+                count: int = writer.write(queryset.iterator(chunk_size=options['batch_size']), self.progress(label, started), options['progress_every'])
+                self.stderr.write(f'{label}: {count} rows ({time.perf_counter() - started:.1f}s)')
+            writer.finish()
+        finally:
+            if options['output'] != '-':
+                stream.close()
+
+        self.stderr.write(self.style.SUCCESS(f"Dumped {writer.total} rows to {options['output']} in {time.perf_counter() - started:.1f}s"))
+
+    def progress(self, label: str, started: float) -> Progress:
+        def report(count: int) -> None:
+            elapsed: float = time.perf_counter() - started
+            self.stderr.write(f'{label}: {count} rows ({elapsed:.1f}s, {count / elapsed if elapsed else 0:.0f} rows/s)')
+
+        return report
@@ -0,0 +1,25 @@
+from typing import List
+
+from django.core.management.base import BaseCommand, CommandError
+
+from school.stats import rebuild_enrollment_counters, verify_enrollment_counters
+
+
+class Command(BaseCommand):
+    help = 'Verify enrollment counters (used by the stats endpoint) against the enrollments, or rebuild them from scratch with --rebuild.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Recompute every counter from the enrollments, then verify')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            total: int = rebuild_enrollment_counters()
+            self.stdout.write(f'Rebuilt {total} counters')
+
+        differences: List[str] = verify_enrollment_counters()
+        for difference in differences:
+            self.stderr.write(difference)
+        if differences:
+            raise CommandError(f'{len(differences)} counters differ from the enrollments: run with --rebuild')
+
+        self.stdout.write(self.style.SUCCESS('Enrollment counters are right'))
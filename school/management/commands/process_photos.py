@@ -0,0 +1,70 @@
+import multiprocessing
+import os
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from school.models import Student
+from school.photos import PhotoResult, render_photo, save_photo_variants
+
+
+class Command(BaseCommand):
+    help = (
+        'Make the WebP variants of student photos (school.photos.PHOTO_VARIANTS) in a pool of processes: photos without '
+        'variants, or all of them with --all (after PHOTO_VARIANTS changes). Students sharing a photo share its variants.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1, help='Processes rendering photos (default: one per CPU)')
+        parser.add_argument('--batch-size', type=int, default=200, help='Students updated per transaction')
+        parser.add_argument('--progress-every', type=int, default=1000, help='Photos between progress lines (stderr)')
+        parser.add_argument('--all', action='store_true', help='Also photos that already have variants')
+
+    def handle(self, *args, **options):
+        started: float = time.perf_counter()
+        students: Dict[str, List[int]] = self.pending_photos(options['all'])
+        total: int = sum(len(pks) for pks in students.values())
+        self.stderr.write(f'{len(students)} photos of {total} students to process')
+
+        updated: int = 0
+        failed: int = 0
+        batch: List[PhotoResult] = []
+        for count, (name, variants, error) in enumerate(self.render(list(students), options['processes']), start=1):
+            if variants is None:
+                failed += 1
+                self.stderr.write(self.style.WARNING(f'{name}: {error}'))
+            else:
+                batch.extend((pk, name, variants) for pk in students[name])
+            if len(batch) >= options['batch_size']:
+                updated += save_photo_variants(batch)
+                batch = []
+            if count % options['progress_every'] == 0:
+                elapsed: float = time.perf_counter() - started
+                self.stderr.write(f'{count} photos ({elapsed:.1f}s, {count / elapsed:.0f} photos/s)')
+        if batch:
+            updated += save_photo_variants(batch)
+
+        self.stderr.write(self.style.SUCCESS(f'{updated} students updated, {failed} photos failed in {time.perf_counter() - started:.1f}s'))
+
+    def pending_photos(self, process_all: bool) -> Dict[str, List[int]]:
+        """Student pks by photo name (uploads of the same content have the same name: rendered once)."""
+        students: Dict[str, List[int]] = {}
+        rows = Student.objects.exclude(photo__isnull=True).exclude(photo='').order_by('pk').values_list('pk', 'photo', 'photo_variants')
+        for pk, name, variants in rows.iterator(chunk_size=2000):
+            if process_all or variants.get('source') != name:
+                students.setdefault(name, []).append(pk)
+
+        return students
+
+    def render(self, names: List[str], processes: int) -> Iterator[Tuple[str, Optional[Dict[str, str]], Optional[str]]]:
+        # daemonic processes (pool workers, e.g. of the parallel test runner) cannot start a pool
+        if processes <= 1 or len(names) <= 1 or multiprocessing.current_process().daemon:
+            yield from map(render_photo, names)
+            return
+
+        # forked processes only read and write files: they must not share the connections of this one
+        connections.close_all()
+        with multiprocessing.Pool(processes) as pool:
+            yield from pool.imap_unordered(render_photo, names, chunksize=4)
@@ -0,0 +1,64 @@
+import multiprocessing
+import signal
+import threading
+from typing import Any, Dict, List, Optional
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from school.jobs import run_worker
+
+
+def run_until_signal(stop: Any, poll_interval: Optional[float], once: bool) -> int:
+    """run_worker with SIGINT and SIGTERM stopping it after its current job (not killed in the middle of it)."""
+    previous: Dict[int, Any] = {signum: signal.signal(signum, lambda *args: stop.set()) for signum in (signal.SIGINT, signal.SIGTERM)}
+    try:
+        return run_worker(poll_interval=poll_interval, once=once, stop=stop)
+    finally:
+        for signum, handler in previous.items():
+            signal.signal(signum, handler)
+
+
+def worker_process(stop: Any, poll_interval: Optional[float], once: bool) -> None:
+    """One worker per process: a job (CSV parsing, validation) holds the GIL."""
+    run_until_signal(stop, poll_interval, once)
+
+
+class Command(BaseCommand):
+    help = (
+        'Run background jobs (CSV imports, see school.jobs) in a pool of worker processes polling the database. Failed '
+        'jobs are retried with a growing delay (JOB_MAX_ATTEMPTS, JOB_RETRY_DELAY), jobs of dead workers requeued '
+        'after JOB_TIMEOUT. Ctrl+C or SIGTERM stops the workers after their current job.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1, help='Worker processes')
+        parser.add_argument('--poll-interval', type=float, help='Seconds between polls when no job is ready. Default: JOB_POLL_INTERVAL')
+        parser.add_argument('--once', action='store_true', help='Exit when no job is ready (cron, deploys, tests)')
+
+    def handle(self, *args, **options):
+        if options['processes'] <= 1:
+            done: int = run_until_signal(threading.Event(), options['poll_interval'], options['once'])
+            self.stderr.write(self.style.SUCCESS(f'{done} jobs run'))
+            return
+
+        # forked workers open their own connections
+        connections.close_all()
+        stop = multiprocessing.Event()
+        workers: List[multiprocessing.Process] = [
+            multiprocessing.Process(target=worker_process, args=(stop, options['poll_interval'], options['once']), name=f'school-jobs-{index}')
+            for index in range(options['processes'])
+        ]
+        for worker in workers:
+            worker.start()
+        # workers stop after their job, then this process
+        signal.signal(signal.SIGTERM, lambda *args: stop.set())
+        self.stderr.write(f"{len(workers)} workers started (pids {', '.join(str(worker.pid) for worker in workers)})")
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            stop.set()
+            for worker in workers:
+                worker.join()
+        self.stderr.write(self.style.SUCCESS('Workers stopped'))
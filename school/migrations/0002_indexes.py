@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:36
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_enrollments(apps, schema_editor):
+    """Enrollments repeating a (student, course) pair (nothing prevented them before the constraint): the first one is kept."""
+    Enrollment = apps.get_model('school', 'Enrollment')
+    duplicates = Enrollment.objects.order_by().values('student_id', 'course_id').annotate(first_id=Min('id'), total=Count('id')).filter(total__gt=1)
+    for row in list(duplicates):
+        Enrollment.objects.filter(student_id=row['student_id'], course_id=row['course_id'], id__gt=row['first_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['level', 'course_code'], name='course_level_code_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['course', 'id'], name='enrollment_course_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['student', 'id'], name='enrollment_student_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['period', 'id'], name='enrollment_period_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['name', 'id'], name='student_name_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['birthday', 'id'], name='student_birthday_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['rg'], name='student_rg_idx'),
+        ),
+        migrations.RunPython(remove_duplicate_enrollments, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='enrollment',
+            constraint=models.UniqueConstraint(fields=('student', 'course'), name='enrollment_unique_student_course'),
+        ),
+    ]
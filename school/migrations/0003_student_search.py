@@ -0,0 +1,55 @@
+from django.db import migrations
+
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE school_student_fts USING fts5(name, cpf, rg, content='school_student', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER school_student_fts_insert AFTER INSERT ON school_student BEGIN "
+    "INSERT INTO school_student_fts(rowid, name, cpf, rg) VALUES (new.id, new.name, new.cpf, new.rg); END",
+    "CREATE TRIGGER school_student_fts_delete AFTER DELETE ON school_student BEGIN "
+    "INSERT INTO school_student_fts(school_student_fts, rowid, name, cpf, rg) VALUES ('delete', old.id, old.name, old.cpf, old.rg); END",
+    "CREATE TRIGGER school_student_fts_update AFTER UPDATE OF name, cpf, rg ON school_student BEGIN "
+    "INSERT INTO school_student_fts(school_student_fts, rowid, name, cpf, rg) VALUES ('delete', old.id, old.name, old.cpf, old.rg); "
+    "INSERT INTO school_student_fts(rowid, name, cpf, rg) VALUES (new.id, new.name, new.cpf, new.rg); END",
+    "INSERT INTO school_student_fts(school_student_fts) VALUES ('rebuild')",
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS school_student_fts_update",
+    "DROP TRIGGER IF EXISTS school_student_fts_delete",
+    "DROP TRIGGER IF EXISTS school_student_fts_insert",
+    "DROP TABLE IF EXISTS school_student_fts",
+]
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    # unaccent() is only STABLE, an IMMUTABLE wrapper is required to use it in an index
+    "CREATE OR REPLACE FUNCTION school_unaccent(text) RETURNS text AS $$ SELECT public.unaccent('public.unaccent', $1) $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT",
+    "CREATE INDEX IF NOT EXISTS student_name_trgm_idx ON school_student USING gin (school_unaccent(upper(name)) gin_trgm_ops)",
+]
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS student_name_trgm_idx",
+    "DROP FUNCTION IF EXISTS school_unaccent(text)",
+]
+
+
+def run(statements_by_vendor):
+    def execute(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+
+    return execute
+
+
+class Migration(migrations.Migration):
+    """Full text (SQLite FTS5) or trigram (Postgres pg_trgm) index for student search. Other databases keep LIKE search."""
+
+    dependencies = [
+        ('school', '0002_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            run({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRES_BACKWARD}),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_counters(apps, schema_editor):
+    Enrollment = apps.get_model('school', 'Enrollment')
+    EnrollmentCounter = apps.get_model('school', 'EnrollmentCounter')
+    rows = Enrollment.objects.order_by().values_list('course_id', 'period').annotate(total=Count('id'))
+    EnrollmentCounter.objects.bulk_create([EnrollmentCounter(course_id=course_id, period=period, total=total) for course_id, period, total in rows])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0003_student_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnrollmentCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('MORNING', 'Matutino'), ('AFTERNOON', 'Vespertino'), ('NIGHT', 'Noturno')], max_length=16, verbose_name='Period')),
+                ('total', models.IntegerField(default=0, verbose_name='Total')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enrollment_counters', to='school.course', verbose_name='Course')),
+            ],
+            options={
+                'verbose_name': 'Enrollment counter',
+                'verbose_name_plural': 'Enrollment counters',
+                'constraints': [models.UniqueConstraint(fields=('course', 'period'), name='enrollment_counter_unique_course_period')],
+            },
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
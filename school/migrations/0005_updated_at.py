@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:09
+
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+# FTS triggers of 0003_student_search (migrations do not import each other)
+SQLITE_TRIGGERS = [
+    "CREATE TRIGGER school_student_fts_insert AFTER INSERT ON school_student BEGIN "
+    "INSERT INTO school_student_fts(rowid, name, cpf, rg) VALUES (new.id, new.name, new.cpf, new.rg); END",
+    "CREATE TRIGGER school_student_fts_delete AFTER DELETE ON school_student BEGIN "
+    "INSERT INTO school_student_fts(school_student_fts, rowid, name, cpf, rg) VALUES ('delete', old.id, old.name, old.cpf, old.rg); END",
+    "CREATE TRIGGER school_student_fts_update AFTER UPDATE OF name, cpf, rg ON school_student BEGIN "
+    "INSERT INTO school_student_fts(school_student_fts, rowid, name, cpf, rg) VALUES ('delete', old.id, old.name, old.cpf, old.rg); "
+    "INSERT INTO school_student_fts(rowid, name, cpf, rg) VALUES (new.id, new.name, new.cpf, new.rg); END",
+]
+SQLITE_DROP_TRIGGERS = [
+    "DROP TRIGGER IF EXISTS school_student_fts_update",
+    "DROP TRIGGER IF EXISTS school_student_fts_delete",
+    "DROP TRIGGER IF EXISTS school_student_fts_insert",
+]
+
+
+def restore_search_triggers(apps, schema_editor):
+    """SQLite adds a column with a non constant default by rebuilding the table, which drops the FTS triggers of students."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    for statement in [*SQLITE_DROP_TRIGGERS, *SQLITE_TRIGGERS]:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0004_enrollment_counters'),
+    ]
+
+    operations = [
+        # backwards, after the columns are removed (another rebuild)
+        migrations.RunPython(migrations.RunPython.noop, restore_search_triggers),
+        migrations.AddField(
+            model_name='course',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_default=django.db.models.functions.datetime.Now(), verbose_name='Updated at'),
+        ),
+        migrations.AddField(
+            model_name='enrollment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_default=django.db.models.functions.datetime.Now(), verbose_name='Updated at'),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_default=django.db.models.functions.datetime.Now(), verbose_name='Updated at'),
+        ),
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:32
+
+import school.storage
+from django.db import migrations, models
+
+
+# FTS triggers of 0003_student_search (migrations do not import each other)
+SQLITE_TRIGGERS = [
+    "CREATE TRIGGER school_student_fts_insert AFTER INSERT ON school_student BEGIN "
+    "INSERT INTO school_student_fts(rowid, name, cpf, rg) VALUES (new.id, new.name, new.cpf, new.rg); END",
+    "CREATE TRIGGER school_student_fts_delete AFTER DELETE ON school_student BEGIN "
+    "INSERT INTO school_student_fts(school_student_fts, rowid, name, cpf, rg) VALUES ('delete', old.id, old.name, old.cpf, old.rg); END",
+    "CREATE TRIGGER school_student_fts_update AFTER UPDATE OF name, cpf, rg ON school_student BEGIN "
+    "INSERT INTO school_student_fts(school_student_fts, rowid, name, cpf, rg) VALUES ('delete', old.id, old.name, old.cpf, old.rg); "
+    "INSERT INTO school_student_fts(rowid, name, cpf, rg) VALUES (new.id, new.name, new.cpf, new.rg); END",
+]
+SQLITE_DROP_TRIGGERS = [
+    "DROP TRIGGER IF EXISTS school_student_fts_update",
+    "DROP TRIGGER IF EXISTS school_student_fts_delete",
+    "DROP TRIGGER IF EXISTS school_student_fts_insert",
+]
+
+
+def restore_search_triggers(apps, schema_editor):
+    """SQLite rebuilds the table for both operations below, which drops the FTS triggers of students."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    for statement in [*SQLITE_DROP_TRIGGERS, *SQLITE_TRIGGERS]:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0005_updated_at'),
+    ]
+
+    operations = [
+        # backwards, after the operations are reverted (another rebuild)
+        migrations.RunPython(migrations.RunPython.noop, restore_search_triggers),
+        migrations.AddField(
+            model_name='student',
+            name='photo_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Photo variants'),
+        ),
+        migrations.AlterField(
+            model_name='student',
+            name='photo',
+            field=models.ImageField(blank=True, null=True, storage=school.storage.ContentHashStorage(), upload_to='photos/', verbose_name='Photo'),
+        ),
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,114 @@
+from typing import Any, Dict, List, Optional, Sequence
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Model, QuerySet
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+
+class RelatedQuerysetMixin:
+    """
+    Fetch in the same query the relations a serializer reads through `source='relation.field'`.
+
+    Views declare:
+    - select_related_fields: relations joined with select_related (avoid one query per row and relation)
+    - only_fields: columns loaded from the database. None loads all of them.
+    """
+    select_related_fields: Sequence[str] = ()
+    only_fields: Optional[Sequence[str]] = None
+
+    def select_relations(self, queryset: QuerySet) -> QuerySet:
+        if self.select_related_fields:
+            queryset = queryset.select_related(*self.select_related_fields)
+
+        if self.only_fields is not None:
+            queryset = queryset.only(*self.only_fields)
+
+        return queryset
+
+
+class SparseFieldsetMixin:
+    """
+    Sparse fieldsets on read: ?fields=id,name returns only these fields, ?omit=photo,email all but these.
+
+    Serializers (see FieldsetSerializerMixin) drop the other fields and the queryset loads only their columns
+    (and joins only their relations), so unused columns are neither fetched nor serialized.
+    """
+    fields_query_param: str = 'fields'
+    omit_query_param: str = 'omit'
+
+    @staticmethod
+    def split_fields(value: Optional[str]) -> List[str]:
+        return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+    def get_fieldset(self) -> Optional[List[str]]:
+        """Serializer fields requested (in serializer order), None for all of them."""
+        if hasattr(self, '_fieldset'):
+            return self._fieldset
+
+        self._fieldset: Optional[List[str]] = None
+        requested: List[str] = self.split_fields(self.request.query_params.get(self.fields_query_param))
+        omitted: List[str] = self.split_fields(self.request.query_params.get(self.omit_query_param))
+        if self.request.method not in SAFE_METHODS or not (requested or omitted):
+            return self._fieldset
+
+        available: List[str] = list(self.get_serializer_class()().fields)
+        errors: Dict[str, List[str]] = {}
+        for param, names in ((self.fields_query_param, requested), (self.omit_query_param, omitted)):
+            unknown: List[str] = [name for name in names if name not in available]
+            if unknown:
+                errors[param] = [f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(available)}"]
+        if errors:
+            raise ValidationError(errors)
+
+        self._fieldset = [name for name in available if (not requested or name in requested) and name not in omitted]
+
+        return self._fieldset
+
+    def get_fieldset_columns(self, model: Model, fieldset: List[str]) -> Optional[List[str]]:
+        """ORM paths read by the fields of fieldset (source, or field name when the source is the whole object). None when a field is not backed by a column."""
+        serializer_fields: Dict[str, Any] = self.get_serializer_class()().fields
+        columns: List[str] = []
+        for name in fieldset:
+            field: Any = serializer_fields[name]
+            path: str = '__'.join(field.source_attrs) if field.source != '*' else name
+            try:
+                model._meta.get_field(path.split('__')[0])
+            except FieldDoesNotExist:
+                return None
+            columns.append(path)
+
+        return columns
+
+    def get_serializer_context(self) -> Dict[str, Any]:
+        context: Dict[str, Any] = super().get_serializer_context()
+        context['fieldset'] = self.get_fieldset()
+
+        return context
+
+    def filter_queryset(self, queryset: QuerySet) -> QuerySet:
+        queryset = super().filter_queryset(queryset)
+        fieldset: Optional[List[str]] = self.get_fieldset()
+        columns: Optional[List[str]] = None if fieldset is None else self.get_fieldset_columns(queryset.model, fieldset)
+        if columns is None:
+            return queryset
+
+        relations: List[str] = sorted({column.split('__')[0] for column in columns if '__' in column})
+        # keyset pagination reads the ordering fields of the first and last rows
+        ordering: List[str] = [str(field).lstrip('-') for field in queryset.query.order_by if isinstance(field, str)]
+        for field in ordering:
+            path: List[str] = field.split('__')
+            if len(path) == 2 and path[1] in ('id', 'pk'):
+                # foreign key column, like course__id
+                path = path[:1]
+            try:
+                if len(path) == 1 and queryset.model._meta.get_field(path[0]).concrete:
+                    columns.append(path[0])
+            except FieldDoesNotExist:
+                continue
+
+        queryset = queryset.select_related(None)
+        if relations:
+            queryset = queryset.select_related(*relations)
+
+        return queryset.only(*columns, *relations)
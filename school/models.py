@@ -1,7 +1,12 @@
 from enum import Enum
 
+from django.conf import settings
 from django.core.validators import MinLengthValidator
 from django.db import models
+from django.db.models.functions import Now
+from django.utils import timezone
+
+from school.storage import ContentHashStorage
 
 
 class Student(models.Model):
@@ -10,12 +15,20 @@ class Student(models.Model):
     cpf = models.CharField(max_length=16, verbose_name='CPF', unique=True)
     birthday = models.DateField(verbose_name='BDay')
     mobile = models.CharField(max_length=32, default="", verbose_name='Mobile')
-    photo = models.ImageField(null=True, blank=True, verbose_name='Photo')
+    photo = models.ImageField(null=True, blank=True, upload_to='photos/', storage=ContentHashStorage(), verbose_name='Photo')
+    # WebP files made from photo by school.photos: {'source': photo name, 'thumbnail': file name, ...}, {} until made
+    photo_variants = models.JSONField(default=dict, blank=True, editable=False, verbose_name='Photo variants')
     email = models.EmailField(max_length=512, null=True, blank=False, verbose_name='E-mail', validators=[MinLengthValidator(13)])
+    updated_at = models.DateTimeField(auto_now=True, db_default=Now(), verbose_name='Updated at')
 
     class Meta:
         verbose_name = 'Student'
         verbose_name_plural = 'Students'
+        indexes = [
+            models.Index(fields=['name', 'id'], name='student_name_id_idx'),
+            models.Index(fields=['birthday', 'id'], name='student_birthday_id_idx'),
+            models.Index(fields=['rg'], name='student_rg_idx'),
+        ]
 
     def __str__(self):
         return f'{self.name} RG {self.rg} CPF {self.cpf} birthday {self.birthday}'
@@ -30,10 +43,14 @@ class Course(models.Model):
     course_code = models.CharField(max_length=8, unique=True, validators=[MinLengthValidator(3)], verbose_name='Code')
     description = models.CharField(max_length=128, blank=False, verbose_name='Description')
     level = models.CharField(max_length=16, choices=tuple((e.name, e.value) for e in Level), blank=False, null=False, default=Level.BASIC.name, verbose_name='Level')
+    updated_at = models.DateTimeField(auto_now=True, db_default=Now(), verbose_name='Updated at')
 
     class Meta:
         verbose_name = 'Course'
         verbose_name_plural = 'Courses'
+        indexes = [
+            models.Index(fields=['level', 'course_code'], name='course_level_code_idx'),
+        ]
 
     def __str__(self):
         return f'#{self.course_code} [{self.level}] {self.description}'
@@ -48,10 +65,72 @@ class Enrollment(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE, verbose_name='Student')
     course = models.ForeignKey(Course, on_delete=models.CASCADE, verbose_name='Course')
     period = models.CharField(max_length=16, choices=tuple((e.name, e.value) for e in Period), blank=False, null=False, default=Period.MORNING.name, verbose_name='Period')
+    updated_at = models.DateTimeField(auto_now=True, db_default=Now(), verbose_name='Updated at')
 
     class Meta:
         verbose_name = 'Enrollment'
         verbose_name_plural = 'Enrollments'
+        indexes = [
+            models.Index(fields=['course', 'id'], name='enrollment_course_id_idx'),
+            models.Index(fields=['student', 'id'], name='enrollment_student_id_idx'),
+            models.Index(fields=['period', 'id'], name='enrollment_period_id_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'course'], name='enrollment_unique_student_course'),
+        ]
 
     def __str__(self):
         return f'[{self.id}] Student {self.student} is enrolled in course {self.course} in period {Enrollment.Period[self.period].value}'
+
+
+class EnrollmentCounter(models.Model):
+    """Enrollments per (course, period), kept up to date by school.stats so aggregates do not scan enrollments."""
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='enrollment_counters', verbose_name='Course')
+    period = models.CharField(max_length=16, choices=tuple((e.name, e.value) for e in Enrollment.Period), verbose_name='Period')
+    total = models.IntegerField(default=0, verbose_name='Total')
+
+    class Meta:
+        verbose_name = 'Enrollment counter'
+        verbose_name_plural = 'Enrollment counters'
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'period'], name='enrollment_counter_unique_course_period'),
+        ]
+
+    def __str__(self):
+        return f'Course {self.course_id} period {self.period}: {self.total} enrollments'
+
+
+class Job(models.Model):
+    """Work done by the run_jobs workers out of the request (see school.jobs), with its status, retries and result."""
+    class Status(Enum):
+        PENDING = 'Pendente'
+        RUNNING = 'Executando'
+        SUCCEEDED = 'Concluído'
+        FAILED = 'Falhou'
+
+    kind = models.CharField(max_length=64, verbose_name='Kind')
+    status = models.CharField(max_length=16, choices=tuple((e.name, e.value) for e in Status), default=Status.PENDING.name, verbose_name='Status')
+    payload = models.JSONField(default=dict, blank=True, verbose_name='Payload')
+    # returned by the handler, or its progress while it runs
+    result = models.JSONField(null=True, blank=True, verbose_name='Result')
+    error = models.TextField(default='', blank=True, verbose_name='Error')
+    attempts = models.IntegerField(default=0, verbose_name='Attempts')
+    max_attempts = models.IntegerField(default=3, verbose_name='Max attempts')
+    # not claimed before (retries are delayed)
+    run_after = models.DateTimeField(default=timezone.now, verbose_name='Run after')
+    worker = models.CharField(max_length=64, default='', blank=True, verbose_name='Worker')
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name='school_jobs', verbose_name='Created by')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Created at')
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name='Started at')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Finished at')
+
+    class Meta:
+        verbose_name = 'Job'
+        verbose_name_plural = 'Jobs'
+        indexes = [
+            models.Index(fields=['status', 'run_after', 'id'], name='job_status_run_after_idx'),
+            models.Index(fields=['created_by', 'id'], name='job_created_by_id_idx'),
+        ]
+
+    def __str__(self):
+        return f'Job {self.id} {self.kind} [{self.status}] attempt {self.attempts} of {self.max_attempts}'
@@ -0,0 +1,235 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import InvalidPage, Page, Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Field, Model, Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination: no COUNT(*) and no OFFSET, each page is one indexed range query.
+
+    Ordering comes from the queryset (default order_by or ?ordering=) and id is always appended as tiebreaker,
+    so the cursor holds the values of the last (or first) row in the page for every ordering field.
+    """
+    page_size: int = api_settings.PAGE_SIZE
+    cursor_query_param: str = 'cursor'
+    invalid_cursor_message: str = 'Invalid cursor'
+
+    def get_ordering(self, queryset: QuerySet) -> List[str]:
+        ordering: List[str] = [str(field) for field in queryset.query.order_by] or list(queryset.model._meta.ordering)
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            ordering.append('id')
+
+        return ordering
+
+    def ordering_field(self, model: Type[Model], field: str) -> Optional[Field]:
+        """Model field of an ordering (following relations), None for annotations."""
+        target: Optional[Field] = None
+        try:
+            for name in field.lstrip('-').split('__'):
+                target = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+                model = target.related_model or model
+        except FieldDoesNotExist:
+            return None
+        # a relation compares its primary key
+        return getattr(target, 'target_field', None) if target.is_relation else target
+
+    def decode_cursor(self, request: Request) -> Optional[Tuple[bool, List[Any]]]:
+        encoded: Optional[str] = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            cursor: Dict[str, Any] = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            reverse: bool = bool(cursor['r'])
+            position: List[Any] = list(cursor['p'])
+            if len(position) != len(self.ordering):
+                raise NotFound(self.invalid_cursor_message)
+            # values are compared in the query (None cannot be): a forged one must not fail there
+            fields: List[Optional[Field]] = [self.ordering_field(self.model, field) for field in self.ordering]
+            position = [value if field is None else field.to_python(value) for field, value in zip(fields, position)]
+            if None in position:
+                raise ValueError('Empty position value')
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return reverse, position
+
+    def encode_cursor(self, reverse: bool, position: List[Any]) -> str:
+        encoded: str = urlsafe_b64encode(json.dumps({'r': int(reverse), 'p': position}, cls=DjangoJSONEncoder).encode()).decode('ascii')
+
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_position(self, row: Any) -> List[Any]:
+        position: List[Any] = []
+        for field in self.ordering:
+            path: List[str] = field.lstrip('-').split('__')
+            if isinstance(row, dict):
+                value: Any = row[field.lstrip('-')]
+            elif len(path) == 2 and path[1] in ('id', 'pk'):
+                value = getattr(row, f'{path[0]}_id')
+            else:
+                value = row
+                for attr in path:
+                    value = getattr(value, attr)
+            position.append(value)
+
+        return position
+
+    def after(self, position: List[Any], reverse: bool) -> Q:
+        """Rows after position (before it when reverse), comparing (field_1, ..., field_n) lexicographically."""
+        condition: Q = Q()
+        for index, field in enumerate(self.ordering):
+            descending: bool = field.startswith('-') != reverse
+            name: str = field.lstrip('-')
+            term: Q = Q(**{f'{name}__lt' if descending else f'{name}__gt': position[index]})
+            for previous, value in zip(self.ordering[:index], position[:index]):
+                term &= Q(**{previous.lstrip('-'): value})
+            condition |= term
+
+        return condition
+
+    def page_queryset(self, queryset: QuerySet, request: Request) -> QuerySet:
+        """Rows of the requested page plus one (telling if there are more rows), not evaluated yet."""
+        self.base_url: str = request.build_absolute_uri()
+        self.ordering: List[str] = self.get_ordering(queryset)
+        self.model: Type[Model] = queryset.model
+
+        self.cursor: Optional[Tuple[bool, List[Any]]] = self.decode_cursor(request)
+        if self.cursor is not None:
+            queryset = queryset.filter(self.after(position=self.cursor[1], reverse=self.cursor[0]))
+
+        if self.cursor is not None and self.cursor[0]:
+            queryset = queryset.order_by(*[field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering])
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        return queryset[:self.page_size + 1]
+
+    def paginate_queryset(self, queryset: QuerySet, request: Request, view: Any = None) -> List[Any]:
+        return self.page_rows(list(self.page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset: QuerySet, request: Request, view: Any = None) -> List[Any]:
+        return self.page_rows([row async for row in self.page_queryset(queryset, request)])
+
+    def page_rows(self, rows: List[Any]) -> List[Any]:
+        cursor: Optional[Tuple[bool, List[Any]]] = self.cursor
+        reverse: bool = cursor is not None and cursor[0]
+        has_more: bool = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        has_next: bool = reverse or has_more
+        has_previous: bool = has_more if reverse else cursor is not None
+        self.next_position: Optional[List[Any]] = self.get_position(rows[-1]) if has_next and rows else None
+        self.previous_position: Optional[List[Any]] = self.get_position(rows[0]) if has_previous and rows else None
+
+        return rows
+
+    def get_next_link(self) -> Optional[str]:
+        return None if self.next_position is None else self.encode_cursor(reverse=False, position=self.next_position)
+
+    def get_previous_link(self) -> Optional[str]:
+        return None if self.previous_position is None else self.encode_cursor(reverse=True, position=self.previous_position)
+
+    def get_paginated_response(self, data: Any) -> Response:
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema: Dict) -> Dict:
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class SchoolPageNumberPagination(PageNumberPagination):
+    """PageNumberPagination that can also paginate in async views (async ORM for COUNT and page rows)."""
+
+    async def apaginate_queryset(self, queryset: QuerySet, request: Request, view: Any = None) -> Optional[List[Any]]:
+        self.request = request
+        page_size: Optional[int] = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator: Paginator = self.django_paginator_class(queryset, page_size)
+        # count is a cached property: set it, so paginator.page() does not run a sync COUNT(*)
+        paginator.count = await queryset.acount()
+        page_number: Any = self.get_page_number(request, paginator)
+        try:
+            self.page: Page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+
+        self.page.object_list = [row async for row in self.page.object_list]
+
+        return list(self.page)
+
+
+class SchoolPagination(BasePagination):
+    """
+    Page number pagination by default (backward compatible). Keyset pagination is used when the request has
+    ?pagination=cursor or a ?cursor= (links returned by keyset pages).
+    """
+    mode_query_param: str = 'pagination'
+
+    def __init__(self) -> None:
+        self.page_number: SchoolPageNumberPagination = SchoolPageNumberPagination()
+        self.keyset: KeysetPagination = KeysetPagination()
+        self.active: BasePagination = self.page_number
+
+    def use_keyset(self, request: Request) -> bool:
+        return request.query_params.get(self.mode_query_param) == 'cursor' or self.keyset.cursor_query_param in request.query_params
+
+    def paginate_queryset(self, queryset: QuerySet, request: Request, view: Any = None) -> Optional[List[Any]]:
+        self.active = self.keyset if self.use_keyset(request) else self.page_number
+
+        return self.active.paginate_queryset(queryset, request, view=view)
+
+    async def apaginate_queryset(self, queryset: QuerySet, request: Request, view: Any = None) -> Optional[List[Any]]:
+        self.active = self.keyset if self.use_keyset(request) else self.page_number
+
+        return await self.active.apaginate_queryset(queryset, request, view=view)
+
+    def get_paginated_response(self, data: Any) -> Response:
+        return self.active.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema: Dict) -> Dict:
+        return self.page_number.get_paginated_response_schema(schema)
+
+    def get_schema_operation_parameters(self, view: Any) -> List[Dict]:
+        return self.page_number.get_schema_operation_parameters(view) + [
+            {
+                'name': self.mode_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Use "cursor" for keyset pagination (no total count, fast deep pages).',
+                'schema': {'type': 'string', 'enum': ['page', 'cursor']},
+            },
+            {
+                'name': self.keyset.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Cursor returned in next/previous links of keyset pages.',
+                'schema': {'type': 'string'},
+            },
+        ]
@@ -0,0 +1,42 @@
+import codecs
+from typing import Any, Mapping, Optional
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser, get_encoding
+
+from school.renderers import MessagePackRenderer, ORJSONRenderer, msgpack, orjson
+
+
+class ORJSONParser(JSONParser):
+    """JSON bodies (bulk POSTs) decoded by orjson, falling back to the json module when orjson is not installed."""
+
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream: Any, media_type: Optional[str] = None, parser_context: Optional[Mapping[str, Any]] = None) -> Any:
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+
+        body: bytes = stream.read()
+        encoding: str = get_encoding(parser_context or {})
+        try:
+            # orjson reads UTF-8 only
+            return orjson.loads(body if codecs.lookup(encoding).name == 'utf-8' else body.decode(encoding))
+        except (ValueError, LookupError) as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+
+
+class MessagePackParser(BaseParser):
+    """MessagePack bodies, with the same payloads as JSON ones (dates as ISO 8601 strings)."""
+
+    media_type: str = 'application/msgpack'
+    renderer_class = MessagePackRenderer
+
+    def parse(self, stream: Any, media_type: Optional[str] = None, parser_context: Optional[Mapping[str, Any]] = None) -> Any:
+        if msgpack is None:
+            raise ImproperlyConfigured('MessagePackParser requires the msgpack package')
+
+        try:
+            return msgpack.unpackb(stream.read(), raw=False, strict_map_key=False)
+        except (ValueError, TypeError, msgpack.UnpackException) as exc:
+            raise ParseError(f'MessagePack parse error - {exc}')
@@ -1,7 +1,88 @@
+import time
+from typing import Any, Dict, Optional, Set, Tuple
+
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from django.db import connection, transaction
 from rest_framework.permissions import DjangoModelPermissions
 
 
+PERMISSION_CACHE_ALIAS: str = 'default'
+PERMISSION_VERSION_KEY: str = 'school:permissions:version'
+
+
+def user_permissions_key(user: Any) -> str:
+    # superusers have every permission: a user made (or no longer) superuser gets another entry
+    return f'school:permissions:user:{user.pk}:{int(user.is_superuser)}'
+
+
+def get_cached_permissions(user: Any) -> Tuple[int, Optional[Set[str]]]:
+    """
+    Current permission version and the permissions of a user cached with it (None when missing or stale), read in one
+    round trip. A missing version starts from the current time in ns, so it never goes back to a value already cached.
+    """
+    cache = caches[PERMISSION_CACHE_ALIAS]
+    key: str = user_permissions_key(user)
+    values: Dict[str, Any] = cache.get_many([PERMISSION_VERSION_KEY, key])
+    version: Optional[int] = values.get(PERMISSION_VERSION_KEY)
+    if version is None:
+        cache.add(PERMISSION_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(PERMISSION_VERSION_KEY)
+
+    entry: Optional[Tuple[int, Set[str]]] = values.get(key)
+
+    return version, entry[1] if entry is not None and entry[0] == version else None
+
+
+def set_cached_permissions(user: Any, version: int, permissions: Set[str]) -> None:
+    """Cache permissions computed at version: when a change bumps the version meanwhile, they are stale at the next read."""
+    caches[PERMISSION_CACHE_ALIAS].set(user_permissions_key(user), (version, permissions))
+
+
+def bump_permission_version() -> None:
+    cache = caches[PERMISSION_CACHE_ALIAS]
+    try:
+        cache.incr(PERMISSION_VERSION_KEY)
+    except ValueError:
+        cache.add(PERMISSION_VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def invalidate_permissions() -> None:
+    """
+    Make every cached permission stale. Bumped now and again after commit, so a read between the change and the commit
+    can not keep stale permissions cached.
+    """
+    bump_permission_version()
+    if connection.in_atomic_block:
+        transaction.on_commit(bump_permission_version)
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend whose permissions of active users are shared through the cache, keyed by user id and a permission
+    version. Users are rebuilt on every request (basic auth), so their own _perm_cache lasts one request: with this
+    backend a permission check costs one cache lookup instead of the user and group permission queries.
+
+    Invalidated by school.signals on changes of user groups, user permissions, group permissions, groups and permissions.
+    """
+
+    def get_all_permissions(self, user_obj: Any, obj: Any = None) -> Set[str]:
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+
+        if not hasattr(user_obj, '_perm_cache'):
+            version, permissions = get_cached_permissions(user_obj)
+            if permissions is None:
+                permissions = super().get_all_permissions(user_obj, obj)
+                set_cached_permissions(user_obj, version, permissions)
+            user_obj._perm_cache = permissions
+
+        return user_obj._perm_cache
+
+
 class StrictDjangoModelPermissions(DjangoModelPermissions):
+    """DjangoModelPermissions also required to GET (view permission). Checked by CachedModelBackend with one cache lookup."""
+
     def __init__(self):
         super().__init__()
         self.perms_map['GET'] = ['%(app_label)s.view_%(model_name)s']
@@ -0,0 +1,158 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import Storage
+from django.db import connections, transaction
+from django.db.models.functions import Now
+from django.http import HttpRequest, HttpResponse
+from django.views.static import serve
+from PIL import Image, ImageOps
+from rest_framework.request import Request
+
+from school.cache import invalidate_model
+from school.models import Student
+
+
+logger = logging.getLogger(__name__)
+
+# name: (size, crop). Cropped to exactly the size (list thumbnails), or scaled down to fit in it (aspect kept)
+PHOTO_VARIANTS: Dict[str, Tuple[Tuple[int, int], bool]] = {
+    'thumbnail': ((128, 128), True),
+    'medium': ((512, 512), False),
+}
+VARIANTS_DIR: str = 'photos/variants'
+WEBP_QUALITY: int = 80
+# media files have content hashed names (see school.storage): their content never changes
+MEDIA_MAX_AGE: int = 365 * 24 * 3600
+
+# (student pk, photo name, variants)
+PhotoResult = Tuple[int, str, Dict[str, str]]
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def photo_storage() -> Storage:
+    return Student._meta.get_field('photo').storage
+
+
+def render_variant(image: Image.Image, size: Tuple[int, int], crop: bool) -> bytes:
+    if crop:
+        variant: Image.Image = ImageOps.fit(image, size, Image.Resampling.LANCZOS)
+    else:
+        # thumbnail() only scales down
+        variant = image.copy()
+        variant.thumbnail(size, Image.Resampling.LANCZOS)
+    buffer = BytesIO()
+    variant.save(buffer, 'WEBP', quality=WEBP_QUALITY)
+
+    return buffer.getvalue()
+
+
+def create_photo_variants(name: str) -> Dict[str, str]:
+    """WebP variants (PHOTO_VARIANTS) of a stored photo: {'source': name, variant: file name}. Raises OSError for files that are not images."""
+    storage: Storage = photo_storage()
+    with storage.open(name, 'rb') as f:
+        image: Image.Image = Image.open(f)
+        # JPEG decodes straight to a smaller scale (never below the largest variant)
+        image.draft('RGB', max(size for size, _ in PHOTO_VARIANTS.values()))
+        image.load()
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if image.has_transparency_data else 'RGB')
+
+    variants: Dict[str, str] = {'source': name}
+    for variant, (size, crop) in PHOTO_VARIANTS.items():
+        variants[variant] = storage.save(f'{VARIANTS_DIR}/{variant}.webp', ContentFile(render_variant(image, size, crop)))
+
+    return variants
+
+
+def render_photo(name: str) -> Tuple[str, Optional[Dict[str, str]], Optional[str]]:
+    """create_photo_variants for process pools: (name, variants, None), or (name, None, error)."""
+    try:
+        return name, create_photo_variants(name), None
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        return name, None, str(e)
+
+
+def find_photo_variants(name: str) -> Optional[Dict[str, str]]:
+    """Variants already made for the same photo (same content, same name) for another student."""
+    return Student.objects.filter(photo=name, photo_variants__source=name).values_list('photo_variants', flat=True).first()
+
+
+def save_photo_variants(results: Iterable[PhotoResult]) -> int:
+    """Stores variants of students whose photo is still the one they were made from. Returns how many were updated."""
+    updated: int = 0
+    with transaction.atomic():
+        for pk, name, variants in results:
+            # update() sends no signals: updated_at (Last-Modified, ETags) and cached responses by hand
+            updated += Student.objects.filter(pk=pk, photo=name).update(photo_variants=variants, updated_at=Now())
+    if updated:
+        invalidate_model(Student)
+
+    return updated
+
+
+def process_student_photo(pk: int, name: str) -> bool:
+    variants: Optional[Dict[str, str]] = find_photo_variants(name)
+    if variants is None:
+        _, variants, error = render_photo(name)
+        if variants is None:
+            logger.warning('Photo %s of student %s has no variants: %s', name, pk, error)
+            return False
+
+    return save_photo_variants([(pk, name, variants)]) > 0
+
+
+def _process_in_worker(pk: int, name: str) -> None:
+    try:
+        process_student_photo(pk, name)
+    except Exception:
+        logger.exception('Photo %s of student %s has no variants', name, pk)
+    finally:
+        # connections of this worker thread
+        connections.close_all()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.PHOTO_WORKERS, thread_name_prefix='school-photos')
+
+    return _executor
+
+
+def schedule_photo(pk: int, name: str) -> None:
+    """Variants of a new photo, made by a pool of settings.PHOTO_WORKERS threads (Pillow releases the GIL), inline with 0."""
+    if settings.PHOTO_WORKERS <= 0:
+        process_student_photo(pk, name)
+    else:
+        get_executor().submit(_process_in_worker, pk, name)
+
+
+def variant_urls(value: Any, request: Optional[Request]) -> Any:
+    """{variant: absolute url} of photo_variants (as photo urls are), without 'source'."""
+    storage: Storage = photo_storage()
+    urls: Dict[str, str] = {}
+    for variant, name in value.items():
+        if variant != 'source':
+            url: str = storage.url(name)
+            urls[variant] = request.build_absolute_uri(url) if request is not None else url
+
+    return urls
+
+
+def serve_media(request: HttpRequest, path: str, document_root: Optional[str] = None, show_indexes: bool = False) -> HttpResponse:
+    """django.views.static.serve (DEBUG) with the long lived Cache-Control a web server should send for MEDIA_URL."""
+    response: HttpResponse = serve(request, path, document_root=document_root, show_indexes=show_indexes)
+    if response.status_code == 200:
+        response['Cache-Control'] = f'public, max-age={MEDIA_MAX_AGE}, immutable'
+
+    return response
@@ -0,0 +1,73 @@
+from typing import Any, Mapping, Optional
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+# DRF encoder conversions (datetimes with 'Z', Decimal as float, lazy strings, UUID, QuerySet...) for the types
+# orjson and msgpack do not serialize natively
+encode_default = JSONEncoder().default
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer output (compact, UTF-8, U+2028/U+2029 escaped) encoded by orjson. Indented output (browsable API,
+    ``Accept: application/json; indent=4``) and installs without orjson fall back to the json module.
+    """
+
+    # datetimes go through encode_default: DRF writes UTC as 'Z' where orjson writes '+00:00'
+    options: int = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME if orjson is not None else 0
+
+    def render(self, data: Any, accepted_media_type: Optional[str] = None, renderer_context: Optional[Mapping[str, Any]] = None) -> bytes:
+        if data is None:
+            return b''
+
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret: bytes = orjson.dumps(data, default=encode_default, option=self.options)
+        if b'\xe2\x80' in ret:
+            # as JSONRenderer, line and paragraph separators are escaped: they are not valid in JavaScript strings
+            ret = ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+        return ret
+
+
+class MessagePackRenderer(BaseRenderer):
+    """MessagePack body, with the values JSONRenderer would output (dates as ISO 8601 strings, urls, Decimal as float)."""
+
+    media_type: str = 'application/msgpack'
+    format: str = 'msgpack'
+    charset: Optional[str] = None
+    render_style: str = 'binary'
+
+    def render(self, data: Any, accepted_media_type: Optional[str] = None, renderer_context: Optional[Mapping[str, Any]] = None) -> bytes:
+        if msgpack is None:
+            raise ImproperlyConfigured('MessagePackRenderer requires the msgpack package')
+
+        if data is None:
+            return b''
+
+        return msgpack.packb(data, default=encode_default, use_bin_type=True, datetime=False)
+
+
+class PrometheusRenderer(BaseRenderer):
+    """Text exposition format of Prometheus (school.views.MetricsView): data is the text already formatted."""
+    media_type: str = 'text/plain'
+    format: str = 'prometheus'
+    charset: str = 'utf-8'
+
+    def render(self, data: Any, accepted_media_type: Optional[str] = None, renderer_context: Optional[Mapping[str, Any]] = None) -> bytes:
+        return str(data).encode(self.charset)
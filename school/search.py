@@ -0,0 +1,119 @@
+import re
+import unicodedata
+from functools import lru_cache
+from typing import List
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, FloatField, Func, Q, QuerySet, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Upper
+from django.utils.module_loading import import_string
+from rest_framework.filters import SearchFilter
+
+
+def strip_accents(text: str) -> str:
+    return ''.join(char for char in unicodedata.normalize('NFKD', text) if not unicodedata.combining(char))
+
+
+def search_words(terms: str) -> List[str]:
+    return [word for word in re.split(r'[^\w]+', terms) if word]
+
+
+class StudentSearchBackend:
+    """
+    Search students by name. Result is annotated with search_rank: lower is better.
+
+    - LIKE: portable fallback, no index and no ranking (rank is 0)
+    """
+
+    def search(self, queryset: QuerySet, terms: str) -> QuerySet:
+        condition: Q = Q()
+        for word in search_words(terms):
+            condition &= Q(name__icontains=word)
+
+        return queryset.filter(condition).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+class SQLiteFTSSearchBackend(StudentSearchBackend):
+    """
+    SQLite FTS5 table school_student_fts (see migration 0003), kept in sync by triggers on school_student.
+
+    unicode61 tokenizer removes diacritics, so "Joao" finds "João". Each word is a prefix query (autocomplete) and rank is bm25.
+    """
+    table: str = 'school_student_fts'
+
+    def match_query(self, terms: str) -> str:
+        return ' '.join(f'"{word}"*' for word in search_words(terms))
+
+    def search(self, queryset: QuerySet, terms: str) -> QuerySet:
+        query: str = self.match_query(terms)
+        if not query:
+            return queryset.none()
+
+        table: str = queryset.model._meta.db_table
+        return queryset.filter(
+            id__in=RawSQL(f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s', [query])
+        ).annotate(
+            search_rank=RawSQL(f'SELECT rank FROM {self.table} WHERE {self.table} MATCH %s AND rowid = "{table}"."id"', [query], output_field=FloatField())
+        )
+
+
+class PostgresTrigramSearchBackend(StudentSearchBackend):
+    """
+    Postgres pg_trgm GIN index on school_unaccent(upper(name)) (see migration 0003).
+
+    Every word must be contained in the unaccented name (LIKE uses the trigram index) and rank is the trigram similarity.
+    """
+
+    def search(self, queryset: QuerySet, terms: str) -> QuerySet:
+        from django.contrib.postgres.search import TrigramSimilarity
+
+        words: List[str] = [strip_accents(word).upper() for word in search_words(terms)]
+        if not words:
+            return queryset.none()
+
+        queryset = queryset.alias(search_name=Func(Upper(F('name')), function='school_unaccent'))
+        for word in words:
+            queryset = queryset.filter(search_name__contains=word)
+
+        return queryset.annotate(search_rank=-TrigramSimilarity('search_name', ' '.join(words)))
+
+
+@lru_cache(maxsize=None)
+def get_search_backend(vendor: str) -> StudentSearchBackend:
+    """Backend from settings.STUDENT_SEARCH_BACKEND (dotted path) or by database vendor."""
+    path: str = getattr(settings, 'STUDENT_SEARCH_BACKEND', '')
+    if path:
+        return import_string(path)()
+
+    if vendor == 'sqlite':
+        return SQLiteFTSSearchBackend()
+    elif vendor == 'postgresql':
+        return PostgresTrigramSearchBackend()
+
+    return StudentSearchBackend()
+
+
+class StudentSearchFilter(SearchFilter):
+    """
+    Search students (?search=).
+
+    - Only digits (dots, hyphen and slash allowed): exact match on CPF or RG, answered by their indexes.
+    - Otherwise: ranked and accent insensitive name search by the backend of the database. Best matches come first unless ?ordering= is used.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms: str = request.query_params.get(self.search_param, '').strip()
+        if not terms:
+            return queryset
+
+        if re.fullmatch(r'[\d.\-/ ]+', terms):
+            digits: str = re.sub(r'\D', '', terms)
+            return queryset.filter(Q(cpf=digits) | Q(cpf=terms) | Q(rg=digits) | Q(rg=terms))
+
+        queryset = get_search_backend(connection.vendor).search(queryset, terms)
+        if not request.query_params.get('ordering'):
+            queryset = queryset.order_by('search_rank', 'name', 'id')
+
+        return queryset
@@ -1,9 +1,34 @@
 import re
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Set, Tuple
 
-from rest_framework.serializers import ModelSerializer, ReadOnlyField, SerializerMethodField, ValidationError
-from school.models import Student, Course, Enrollment
-from school.validators import validate_allowed_period, validate_cpf
+from django.db import transaction
+from rest_framework.settings import api_settings
+from rest_framework.serializers import CharField, ChoiceField, DateField, EmailField, IntegerField, ListSerializer, ModelSerializer, ReadOnlyField, Serializer, SerializerMethodField, ValidationError
+from school.cache import invalidate_model
+from school.instrumentation import TimedSerializerMixin
+from school.models import Student, Course, Enrollment, Job
+from school.photos import variant_urls
+from school.stats import add_enrollment_counts, count_enrollments
+from school.validators import validate_allowed_period, validate_allowed_periods, validate_cpf, validate_cpf_batch
+
+
+class FieldsetSerializerMixin:
+    """Keep only the fields of context['fieldset'] (?fields= and ?omit=, see SparseFieldsetMixin), all of them when it is None."""
+
+    def get_fields(self) -> Dict[str, Any]:
+        fields: Dict[str, Any] = super().get_fields()
+        fieldset: Optional[List[str]] = self.context.get('fieldset')
+        if fieldset is None:
+            return fields
+
+        return {name: field for name, field in fields.items() if name in fieldset}
+
+
+class PhotoVariantsField(ReadOnlyField):
+    """Absolute urls of the photo variants ({'thumbnail': url, 'medium': url}), {} until they are made (see school.photos)."""
+
+    def to_representation(self, value: Any) -> Any:
+        return variant_urls(value, self.context.get('request'))
 
 
 class CustomStudentValidation:
@@ -21,34 +46,38 @@ class CustomStudentValidation:
         return cpf
 
 
-class StudentSerializer(ModelSerializer, CustomStudentValidation):
+class StudentSerializer(TimedSerializerMixin, FieldsetSerializerMixin, ModelSerializer, CustomStudentValidation):
     class Meta:
         model = Student
         fields = ['id', 'name', 'rg', 'cpf', 'birthday']
 
 
-class StudentSerializerV2(ModelSerializer, CustomStudentValidation):
+class StudentSerializerV2(TimedSerializerMixin, FieldsetSerializerMixin, ModelSerializer, CustomStudentValidation):
     class Meta:
         model = Student
         fields = ['id', 'name', 'rg', 'cpf', 'birthday', 'mobile']
 
 
-class StudentSerializerV3(ModelSerializer, CustomStudentValidation):
+class StudentSerializerV3(TimedSerializerMixin, FieldsetSerializerMixin, ModelSerializer, CustomStudentValidation):
+    photo_variants = PhotoVariantsField()
+
     class Meta:
         model = Student
-        fields = ['id', 'name', 'rg', 'cpf', 'birthday', 'mobile', 'photo']
+        fields = ['id', 'name', 'rg', 'cpf', 'birthday', 'mobile', 'photo', 'photo_variants']
+
 
+class StudentSerializerV4(TimedSerializerMixin, FieldsetSerializerMixin, ModelSerializer, CustomStudentValidation):
+    photo_variants = PhotoVariantsField()
 
-class StudentSerializerV4(ModelSerializer, CustomStudentValidation):
     class Meta:
         model = Student
-        fields = ['id', 'name', 'rg', 'cpf', 'birthday', 'mobile', 'photo', 'email']
+        fields = ['id', 'name', 'rg', 'cpf', 'birthday', 'mobile', 'photo', 'photo_variants', 'email']
 
 
-class CourseSerializer(ModelSerializer):
+class CourseSerializer(TimedSerializerMixin, FieldsetSerializerMixin, ModelSerializer):
     class Meta:
         model = Course
-        fields = '__all__'
+        exclude = ['updated_at']
 
     def validate_course_code(self, course_code: str) -> str:
         if not re.match(r'^[a-zA-Z][a-zA-Z0-9-]*$', course_code):
@@ -57,10 +86,10 @@ class CourseSerializer(ModelSerializer):
         return course_code
 
 
-class EnrollmentSerializer(ModelSerializer):
+class EnrollmentSerializer(TimedSerializerMixin, FieldsetSerializerMixin, ModelSerializer):
     class Meta:
         model = Enrollment
-        exclude = []
+        exclude = ['updated_at']
 
     def validate(self, data: Dict[str, Any]) -> Dict[str, Any]:
         if not validate_allowed_period(period=data['period'], level=data['course'].level, birthday=data['student'].birthday):
@@ -69,7 +98,144 @@ class EnrollmentSerializer(ModelSerializer):
         return data
 
 
-class ListEnrollmentsStudentsSerializer(ModelSerializer):
+class BulkEnrollmentItemSerializer(Serializer):
+    student = IntegerField(min_value=1)
+    course = IntegerField(min_value=1)
+    period = ChoiceField(choices=tuple((e.name, e.value) for e in Enrollment.Period))
+
+
+class BulkSerializer(ListSerializer):
+    """Batch validation: items are validated by child, then checked together by to_internal_value of subclasses."""
+
+    def validate_items(self, data: Any) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """(validated items, errors) in the order of data: an item is valid when its errors are empty."""
+        if not isinstance(data, list):
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [self.error_messages['not_a_list'].format(input_type=type(data).__name__)]}, code='not_a_list')
+
+        if not self.allow_empty and len(data) == 0:
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [self.error_messages['empty']]}, code='empty')
+
+        items: List[Dict[str, Any]] = [{} for _ in data]
+        errors: List[Dict[str, Any]] = [{} for _ in data]
+        for index, item in enumerate(data):
+            try:
+                items[index] = self.child.run_validation(item)
+            except ValidationError as exc:
+                errors[index] = exc.detail
+
+        return items, errors
+
+
+class BulkEnrollmentSerializer(BulkSerializer):
+    """
+    Validate and create a batch of enrollments.
+
+    Students, courses and their existing enrollments are loaded with one query each and the allowed period rule is checked over the whole batch.
+    Errors are reported per item, in the same order of the request body. Nothing is saved if any item is invalid.
+    """
+    child = BulkEnrollmentItemSerializer()
+    batch_size: int = 1000
+
+    def to_internal_value(self, data: Any) -> List[Dict[str, Any]]:
+        items, errors = self.validate_items(data)
+        valid: List[int] = [index for index, error in enumerate(errors) if not error]
+        students: Dict[int, Student] = Student.objects.only('id', 'birthday').in_bulk({items[i]['student'] for i in valid})
+        courses: Dict[int, Course] = Course.objects.only('id', 'level').in_bulk({items[i]['course'] for i in valid})
+
+        for index in valid:
+            if items[index]['student'] not in students:
+                errors[index]['student'] = [f"Student #{items[index]['student']} does not exist."]
+            if items[index]['course'] not in courses:
+                errors[index]['course'] = [f"Course #{items[index]['course']} does not exist."]
+
+        checked: List[int] = [index for index, error in enumerate(errors) if not error]
+        enrolled: Set[Tuple[int, int]] = set(Enrollment.objects.filter(student_id__in=students.keys(), course_id__in=courses.keys()).values_list('student_id', 'course_id'))
+        for index in checked:
+            pair: Tuple[int, int] = (items[index]['student'], items[index]['course'])
+            if pair in enrolled:
+                errors[index][api_settings.NON_FIELD_ERRORS_KEY] = [f'Student #{pair[0]} is already enrolled in course #{pair[1]}.']
+            enrolled.add(pair)
+
+        checked = [index for index, error in enumerate(errors) if not error]
+        allowed: List[bool] = validate_allowed_periods([(items[i]['period'], courses[items[i]['course']].level, students[items[i]['student']].birthday) for i in checked])
+        for index, is_allowed in zip(checked, allowed):
+            if not is_allowed:
+                item = items[index]
+                errors[index][api_settings.NON_FIELD_ERRORS_KEY] = [f"A course level {courses[item['course']].level} can'to be taught at period {item['period']} for one under legal age (born at {students[item['student']].birthday}) - course #{item['course']} for student #{item['student']}"]
+
+        if any(errors):
+            raise ValidationError(errors)
+
+        return [{'student_id': item['student'], 'course_id': item['course'], 'period': item['period']} for item in items]
+
+    def create(self, validated_data: List[Dict[str, Any]]) -> List[Enrollment]:
+        with transaction.atomic():
+            enrollments: List[Enrollment] = Enrollment.objects.bulk_create([Enrollment(**item) for item in validated_data], batch_size=self.batch_size)
+            # bulk_create does not send post_save
+            add_enrollment_counts(count_enrollments(enrollments))
+            invalidate_model(Enrollment)
+
+        return enrollments
+
+
+class BulkStudentItemSerializer(Serializer):
+    name = CharField(min_length=3, max_length=128)
+    rg = CharField(max_length=16)
+    # checked for the whole batch (validate_cpf_batch)
+    cpf = CharField(max_length=16)
+    birthday = DateField()
+    mobile = CharField(max_length=32, required=False, allow_blank=True, default='')
+    email = EmailField(min_length=13, max_length=512, required=False, allow_null=True, default=None)
+
+    validate_name = CustomStudentValidation.validate_name
+
+
+class BulkStudentSerializer(BulkSerializer):
+    """
+    Validate and create a batch of students (CSV imports).
+
+    CPFs are validated for the whole batch at once and checked for duplicates (in the batch and in the database) with one query.
+    Errors are reported per item, in the order of data. Nothing is saved if any item is invalid.
+    """
+    child = BulkStudentItemSerializer()
+    batch_size: int = 1000
+
+    def to_internal_value(self, data: Any) -> List[Dict[str, Any]]:
+        items, errors = self.validate_items(data)
+        valid: List[int] = [index for index, error in enumerate(errors) if not error]
+        for index, is_valid in zip(valid, validate_cpf_batch([items[i]['cpf'] for i in valid])):
+            if not is_valid:
+                errors[index]['cpf'] = [f"CPF {items[index]['cpf']} is invalid!!"]
+
+        checked: List[int] = [index for index, error in enumerate(errors) if not error]
+        existing: Set[str] = set(Student.objects.filter(cpf__in=[items[i]['cpf'] for i in checked]).values_list('cpf', flat=True))
+        for index in checked:
+            if items[index]['cpf'] in existing:
+                errors[index]['cpf'] = [f"Student with this CPF {items[index]['cpf']} already exists."]
+            existing.add(items[index]['cpf'])
+
+        if any(errors):
+            raise ValidationError(errors)
+
+        return items
+
+    def create(self, validated_data: List[Dict[str, Any]]) -> List[Student]:
+        with transaction.atomic():
+            students: List[Student] = Student.objects.bulk_create([Student(**item) for item in validated_data], batch_size=self.batch_size)
+            # bulk_create does not send post_save
+            invalidate_model(Student)
+
+        return students
+
+
+class JobSerializer(ModelSerializer):
+    class Meta:
+        model = Job
+        fields = ['id', 'kind', 'status', 'attempts', 'max_attempts', 'result', 'error', 'created_at', 'started_at', 'finished_at']
+        read_only_fields = fields
+
+
+class ListEnrollmentsStudentsSerializer(TimedSerializerMixin, FieldsetSerializerMixin, ModelSerializer):
     course = ReadOnlyField(source='course.description')
     period = SerializerMethodField()
     student = ReadOnlyField(source='student.name')
@@ -83,7 +249,7 @@ class ListEnrollmentsStudentsSerializer(ModelSerializer):
         return obj.get_period_display()
 
 
-class ListCoursesEnrollmentsSerializer(ModelSerializer):
+class ListCoursesEnrollmentsSerializer(TimedSerializerMixin, FieldsetSerializerMixin, ModelSerializer):
     course = ReadOnlyField(source='course.description')
     student_id = ReadOnlyField(source='student.id')
     student_name = ReadOnlyField(source='student.name')
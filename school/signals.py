@@ -0,0 +1,113 @@
+from functools import partial
+from typing import Any, Dict, Optional, Type
+
+from django.contrib.auth.models import Group, Permission, User
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Model
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from school.authentication import AUTH_CACHE_ALIAS, invalidate_user_tokens, token_cache_key
+from school.cache import invalidate_model
+from school.instrumentation import record_query
+from school.models import Course, Enrollment, Student
+from school.permissions import invalidate_permissions
+from school.photos import schedule_photo
+from school.stats import CounterKey, add_enrollment_counts
+
+
+@receiver([post_save, post_delete], sender=Student, dispatch_uid='school_invalidate_student')
+@receiver([post_save, post_delete], sender=Course, dispatch_uid='school_invalidate_course')
+@receiver([post_save, post_delete], sender=Enrollment, dispatch_uid='school_invalidate_enrollment')
+def invalidate_cached_responses(sender: Type[Model], **kwargs: Any) -> None:
+    invalidate_model(sender)
+
+
+@receiver(post_save, sender=Student, dispatch_uid='school_student_photo')
+def process_student_photo(sender: Type[Model], instance: Student, raw: bool = False, **kwargs: Any) -> None:
+    """
+    Variants of a new photo are made by the photo workers once the transaction commits. Until then the student has
+    none (clients show photo), never the variants of a replaced photo.
+    """
+    if raw:
+        return
+
+    name: str = instance.photo.name or ''
+    if instance.photo_variants.get('source', '') == name:
+        return
+
+    if instance.photo_variants:
+        instance.photo_variants = {}
+        Student.objects.filter(pk=instance.pk).update(photo_variants={})
+    if name:
+        transaction.on_commit(partial(schedule_photo, instance.pk, name))
+
+
+@receiver(pre_save, sender=Enrollment, dispatch_uid='school_enrollment_counter_previous')
+def remember_enrollment_counter(sender: Type[Model], instance: Enrollment, raw: bool = False, **kwargs: Any) -> None:
+    """Counter (course, period) of an enrollment being updated, as it is in the database."""
+    if raw or instance._state.adding:
+        return
+
+    instance._previous_counter = Enrollment.objects.filter(pk=instance.pk).values_list('course_id', 'period').first()
+
+
+@receiver(post_save, sender=Enrollment, dispatch_uid='school_enrollment_counter_save')
+def update_enrollment_counter(sender: Type[Model], instance: Enrollment, created: bool, raw: bool = False, **kwargs: Any) -> None:
+    if raw:
+        return
+
+    current: CounterKey = (instance.course_id, instance.period)
+    previous: Optional[CounterKey] = None if created else getattr(instance, '_previous_counter', None)
+    if previous == current:
+        return
+
+    counts: Dict[CounterKey, int] = {current: 1}
+    if previous is not None:
+        counts[previous] = -1
+    add_enrollment_counts(counts)
+
+
+@receiver(post_delete, sender=Enrollment, dispatch_uid='school_enrollment_counter_delete')
+def decrement_enrollment_counter(sender: Type[Model], instance: Enrollment, **kwargs: Any) -> None:
+    add_enrollment_counts({(instance.course_id, instance.period): -1})
+
+
+@receiver(m2m_changed, sender=User.groups.through, dispatch_uid='school_permissions_user_groups')
+@receiver(m2m_changed, sender=User.user_permissions.through, dispatch_uid='school_permissions_user_permissions')
+@receiver(m2m_changed, sender=Group.permissions.through, dispatch_uid='school_permissions_group_permissions')
+def invalidate_permissions_m2m(sender: Type[Model], action: str, **kwargs: Any) -> None:
+    """Either side of the relation (user.groups.add(), group.user_set.clear(), ...) makes cached permissions stale."""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_permissions()
+
+
+@receiver(post_save, sender=Permission, dispatch_uid='school_permissions_permission_save')
+@receiver(post_delete, sender=Permission, dispatch_uid='school_permissions_permission_delete')
+@receiver(post_delete, sender=Group, dispatch_uid='school_permissions_group_delete')
+def invalidate_permissions_models(sender: Type[Model], **kwargs: Any) -> None:
+    invalidate_permissions()
+
+
+@receiver(post_save, sender=User, dispatch_uid='school_auth_user_save')
+def invalidate_cached_tokens(sender: Type[Model], instance: User, update_fields: Optional[Any] = None, **kwargs: Any) -> None:
+    """Cached tokens hold their user (is_active, is_superuser...). Logins only update last_login."""
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+
+    invalidate_user_tokens(instance.pk)
+
+
+@receiver(post_delete, sender=Token, dispatch_uid='school_auth_token_delete')
+def invalidate_cached_token(sender: Type[Model], instance: Token, **kwargs: Any) -> None:
+    caches[AUTH_CACHE_ALIAS].delete(token_cache_key(instance.key))
+
+
+@receiver(connection_created, dispatch_uid='school_instrumentation_queries')
+def install_query_recorder(sender: Any, connection: Any, **kwargs: Any) -> None:
+    """Every new connection (one per thread, async views included) reports its queries to the request metrics."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
@@ -0,0 +1,105 @@
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Tuple
+
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Q, QuerySet, Value, When
+
+from school.models import Course, Enrollment, EnrollmentCounter
+
+# (course id, period name)
+CounterKey = Tuple[int, str]
+# counters per UPDATE: each one is a term of its WHERE and a WHEN of its CASE (SQLite limits the expression depth to 1000)
+COUNTER_BATCH_SIZE: int = 250
+
+
+def count_enrollments(enrollments: Iterable[Enrollment]) -> Counter:
+    return Counter((enrollment.course_id, enrollment.period) for enrollment in enrollments)
+
+
+def add_enrollment_counts(counts: Dict[CounterKey, int]) -> None:
+    """
+    Add (or subtract, with negative values) counts to the counters, atomically whatever the concurrent transactions.
+
+    One UPDATE when every counter exists (the signal path: one enrollment saved), otherwise missing counters are
+    inserted first (one INSERT ... ON CONFLICT DO NOTHING), so a batch costs two queries per COUNTER_BATCH_SIZE
+    counters whatever its size.
+    """
+    deltas: List[Tuple[CounterKey, int]] = [(key, delta) for key, delta in counts.items() if delta]
+    for start in range(0, len(deltas), COUNTER_BATCH_SIZE):
+        add_counter_deltas(dict(deltas[start:start + COUNTER_BATCH_SIZE]))
+
+
+def add_counter_deltas(deltas: Dict[CounterKey, int]) -> None:
+    condition: Q = Q()
+    for course_id, period in deltas:
+        condition |= Q(course_id=course_id, period=period)
+    counters: QuerySet = EnrollmentCounter.objects.filter(condition)
+    delta: Case = Case(*[When(course_id=course_id, period=period, then=Value(value)) for (course_id, period), value in deltas.items()], default=Value(0), output_field=IntegerField())
+
+    if len(deltas) == 1 and counters.update(total=F('total') + delta):
+        return
+
+    # only counters being incremented are created: a decremented one may belong to a course being deleted
+    EnrollmentCounter.objects.bulk_create([EnrollmentCounter(course_id=course_id, period=period, total=0) for (course_id, period), value in deltas.items() if value > 0], ignore_conflicts=True)
+    counters.update(total=F('total') + delta)
+
+
+def expected_enrollment_counts() -> Counter:
+    """Counts computed from the enrollments (full scan): source of truth for rebuild and verify."""
+    rows: QuerySet = Enrollment.objects.order_by().values_list('course_id', 'period').annotate(total=Count('id'))
+
+    return Counter({(course_id, period): total for course_id, period, total in rows})
+
+
+def stored_enrollment_counts() -> Counter:
+    return Counter({(course_id, period): total for course_id, period, total in EnrollmentCounter.objects.values_list('course_id', 'period', 'total') if total})
+
+
+def verify_enrollment_counters() -> List[str]:
+    """Differences between counters and enrollments. Empty when counters are right."""
+    expected: Counter = expected_enrollment_counts()
+    stored: Counter = stored_enrollment_counts()
+
+    return [
+        f'Course {course_id} period {period}: counter is {stored[(course_id, period)]}, enrollments are {expected[(course_id, period)]}'
+        for course_id, period in sorted(set(expected) | set(stored))
+        if expected[(course_id, period)] != stored[(course_id, period)]
+    ]
+
+
+@transaction.atomic
+def rebuild_enrollment_counters() -> int:
+    """Replace every counter by counts computed from the enrollments. Returns the number of counters."""
+    expected: Counter = expected_enrollment_counts()
+    EnrollmentCounter.objects.all().delete()
+    EnrollmentCounter.objects.bulk_create([EnrollmentCounter(course_id=course_id, period=period, total=total) for (course_id, period), total in expected.items()])
+
+    return len(expected)
+
+
+def enrollment_stats() -> Dict[str, Any]:
+    """Enrollments in total, per period, per course level and per course (with its periods). Two queries, O(courses)."""
+    periods: List[str] = [period.name for period in Enrollment.Period]
+    courses: Dict[int, Dict[str, Any]] = {
+        course['id']: {**course, 'total': 0, 'periods': dict.fromkeys(periods, 0)}
+        for course in Course.objects.order_by('course_code').values('id', 'course_code', 'description', 'level')
+    }
+    by_period: Dict[str, int] = dict.fromkeys(periods, 0)
+    by_level: Dict[str, int] = dict.fromkeys([level.name for level in Course.Level], 0)
+
+    for course_id, period, total in EnrollmentCounter.objects.values_list('course_id', 'period', 'total'):
+        course: Dict[str, Any] = courses.get(course_id)
+        if course is None:
+            # course created after the first query
+            continue
+        course['periods'][period] = course['periods'].get(period, 0) + total
+        course['total'] += total
+        by_period[period] = by_period.get(period, 0) + total
+        by_level[course['level']] = by_level.get(course['level'], 0) + total
+
+    return {
+        'total': sum(by_period.values()),
+        'by_period': by_period,
+        'by_level': by_level,
+        'courses': list(courses.values()),
+    }
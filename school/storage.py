@@ -0,0 +1,45 @@
+import hashlib
+import os
+import posixpath
+from typing import Any, Optional
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+# hex digits of sha256 kept in file names
+DIGEST_LENGTH: int = 32
+
+
+def content_digest(content: File) -> str:
+    sha = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks():
+        sha.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+
+    return sha.hexdigest()[:DIGEST_LENGTH]
+
+
+@deconstructible
+class ContentHashStorage(FileSystemStorage):
+    """
+    File system storage naming files by the sha256 of their content (photos/a1b2...png): the same upload is stored
+    once, and a name never changes content, so its url can be cached forever (see school.photos.serve_media).
+    """
+
+    def save(self, name: Optional[str], content: Any, max_length: Optional[int] = None) -> str:
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        directory, filename = posixpath.split(name.replace('\\', '/'))
+        name = posixpath.join(directory, f'{content_digest(content)}{os.path.splitext(filename)[1].lower()}')
+        if self.exists(name):
+            return name
+
+        return super().save(name, content, max_length=max_length)
@@ -0,0 +1,161 @@
+import datetime
+import hashlib
+import os
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.color import no_style
+from django.core.serializers import deserialize, serialize
+from django.db import connection
+from django.db.models import Model
+
+from school.cache import invalidate_model
+from school.models import Course, Enrollment, Student
+from school.stats import add_enrollment_counts, count_enrollments
+from seeds import FAKER_SEED, build_courses, build_enrollments, build_students
+
+
+# bump when the way datasets are built changes: snapshots of other versions are not read again
+SNAPSHOT_VERSION: int = 1
+SNAPSHOT_DIR: str = os.path.join(settings.BASE_DIR, 'school', 'fixtures', 'snapshots')
+
+# (students, courses, enrollments per course, seed)
+DatasetSpec = Tuple[int, int, int, int]
+Dataset = Tuple[List[Student], List[Course], List[Enrollment]]
+
+# snapshots read (or built) by this process: every test class of the same dataset shares one
+_snapshots: Dict[DatasetSpec, str] = {}
+
+
+def schema_fingerprint() -> str:
+    return ';'.join(f"{model._meta.label}:{','.join(field.attname for field in model._meta.concrete_fields)}" for model in (Student, Course, Enrollment))
+
+
+def snapshot_path(spec: DatasetSpec) -> str:
+    """
+    File of a dataset. Birthdays are relative to today (legal age rules), so the date is part of the name, with the
+    dataset spec, SNAPSHOT_VERSION and the model fields.
+    """
+    digest: str = hashlib.sha256(f'{SNAPSHOT_VERSION}|{spec}|{schema_fingerprint()}'.encode()).hexdigest()[:16]
+
+    return os.path.join(SNAPSHOT_DIR, f'{datetime.date.today().isoformat()}_{digest}.json')
+
+
+def build_snapshot(spec: DatasetSpec) -> str:
+    """Dataset as Django JSON, primary keys from 1 as a fresh database would give (tests read Student pk=1...)."""
+    students_total, courses_total, enrollments_per_course, seed = spec
+    students: List[Student] = build_students(total=students_total, seed=seed)
+    courses: List[Course] = build_courses(total=courses_total, seed=seed)
+    for entities in (students, courses):
+        for pk, entity in enumerate(entities, start=1):
+            entity.pk = pk
+    enrollments: List[Enrollment] = build_enrollments(total=enrollments_per_course, courses=courses, students=students, seed=seed) if enrollments_per_course else []
+    for pk, enrollment in enumerate(enrollments, start=1):
+        enrollment.pk = pk
+
+    # updated_at is set by the INSERT. Seeds build no photo: left out, it is NULL (serialized, it would be '')
+    fields: List[str] = [field.name for model in (Student, Course, Enrollment) for field in model._meta.concrete_fields if field.name not in ('updated_at', 'photo')]
+
+    return serialize('json', [*students, *courses, *enrollments], fields=fields)
+
+
+def write_snapshot(path: str, data: str) -> None:
+    """Atomic write (parallel test processes may build the same dataset). Snapshots of other days are removed."""
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    today: str = datetime.date.today().isoformat()
+    for name in os.listdir(SNAPSHOT_DIR):
+        if name.endswith('.json') and not name.startswith(today):
+            try:
+                os.remove(os.path.join(SNAPSHOT_DIR, name))
+            except FileNotFoundError:
+                pass
+
+    fd, temporary = tempfile.mkstemp(dir=SNAPSHOT_DIR, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        f.write(data)
+    os.replace(temporary, path)
+
+
+def get_snapshot(spec: DatasetSpec) -> str:
+    data: Optional[str] = _snapshots.get(spec)
+    if data is not None:
+        return data
+
+    path: str = snapshot_path(spec)
+    try:
+        with open(path) as f:
+            data = f.read()
+    except FileNotFoundError:
+        data = build_snapshot(spec)
+        try:
+            write_snapshot(path, data)
+        except OSError:
+            # read only checkout: built again next run
+            pass
+    _snapshots[spec] = data
+
+    return data
+
+
+def load_dataset(students: int, courses: int = 0, enrollments_per_course: int = 0, seed: int = FAKER_SEED) -> Dataset:
+    """
+    Insert a dataset with one bulk INSERT per model, from its snapshot: built with seeds.py once per day and kept in
+    SNAPSHOT_DIR (and in memory for the rest of the run). Sequences are reset past the inserted pks and enrollment
+    counters updated, as loaddata and signals would.
+    """
+    loaded: Dict[type, List[Model]] = {Student: [], Course: [], Enrollment: []}
+    for deserialized in deserialize('json', get_snapshot((students, courses, enrollments_per_course, seed))):
+        loaded[type(deserialized.object)].append(deserialized.object)
+
+    for model, entities in loaded.items():
+        if entities:
+            model.objects.bulk_create(entities)
+            invalidate_model(model)
+    # explicit pks do not advance sequences (Postgres): the next create() would get pk 1
+    statements: List[str] = connection.ops.sequence_reset_sql(no_style(), list(loaded))
+    if statements:
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+    add_enrollment_counts(count_enrollments(loaded[Enrollment]))
+
+    return loaded[Student], loaded[Course], loaded[Enrollment]
+
+
+class DatasetTestCaseMixin:
+    """
+    setUpTestData loading a snapshot dataset (see load_dataset) for TestCase and APITestCase: inserted once per test
+    class, rolled back after it, and each test gets its own copy of students, courses and enrollments (TestData).
+    Test classes with the same dataset_* attributes share one snapshot. With dataset_user, cls.user is a superuser
+    (admin) for the API.
+    """
+    dataset_students: int = 0
+    dataset_courses: int = 0
+    dataset_enrollments: int = 0
+    dataset_seed: int = FAKER_SEED
+    dataset_user: bool = False
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        super().setUpTestData()
+        cls.students, cls.courses, cls.enrollments = load_dataset(cls.dataset_students, cls.dataset_courses, cls.dataset_enrollments, cls.dataset_seed)
+        if cls.dataset_user:
+            cls.user = User.objects.create_superuser('admin')
+
+
+class MediaRootMixin:
+    """MEDIA_ROOT in a temporary directory for each test (uploads, photo variants, imports)."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.media_root: str = directory.name
+        media_settings = self.settings(MEDIA_ROOT=self.media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+    def media_files(self) -> int:
+        return sum(len(files) for _, _, files in os.walk(self.media_root))
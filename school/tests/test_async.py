@@ -0,0 +1,93 @@
+import base64
+from typing import Any, List
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TransactionTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from school.models import Course, Enrollment, Student
+from seeds import build_courses, build_enrollments, build_students, persist_entities
+
+
+class AsyncReadTestCase(TransactionTestCase):
+    """
+    Async routes must answer as their sync twins.
+
+    TransactionTestCase: DRF checks of async views run in a worker thread, with its own database connection, that
+    would not see the rows of a TestCase transaction.
+    """
+
+    def setUp(self) -> None:
+        caches['throttle'].clear()
+        caches['api'].clear()
+        self.addCleanup(caches['throttle'].clear)
+        self.addCleanup(caches['api'].clear)
+        self.students: List[Student] = persist_entities(entities=build_students(total=25))
+        self.courses: List[Course] = persist_entities(entities=build_courses(total=2))
+        self.enrollments: List[Enrollment] = persist_entities(entities=build_enrollments(total=5, courses=self.courses, students=list(self.students)))
+        self.client: APIClient = APIClient()
+        self.client.force_authenticate(user=User.objects.create_superuser('admin'))
+
+    def assertSameResponse(self, sync_url: str, async_url: str) -> Any:
+        sync_resp = self.client.get(sync_url)
+        async_resp = self.client.get(async_url)
+        self.assertEqual(async_resp.status_code, sync_resp.status_code, async_url)
+        self.assertEqual(async_resp.content.decode().replace('/async/', '/'), sync_resp.content.decode(), async_url)
+
+        return async_resp
+
+    def test_same_as_sync(self) -> None:
+        student: Student = self.students[0]
+        course: Course = self.courses[0]
+        enrollment: Enrollment = self.enrollments[0]
+        urls: List[str] = [
+            '?page=2', '?page=last', '?pagination=cursor', '?version=v1', '?ordering=-birthday', f"?search={student.name.split()[-1]}", f'?search={student.cpf}',
+        ]
+        for query in urls:
+            self.assertSameResponse(reverse('Students-list') + query, reverse('Students-async-list') + query)
+
+        self.assertSameResponse(reverse('Students-detail', kwargs={'pk': student.id}), reverse('Students-async-detail', kwargs={'pk': student.id}))
+        self.assertSameResponse(reverse('Courses-list'), reverse('Courses-async-list'))
+        self.assertSameResponse(reverse('Courses-detail', kwargs={'pk': course.id}), reverse('Courses-async-detail', kwargs={'pk': course.id}))
+        self.assertSameResponse(reverse('Enrollments-list'), reverse('Enrollments-async-list'))
+        self.assertSameResponse(reverse('Enrollments-detail', kwargs={'pk': enrollment.id}), reverse('Enrollments-async-detail', kwargs={'pk': enrollment.id}))
+        self.assertSameResponse(reverse('Students-enrollments', kwargs={'pk': enrollment.student_id}), reverse('Students-async-enrollments', kwargs={'pk': enrollment.student_id}))
+        self.assertSameResponse(reverse('Courses-enrollments', kwargs={'pk': course.id}), reverse('Courses-async-enrollments', kwargs={'pk': course.id}))
+
+    def test_server_timing(self) -> None:
+        """Verify if queries of async views (run in worker threads) are measured"""
+        resp = self.client.get(reverse('Students-async-list'))
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertRegex(resp['Server-Timing'], r'db;dur=[0-9.]+;desc="[1-9][0-9]* queries')
+
+    def test_cursor_pages(self) -> None:
+        resp = self.client.get(reverse('Students-async-list'), {'pagination': 'cursor'})
+        second = self.client.get(resp.json()['next'])
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(second.json()['previous']).json()['results'], resp.json()['results'])
+
+    def test_errors(self) -> None:
+        self.assertSameResponse(reverse('Students-detail', kwargs={'pk': 999999}), reverse('Students-async-detail', kwargs={'pk': 999999}))
+        self.assertSameResponse(reverse('Students-list') + '?page=99', reverse('Students-async-list') + '?page=99')
+        self.assertSameResponse(reverse('Students-list') + '?cursor=invalid', reverse('Students-async-list') + '?cursor=invalid')
+
+        self.client.force_authenticate(user=User.objects.create_user('no_permission'))
+        self.assertEqual(self.client.get(reverse('Students-async-list')).status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(user=None)
+        resp = self.client.get(reverse('Students-async-list'))
+        self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn('WWW-Authenticate', resp)
+
+    async def test_basic_auth(self) -> None:
+        """Verify if the async route runs on an event loop with basic authentication"""
+        await User.objects.acreate_superuser('basic', password='A12345678a')
+        credentials: str = base64.b64encode(b'basic:A12345678a').decode()
+        resp = await self.async_client.get(reverse('Students-async-list'), headers={'Authorization': f'Basic {credentials}'})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.json()['count'], len(self.students))
+
+        resp = await self.async_client.get(reverse('Students-async-list'), headers={'Authorization': 'Basic d3Jvbmc6d3Jvbmc='})
+        self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
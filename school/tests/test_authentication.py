@@ -1,9 +1,20 @@
+import base64
+from unittest import mock
+
 from django.contrib.auth import authenticate
+from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
+from rest_framework.authtoken.models import Token
 from rest_framework.test import APITestCase
 
+from school.permissions import CachedModelBackend
+
 
 class AuthenticationUserTestCase(APITestCase):
     def setUp(self) -> None:
@@ -29,3 +40,61 @@ class AuthenticationUserTestCase(APITestCase):
 
         self.client.force_authenticate(self.user)
         self.assertEqual(self.client.get(self.list_url).status_code, status.HTTP_200_OK)
+
+
+# a fast hasher: what is measured is how many times passwords are checked, not how long it takes
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class CachedAuthenticationTestCase(APITestCase):
+    def setUp(self) -> None:
+        caches['default'].clear()
+        caches['throttle'].clear()
+        self.addCleanup(caches['default'].clear)
+        self.addCleanup(caches['throttle'].clear)
+        self.list_url: str = reverse('Enrollments-list')
+        self.user: User = User.objects.create_user('admin', password='A12345678a')
+
+    def basic(self, password: str = 'A12345678a') -> int:
+        credentials: str = base64.b64encode(f'admin:{password}'.encode()).decode()
+
+        return self.client.get(self.list_url, HTTP_AUTHORIZATION=f'Basic {credentials}').status_code
+
+    def test_basic(self) -> None:
+        """Verify if verified basic credentials skip password hashing until the password changes"""
+        with mock.patch.object(CachedModelBackend, 'authenticate', autospec=True, side_effect=ModelBackend.authenticate) as backend:
+            self.assertEqual(self.basic(), status.HTTP_200_OK)
+            self.assertEqual(self.basic(), status.HTTP_200_OK)
+            self.assertEqual(backend.call_count, 1)
+
+            self.assertEqual(self.basic('XPTO'), status.HTTP_401_UNAUTHORIZED)
+            self.assertEqual(self.basic('XPTO'), status.HTTP_401_UNAUTHORIZED)
+            self.assertEqual(backend.call_count, 3)
+
+        self.user.set_password('B12345678b')
+        self.user.save()
+        self.assertEqual(self.basic(), status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.basic('B12345678b'), status.HTTP_200_OK)
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.basic('B12345678b'), status.HTTP_401_UNAUTHORIZED)
+
+    def test_token(self) -> None:
+        """Verify if a token from the token route authenticates with no token query, until it is deleted"""
+        resp = self.client.post(reverse('Auth-token'), data={'username': 'admin', 'password': 'A12345678a'}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {resp.json()['token']}")
+
+        self.assertEqual(self.client.get(self.list_url).status_code, status.HTTP_200_OK)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(self.list_url).status_code, status.HTTP_200_OK)
+        self.assertFalse(any('authtoken_token' in query['sql'] or 'auth_user' in query['sql'] for query in queries))
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.list_url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.user.is_active = True
+        self.user.save()
+        self.assertEqual(self.client.get(self.list_url).status_code, status.HTTP_200_OK)
+        Token.objects.filter(user=self.user).delete()
+        self.assertEqual(self.client.get(self.list_url).status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,162 @@
+from typing import Dict, List
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from school.checks import cache_backend_errors, ensure_cache_backends
+from school.models import Enrollment, Student
+from school.tests.fixtures import DatasetTestCaseMixin
+
+
+class CacheCheckTestCase(SimpleTestCase):
+    def test_reachable(self) -> None:
+        """Verify if configured (locmem) caches pass the startup check"""
+        self.assertEqual(cache_backend_errors(), [])
+        ensure_cache_backends()
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+    def test_unreachable(self) -> None:
+        """Verify if a cache that does not keep values fails loudly"""
+        errors = cache_backend_errors()
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0].id, 'school.E001')
+        with self.assertRaises(ImproperlyConfigured):
+            ensure_cache_backends()
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django_redis.cache.RedisCache', 'LOCATION': 'redis://127.0.0.1:1/1', 'OPTIONS': {'CLIENT_CLASS': 'django_redis.client.DefaultClient', 'SOCKET_CONNECT_TIMEOUT': 1}}})
+    def test_redis_down(self) -> None:
+        """Verify if a Redis server that is not running is reported"""
+        self.assertEqual(len(cache_backend_errors()), 1)
+
+
+class ResponseCacheTestCase(DatasetTestCaseMixin, APITestCase):
+    dataset_students = 30
+    dataset_courses = 3
+    dataset_enrollments = 3
+    dataset_user = True
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        super().setUpTestData()
+        cls.other_user: User = User.objects.create_superuser('other')
+
+    def setUp(self) -> None:
+        caches['api'].clear()
+        self.list_url: str = reverse('Enrollments-list')
+        enrolled = {enrollment.student_id for enrollment in self.enrollments}
+        self.not_enrolled: List[Student] = [student for student in self.students if student.id not in enrolled]
+
+    def test_hit(self) -> None:
+        """Verify if a repeated GET is answered from cache, without touching enrollments"""
+        self.client.force_authenticate(user=self.user)
+        first = self.client.get(self.list_url)
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(self.list_url)
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.json(), second.json())
+        self.assertFalse(any('school_enrollment' in query['sql'] for query in queries))
+
+    def test_per_user(self) -> None:
+        """Verify if users do not share cached responses"""
+        self.client.force_authenticate(user=self.user)
+        self.client.get(self.list_url)
+        self.client.force_authenticate(user=self.other_user)
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(self.list_url)
+
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertTrue(any('school_enrollment' in query['sql'] for query in queries))
+
+    def test_invalidation(self) -> None:
+        """Verify if a write makes the next GET see the new data"""
+        self.client.force_authenticate(user=self.user)
+        count: int = self.client.get(self.list_url).json()['count']
+
+        self.client.delete(reverse('Enrollments-detail', kwargs={'pk': self.enrollments[0].id}))
+        self.assertEqual(self.client.get(self.list_url).json()['count'], count - 1)
+
+        Enrollment(student=self.not_enrolled[0], course=self.courses[0], period=Enrollment.Period.MORNING.name).save()
+        self.assertEqual(self.client.get(self.list_url).json()['count'], count)
+
+    def test_unsafe_methods(self) -> None:
+        """Verify if POST is never answered from cache"""
+        self.client.force_authenticate(user=self.user)
+        data: Dict = {'student': self.not_enrolled[0].id, 'course': self.courses[0].id, 'period': Enrollment.Period.MORNING.name}
+        self.assertEqual(self.client.post(self.list_url, data=data, format='json').status_code, status.HTTP_201_CREATED)
+        data['student'] = self.not_enrolled[1].id
+        self.assertEqual(self.client.post(self.list_url, data=data, format='json').status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Enrollment.objects.count(), len(self.enrollments) + 2)
+
+
+class ConditionalGetTestCase(DatasetTestCaseMixin, APITestCase):
+    dataset_students = 20
+    dataset_courses = 3
+    dataset_enrollments = 3
+    dataset_user = True
+
+    def setUp(self) -> None:
+        caches['throttle'].clear()
+        caches['api'].clear()
+        self.addCleanup(caches['throttle'].clear)
+        self.addCleanup(caches['api'].clear)
+        self.client.force_authenticate(user=self.user)
+
+    def test_not_modified(self) -> None:
+        """Verify if every list and detail route answers 304 to its own ETag, with no body"""
+        # url: queries of a 304 (lists read none, details read updated_at)
+        urls: Dict[str, int] = {
+            reverse('Students-list'): 0, reverse('Students-detail', kwargs={'pk': self.students[0].id}): 1,
+            reverse('Courses-list'): 0, reverse('Courses-detail', kwargs={'pk': self.courses[0].id}): 1,
+            reverse('Enrollments-list'): 0, reverse('Enrollments-detail', kwargs={'pk': self.enrollments[0].id}): 1,
+            reverse('Students-enrollments', kwargs={'pk': self.enrollments[0].student_id}): 0,
+            reverse('Courses-enrollments', kwargs={'pk': self.courses[0].id}): 0,
+        }
+        for url, reads in urls.items():
+            resp = self.client.get(url)
+            self.assertEqual(resp.status_code, status.HTTP_200_OK, url)
+            self.assertTrue(resp.has_header('Last-Modified'), url)
+
+            with CaptureQueriesContext(connection) as queries:
+                cached = self.client.get(url, HTTP_IF_NONE_MATCH=resp['ETag'])
+            self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED, url)
+            self.assertEqual(cached.content, b'', url)
+            self.assertEqual(cached['ETag'], resp['ETag'], url)
+            self.assertEqual(len([query for query in queries if 'school_' in query['sql']]), reads, url)
+
+            self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=resp['Last-Modified']).status_code, status.HTTP_304_NOT_MODIFIED, url)
+
+    def test_changed(self) -> None:
+        """Verify if a write, another representation or another user changes the ETag"""
+        list_url: str = reverse('Students-list')
+        detail_url: str = reverse('Students-detail', kwargs={'pk': self.students[0].id})
+        other_url: str = reverse('Students-detail', kwargs={'pk': self.students[1].id})
+        list_etag: str = self.client.get(list_url)['ETag']
+        detail_etag: str = self.client.get(detail_url)['ETag']
+        other_etag: str = self.client.get(other_url)['ETag']
+
+        self.assertEqual(self.client.get(list_url + '?version=v1', HTTP_IF_NONE_MATCH=list_etag).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(list_url + '?format=api', HTTP_IF_NONE_MATCH=list_etag).status_code, status.HTTP_200_OK)
+
+        self.students[0].name = 'Changed Name'
+        self.students[0].save()
+        resp = self.client.get(detail_url, HTTP_IF_NONE_MATCH=detail_etag)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.json()['name'], 'Changed Name')
+        self.assertEqual(self.client.get(list_url, HTTP_IF_NONE_MATCH=list_etag).status_code, status.HTTP_200_OK)
+        # other rows keep their ETag
+        self.assertEqual(self.client.get(other_url, HTTP_IF_NONE_MATCH=other_etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Student.objects.get(id=self.students[1].id).delete()
+        self.assertEqual(self.client.get(other_url, HTTP_IF_NONE_MATCH=other_etag).status_code, status.HTTP_404_NOT_FOUND)
+
+        detail_etag = self.client.get(detail_url)['ETag']
+        self.client.force_authenticate(user=User.objects.create_superuser('other'))
+        self.assertEqual(self.client.get(detail_url, HTTP_IF_NONE_MATCH=detail_etag).status_code, status.HTTP_200_OK)
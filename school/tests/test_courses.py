@@ -1,5 +1,5 @@
 import random
-from typing import Dict, List
+from typing import Dict
 
 from django.test import TestCase
 from django.urls import reverse
@@ -10,13 +10,14 @@ from rest_framework.test import APITestCase
 
 from school.models import Course
 from school.serializer import CourseSerializer
-from seeds import build_courses, persist_entities
+from school.tests.fixtures import DatasetTestCaseMixin
 
 
-class CourseTestCase(APITestCase):
+class CourseTestCase(DatasetTestCaseMixin, APITestCase):
+    dataset_courses = 5
+
     def setUp(self) -> None:
         self.list_url = reverse('Courses-list')
-        self.entities: List[Course] = persist_entities(entities=build_courses(total=5))
 
     # def test_fail(self) -> None:
     #     self.fail('Failed - Just a controlled test')
@@ -25,7 +26,7 @@ class CourseTestCase(APITestCase):
         """Verify if HTTP GET is working"""
         resp = self.client.get(self.list_url)
         self.assertEqual(resp.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(self.entities), len(resp.json()['results']))
+        self.assertEqual(len(self.courses), len(resp.json()['results']))
 
 
 class CourseFixturesTestCase(TestCase):
@@ -38,9 +39,8 @@ class CourseFixturesTestCase(TestCase):
             self.assertTrue(course.id in [16, 17, 18, 19, 20])
 
 
-class CourseModelTestCase(TestCase):
-    def setUp(self) -> None:
-        self.entities: List[Course] = persist_entities(entities=build_courses(total=5))
+class CourseModelTestCase(DatasetTestCaseMixin, TestCase):
+    dataset_courses = 5
 
     def test_update(self) -> None:
         fake = Faker('pt_BR')
@@ -55,11 +55,11 @@ class CourseModelTestCase(TestCase):
         self.assertNotEqual(course_control.description, course_from_db.description)
 
 
-class CourseSerializerTestCase(TestCase):
-    def setUp(self) -> None:
-        self.entities: List[Course] = persist_entities(entities=build_courses(total=5))
+class CourseSerializerTestCase(DatasetTestCaseMixin, TestCase):
+    dataset_courses = 5
 
-        self.entity: Course = random.sample(self.entities, 1)[0]
+    def setUp(self) -> None:
+        self.entity: Course = random.sample(self.courses, 1)[0]
         self.serializer = CourseSerializer(instance=self.entity)
 
     def test_serialized_fields(self) -> None:
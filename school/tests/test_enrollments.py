@@ -1,26 +1,35 @@
 from typing import Dict, List
+import csv
+import io
+import json
 import random
+import warnings
 
-from django.contrib.auth.models import User
+from asgiref.sync import async_to_sync
+from django.db import connection
 from django.urls import reverse
-from django.test import TestCase
+from django.test import AsyncRequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
 from faker import Faker
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.test import APITestCase, force_authenticate
 
-from seeds import build_courses, build_students, build_enrollments, persist_entities
+from seeds import build_courses, build_students, persist_entities
 from school.models import Student, Course, Enrollment
 from school.serializer import EnrollmentSerializer
+from school.views import EnrollmentViewSet
+from school.tests.fixtures import DatasetTestCaseMixin
+from school.tests.utils import QueryCountGuardMixin
 
 
-class EnrollmentTestCase(APITestCase):
+class EnrollmentTestCase(DatasetTestCaseMixin, APITestCase):
+    dataset_students = 200
+    dataset_courses = 5
+    dataset_enrollments = 3
+    dataset_user = True
+
     def setUp(self) -> None:
         self.list_url = reverse('Enrollments-list')
-        self.user = User.objects.create_superuser("admin")
-
-        self.students: List[Student] = persist_entities(entities=build_students(total=200))
-        self.courses: List[Course] = persist_entities(entities=build_courses(total=5))
-        self.enrollments: List[Enrollment] = persist_entities(entities=build_enrollments(total=3))
 
     def test_list(self) -> None:
         """Verify if api can list entities"""
@@ -50,7 +59,8 @@ class EnrollmentTestCase(APITestCase):
         enrollments: List[Enrollment] = self.enrollments
         enrollment_01: Enrollment = random.sample(self.enrollments, 1)[0]
         enrollments.remove(enrollment_01)
-        enrollment_02: Enrollment = random.sample(self.enrollments, 1)[0]
+        # a student can be enrolled only once in a course
+        enrollment_02: Enrollment = random.sample([e for e in self.enrollments if e.course_id != enrollment_01.course_id], 1)[0]
         enrollments.remove(enrollment_02)
 
         data = {
@@ -114,11 +124,159 @@ class EnrollmentTestCase(APITestCase):
         self.assertEqual(len(list(enrollment_persisted)), 0)
 
 
-class EnrollmentModelTestCase(TestCase):
+class EnrollmentBulkTestCase(DatasetTestCaseMixin, APITestCase):
+    dataset_students = 50
+    dataset_courses = 5
+    dataset_user = True
+
     def setUp(self) -> None:
-        self.students: List[Student] = persist_entities(entities=build_students(total=200))
-        self.courses: List[Course] = persist_entities(entities=build_courses(total=5))
-        self.enrollments: List[Enrollment] = persist_entities(entities=build_enrollments(total=3))
+        self.bulk_url = reverse('Enrollments-bulk')
+        self.client.force_authenticate(user=self.user)
+
+    def test_post(self) -> None:
+        """Verify if a batch is saved with a constant number of queries"""
+        for course in self.courses:
+            course.level = Course.Level.EXPERT.name
+            course.save()
+
+        data: List[Dict] = [{'student': student.id, 'course': random.choice(self.courses).id, 'period': random.choice([e.name for e in Enrollment.Period])} for student in self.students]
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.post(self.bulk_url, data=data, format='json')
+
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(resp.json()), len(self.students))
+        self.assertEqual(Enrollment.objects.count(), len(self.students))
+        # and 2 for enrollment counters
+        self.assertLessEqual(len(queries), 8)
+
+    def test_post_invalid(self) -> None:
+        """Verify if errors are reported per item and nothing is saved"""
+        fake: Faker = Faker('pt_BR')
+        Faker.seed(33)
+        underage: Student = self.students[0]
+        underage.birthday = fake.date_between(start_date='-17y', end_date='today')
+        underage.save()
+        basic: Course = self.courses[0]
+        basic.level = Course.Level.BASIC.name
+        basic.save()
+
+        data: List[Dict] = [
+            {'student': self.students[1].id, 'course': basic.id, 'period': 'MORNING'},
+            {'student': underage.id, 'course': basic.id, 'period': 'NIGHT'},
+            {'student': 999999, 'course': basic.id, 'period': 'MORNING'},
+            {'student': self.students[2].id, 'course': basic.id, 'period': 'MIDNIGHT'},
+            {'student': self.students[1].id, 'course': basic.id, 'period': 'AFTERNOON'},
+        ]
+        resp = self.client.post(self.bulk_url, data=data, format='json')
+
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        errors: List[Dict] = resp.json()['errors']
+        self.assertEqual(len(errors), len(data))
+        self.assertEqual(errors[0], {})
+        self.assertEqual(list(errors[1].keys()), ['non_field_errors'])
+        self.assertEqual(list(errors[2].keys()), ['student'])
+        self.assertEqual(list(errors[3].keys()), ['period'])
+        self.assertEqual(list(errors[4].keys()), ['non_field_errors'])
+        self.assertEqual(Enrollment.objects.count(), 0)
+
+
+class EnrollmentNestedListTestCase(QueryCountGuardMixin, DatasetTestCaseMixin, APITestCase):
+    dataset_students = 20
+    dataset_courses = 2
+    dataset_user = True
+
+    def setUp(self) -> None:
+        self.client.force_authenticate(user=self.user)
+
+    def enroll(self, course: Course, students: List[Student]) -> None:
+        persist_entities(entities=[Enrollment(course=course, student=student, period=Enrollment.Period.MORNING.name) for student in students])
+
+    def test_list_courses_enrollments(self) -> None:
+        """Verify if listing enrollments by course does not run one query per row"""
+        course: Course = self.courses[0]
+        self.enroll(course=course, students=self.students[0:2])
+        url: str = reverse('Courses-enrollments', kwargs={'pk': course.id})
+
+        self.assertQueriesDoNotGrow(url, grow=lambda: self.enroll(course=course, students=self.students[2:10]))
+
+    def test_list_enrollments_students(self) -> None:
+        """Verify if listing enrollments by student does not run one query per row"""
+        student: Student = self.students[0]
+        self.enroll(course=self.courses[0], students=[student])
+        url: str = reverse('Students-enrollments', kwargs={'pk': student.id})
+
+        self.assertQueriesDoNotGrow(url, grow=lambda: self.enroll(course=self.courses[1], students=[student]))
+
+
+class EnrollmentExportTestCase(DatasetTestCaseMixin, APITestCase):
+    dataset_students = 60
+    dataset_courses = 2
+    dataset_enrollments = 25
+    dataset_user = True
+
+    def setUp(self) -> None:
+        self.client.force_authenticate(user=self.user)
+
+    def test_csv(self) -> None:
+        """Verify if the whole roster of a course is streamed as CSV, not paginated"""
+        course: Course = self.courses[0]
+        resp = self.client.get(reverse('Courses-enrollments', kwargs={'pk': course.id}), {'export': 'csv'})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertTrue(resp.streaming)
+        self.assertEqual(resp['Content-Disposition'], f'attachment; filename="course-{course.id}-enrollments.csv"')
+
+        rows: List[List[str]] = list(csv.reader(io.StringIO(b''.join(resp.streaming_content).decode())))
+        self.assertEqual(rows[0], ['course', 'student_id', 'student_name', 'student_cpf', 'student_rg', 'student_birthday', 'student_mobile', 'student_email'])
+        self.assertEqual(len(rows) - 1, 25)
+        first: Enrollment = Enrollment.objects.filter(course=course).order_by('id').first()
+        self.assertEqual(rows[1], [course.description, str(first.student.id), first.student.name, first.student.cpf, first.student.rg, str(first.student.birthday), first.student.mobile, first.student.email])
+
+    def test_ndjson(self) -> None:
+        """Verify if all enrollments are streamed as one JSON object per line"""
+        resp = self.client.get(reverse('Enrollments-list'), {'export': 'ndjson'})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+        lines: List[Dict] = [json.loads(line) for line in b''.join(resp.streaming_content).decode().splitlines()]
+        self.assertEqual(len(lines), len(self.enrollments))
+        self.assertEqual(set(lines[0].keys()), {'id', 'student', 'course', 'period'})
+
+    def test_asgi(self) -> None:
+        """Verify if ASGI requests get the export as an async iterator, that Django does not buffer"""
+        request = AsyncRequestFactory().get(reverse('Enrollments-list'), {'export': 'ndjson'})
+        force_authenticate(request, user=self.user)
+        resp = EnrollmentViewSet.as_view({'get': 'list'})(request)
+        self.assertTrue(resp.is_async)
+
+        async def read() -> bytes:
+            return b''.join([part async for part in resp])
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            lines: List[str] = async_to_sync(read)().decode().splitlines()
+        self.assertEqual(len(lines), len(self.enrollments))
+
+    def test_fieldset(self) -> None:
+        """Verify if ?fields= restricts the list, its joins and the export"""
+        url: str = reverse('Courses-enrollments', kwargs={'pk': self.courses[0].id})
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(url, {'fields': 'student_id,student_name'})
+        self.assertEqual(list(resp.json()['results'][0]), ['student_id', 'student_name'])
+        self.assertNotIn('school_course', queries.captured_queries[-1]['sql'])
+        self.assertNotIn('"school_student"."email"', queries.captured_queries[-1]['sql'])
+
+        resp = self.client.get(url, {'omit': 'student_email,student_mobile', 'export': 'csv'})
+        header: List[str] = next(csv.reader(io.StringIO(b''.join(resp.streaming_content).decode())))
+        self.assertEqual(header, ['course', 'student_id', 'student_name', 'student_cpf', 'student_rg', 'student_birthday'])
+
+    def test_invalid_format(self) -> None:
+        resp = self.client.get(reverse('Enrollments-list'), {'export': 'xls'})
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class EnrollmentModelTestCase(DatasetTestCaseMixin, TestCase):
+    dataset_students = 200
+    dataset_courses = 5
+    dataset_enrollments = 3
 
     def test_create(self) -> None:
         student: Student = build_students(total=1)[0]
@@ -139,12 +297,12 @@ class EnrollmentModelTestCase(TestCase):
         self.assertEqual(len(control), 0)
 
 
-class EnrollmentSerializerTestCase(TestCase):
-    def setUp(self) -> None:
-        self.students: List[Student] = persist_entities(entities=build_students(total=30))
-        self.courses: List[Course] = persist_entities(entities=build_courses(total=5))
-        self.enrollments: List[Enrollment] = persist_entities(entities=build_enrollments(total=5))
+class EnrollmentSerializerTestCase(DatasetTestCaseMixin, TestCase):
+    dataset_students = 30
+    dataset_courses = 5
+    dataset_enrollments = 5
 
+    def setUp(self) -> None:
         self.enrollment: Enrollment = random.sample(self.enrollments, 1)[0]
         self.serializer = EnrollmentSerializer(instance=self.enrollment)
 
@@ -162,7 +320,15 @@ class EnrollmentSerializerTestCase(TestCase):
         fake: Faker = Faker('pt_BR')
         Faker.seed(33)
 
-        valid_serializer: EnrollmentSerializer = EnrollmentSerializer(data=self.serializer.data)
+        invalid_serializer: EnrollmentSerializer = EnrollmentSerializer(data=self.serializer.data)
+        self.assertFalse(invalid_serializer.is_valid())
+        self.assertEqual(invalid_serializer.errors['non_field_errors'][0].code, 'unique')
+
+        enrolled = {enrollment.student_id for enrollment in self.enrollments}
+        valid_data: Dict = dict(self.serializer.data)
+        valid_data['student'] = random.choice([student.id for student in self.students if student.id not in enrolled])
+        valid_data['period'] = Enrollment.Period.MORNING.name
+        valid_serializer: EnrollmentSerializer = EnrollmentSerializer(data=valid_data)
         self.assertTrue(valid_serializer.is_valid())
         self.assertEqual(len(valid_serializer.errors), 0)
 
@@ -188,7 +354,7 @@ class EnrollmentSerializerTestCase(TestCase):
         self.assertEqual(invalid_serializer.errors['student'][0].code, 'incorrect_type')
         self.assertEqual(invalid_serializer.errors['course'][0].code, 'incorrect_type')
 
-        invalid_student: Student = random.sample(self.students, 1)[0]
+        invalid_student: Student = random.sample([student for student in self.students if student.id not in enrolled], 1)[0]
         invalid_student.birthday = fake.date_between(start_date='-17y', end_date='today')
         invalid_student.save()
         invalid_course: Course = random.sample(self.courses, 1)[0]
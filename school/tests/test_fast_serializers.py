@@ -0,0 +1,76 @@
+from typing import List
+from unittest import mock
+
+from django.core.cache import caches
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from school.fast_serializers import FAST_SERIALIZERS
+from school.models import Course, Enrollment, Student
+from school.tests.fixtures import DatasetTestCaseMixin
+
+
+class FastSerializerTestCase(DatasetTestCaseMixin, APITestCase):
+    """Fast serializers must render the same bytes as the serializers they replace."""
+    dataset_students = 40
+    dataset_courses = 3
+    dataset_enrollments = 12
+    dataset_user = True
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        super().setUpTestData()
+        cls.students[0].photo = 'photos/student.png'
+        cls.students[0].photo_variants = {'source': 'photos/student.png', 'thumbnail': 'photos/variants/student.webp'}
+        cls.students[0].save()
+        cls.students[1].email = None
+        cls.students[1].save()
+
+    def setUp(self) -> None:
+        caches['throttle'].clear()
+        caches['api'].clear()
+        self.addCleanup(caches['throttle'].clear)
+        self.addCleanup(caches['api'].clear)
+        self.client.force_authenticate(user=self.user)
+
+    def test_field_maps(self) -> None:
+        request = APIRequestFactory().get('/')
+        querysets = {
+            Student: Student.objects.order_by('id'),
+            Course: Course.objects.order_by('id'),
+            Enrollment: Enrollment.objects.select_related('student', 'course').order_by('id'),
+        }
+        for serializer_class, fast in FAST_SERIALIZERS.items():
+            queryset = querysets[serializer_class.Meta.model]
+            expected: bytes = JSONRenderer().render(serializer_class(queryset, many=True, context={'request': request}).data)
+            self.assertEqual(JSONRenderer().render(fast.serialize(fast.values(queryset), request)), expected, serializer_class.__name__)
+
+    def test_list_responses(self) -> None:
+        """Verify if every list route answers the same with and without fast serializers"""
+        enrollment: Enrollment = self.enrollments[0]
+        urls: List[str] = [reverse('Students-list') + f'?version={version}' for version in ('v1', 'v2', 'v3', 'v4')]
+        urls += [
+            reverse('Students-list') + '?pagination=cursor&ordering=-birthday',
+            reverse('Students-list') + f"?search={self.students[2].name.split()[0]}&fields=id,name",
+            reverse('Courses-list'),
+            reverse('Enrollments-list') + '?omit=student',
+            reverse('Enrollments-list') + '?pagination=cursor',
+            reverse('Students-enrollments', kwargs={'pk': enrollment.student_id}),
+            reverse('Courses-enrollments', kwargs={'pk': enrollment.course_id}) + '?page=2',
+            reverse('Courses-async-enrollments', kwargs={'pk': enrollment.course_id}),
+            reverse('Students-async-list') + '?version=v3',
+        ]
+        for url in urls:
+            # 3 requests per url: keep under the user throttle rate
+            caches['throttle'].clear()
+            fast = self.client.get(url)
+            caches['api'].clear()
+            with mock.patch.dict(FAST_SERIALIZERS, clear=True):
+                slow = self.client.get(url)
+            caches['api'].clear()
+
+            self.assertEqual(fast.status_code, 200, url)
+            self.assertEqual(fast.content, slow.content, url)
+            if fast.json().get('next'):
+                self.assertEqual(self.client.get(fast.json()['next']).status_code, 200, url)
@@ -0,0 +1,117 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from typing import Dict, List
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase
+
+from school.fixture_streams import iter_json_array, split_path, zstandard
+from school.models import Course, Enrollment, Student
+from school.stats import verify_enrollment_counters
+from school.tests.fixtures import DatasetTestCaseMixin
+
+
+class FixtureStreamTestCase(SimpleTestCase):
+    def test_json_array(self) -> None:
+        """Verify if objects of a JSON array are decoded one at a time, whatever the reads cut"""
+        with open('school/fixtures/students.json') as f:
+            expected: List[Dict] = json.load(f)
+        for read_size in [1, 7, 4096]:
+            with open('school/fixtures/students.json') as f:
+                self.assertEqual(list(iter_json_array(f, read_size=read_size)), expected)
+
+        self.assertEqual(list(iter_json_array(io.StringIO('[]'))), [])
+        for invalid in ['{"pk": 1}', '[{"pk": 1}', '[{"pk": 1}, {"pk": ]']:
+            with self.assertRaises(ValueError):
+                list(iter_json_array(io.StringIO(invalid), read_size=4))
+
+    def test_split_path(self) -> None:
+        self.assertEqual(split_path('school.ndjson.gz'), ('ndjson', '.gz'))
+        self.assertEqual(split_path('school.jsonl.zst'), ('ndjson', '.zst'))
+        self.assertEqual(split_path('school/fixtures/students.json'), ('json', ''))
+        self.assertEqual(split_path('school.csv'), ('', ''))
+
+
+class FixtureCommandsTestCase(DatasetTestCaseMixin, TestCase):
+    dataset_students = 30
+    dataset_courses = 3
+    dataset_enrollments = 5
+
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory: str = directory.name
+
+    def call(self, name: str, *args: str) -> str:
+        stderr = io.StringIO()
+        call_command(name, *args, '--batch-size', '7', '--progress-every', '10', stderr=stderr)
+
+        return stderr.getvalue()
+
+    def assertRoundTrip(self, filename: str) -> None:
+        path: str = os.path.join(self.directory, filename)
+        expected: List[List[Dict]] = [list(model.objects.order_by('pk').values()) for model in (Student, Course, Enrollment)]
+        output: str = self.call('dump_fixtures', '--output', path)
+        self.assertIn('school.student: 30 rows', output)
+
+        Student.objects.all().delete()
+        Course.objects.all().delete()
+        output = self.call('load_fixtures', path)
+        self.assertIn('Loaded 48 rows (30 school.student, 3 school.course, 15 school.enrollment)', output)
+        self.assertIn('30 rows (', output)
+
+        loaded: List[List[Dict]] = [list(model.objects.order_by('pk').values()) for model in (Student, Course, Enrollment)]
+        for rows in expected + loaded:
+            for row in rows:
+                del row['updated_at']
+        self.assertEqual(loaded, expected)
+        self.assertEqual(verify_enrollment_counters(), [])
+
+    def test_round_trip(self) -> None:
+        """Verify if dumped rows load back as they were, NDJSON and JSON array, plain and compressed"""
+        for filename in ['school.ndjson', 'school.ndjson.gz', 'school.json.gz']:
+            with self.subTest(filename):
+                self.assertRoundTrip(filename)
+
+    @unittest.skipIf(zstandard is None, 'zstandard is not installed')
+    def test_zstd(self) -> None:
+        self.assertRoundTrip('school.jsonl.zst')
+
+    def test_repo_fixtures(self) -> None:
+        """Verify if the JSON fixtures of school/fixtures load, as upserts: loading twice changes nothing"""
+        for _ in range(2):
+            self.call('load_fixtures', 'school/fixtures/courses.json', 'school/fixtures/students.json')
+            self.assertEqual(Course.objects.filter(pk__range=(16, 20)).count(), 5)
+            self.assertEqual(Student.objects.filter(pk__range=(101, 150)).count(), 50)
+
+        self.assertEqual(Student.objects.get(pk=101).name, 'Ana Beatriz Lima')
+        self.assertEqual(Student.objects.create(name='Next', rg='123456789', cpf='52998224725', birthday='2000-01-01').pk, 151)
+
+    def test_errors(self) -> None:
+        with self.assertRaises(CommandError):
+            self.call('load_fixtures', os.path.join(self.directory, 'school.csv'))
+        broken: str = os.path.join(self.directory, 'broken.ndjson')
+        with open(broken, 'w') as f:
+            f.write('{"model": "school.course", "pk": 1, "fields": {"course_code": "A10-1"}}\n{"model": \n')
+        with self.assertRaises(CommandError):
+            self.call('load_fixtures', broken)
+
+    def test_failed_partway(self) -> None:
+        """Verify if counters and sequences follow the batches committed before a load fails"""
+        enrolled: List[int] = [enrollment.student_id for enrollment in self.enrollments]
+        students: List[int] = [student.pk for student in self.students if student.pk not in enrolled][:8]
+        # the 8th row (second batch) enrolls a student twice in a course
+        rows: List[Dict] = [{'model': 'school.enrollment', 'pk': 1000 + index, 'fields': {'student': pk, 'course': self.courses[0].pk, 'period': 'MORNING'}} for index, pk in enumerate(students[:7])]
+        rows.append({'model': 'school.enrollment', 'pk': 2000, 'fields': {'student': enrolled[0], 'course': self.enrollments[0].course_id, 'period': 'MORNING'}})
+        path: str = os.path.join(self.directory, 'partial.ndjson')
+        with open(path, 'w') as f:
+            f.write(''.join(f'{json.dumps(row)}\n' for row in rows))
+
+        with self.assertRaises(CommandError):
+            self.call('load_fixtures', path)
+        self.assertEqual(Enrollment.objects.filter(pk__gte=1000).count(), 7)
+        self.assertEqual(verify_enrollment_counters(), [])
+        self.assertGreater(Enrollment.objects.create(student_id=students[7], course=self.courses[0], period='MORNING').pk, 1006)
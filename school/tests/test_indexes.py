@@ -0,0 +1,65 @@
+import re
+import unittest
+from typing import Dict, List
+
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from school.tests.fixtures import DatasetTestCaseMixin
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN output is SQLite specific')
+class IndexUsageTestCase(DatasetTestCaseMixin, APITestCase):
+    """Main query (the paginated SELECT) of each list endpoint must be answered by an index: no full scan and no temp b-tree for ORDER BY."""
+    dataset_students = 30
+    dataset_courses = 3
+    dataset_enrollments = 5
+    dataset_user = True
+
+    def setUp(self) -> None:
+        caches['api'].clear()
+        caches['throttle'].clear()
+        self.addCleanup(caches['throttle'].clear)
+        self.client.force_authenticate(user=self.user)
+
+    def query_plan(self, url: str, table: str) -> str:
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+        main: List[Dict] = [query for query in queries if re.match(rf'SELECT .* FROM "{table}"', query['sql']) and 'LIMIT' in query['sql'] and 'COUNT(' not in query['sql']]
+        self.assertEqual(len(main), 1, f'Main query of {url} not found')
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {main[0]['sql']}")
+            return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+
+    def assertUsesIndex(self, url: str, table: str, sorts_matches: bool = False) -> None:
+        """sorts_matches: rows found by index lookups (search) may be sorted in memory."""
+        plan: str = self.query_plan(url, table)
+        self.assertTrue(re.search(r'USING (COVERING )?INDEX|USING INTEGER PRIMARY KEY', plan), f'{url} does not use an index:\n{plan}')
+        self.assertIsNone(re.search(rf'SCAN {table}$', plan, re.MULTILINE), f'{url} runs a full scan:\n{plan}')
+        if not sorts_matches:
+            self.assertNotIn('USE TEMP B-TREE FOR ORDER BY', plan, f'{url} sorts without index:\n{plan}')
+
+    def test_students(self) -> None:
+        self.assertUsesIndex(reverse('Students-list'), 'school_student')
+        self.assertUsesIndex(f"{reverse('Students-list')}?ordering=birthday", 'school_student')
+        self.assertUsesIndex(f"{reverse('Students-list')}?search={self.students[0].cpf}", 'school_student', sorts_matches=True)
+
+        # ranked search sorts only the matches found in the full text index
+        plan: str = self.query_plan(f"{reverse('Students-list')}?search={self.students[0].name.split()[-1]}", 'school_student')
+        self.assertIn('school_student_fts VIRTUAL TABLE INDEX', plan)
+        self.assertIn('USING INTEGER PRIMARY KEY', plan)
+
+    def test_courses(self) -> None:
+        self.assertUsesIndex(reverse('Courses-list'), 'school_course')
+        self.assertUsesIndex(f"{reverse('Courses-list')}?ordering=level", 'school_course')
+
+    def test_enrollments(self) -> None:
+        self.assertUsesIndex(reverse('Enrollments-list'), 'school_enrollment')
+        self.assertUsesIndex(reverse('Courses-enrollments', kwargs={'pk': self.courses[0].id}), 'school_enrollment')
+        self.assertUsesIndex(reverse('Students-enrollments', kwargs={'pk': self.enrollments[0].student_id}), 'school_enrollment')
@@ -0,0 +1,105 @@
+import re
+from typing import Dict, List
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from school.instrumentation import REGISTRY, MetricsRegistry, RequestMetrics
+from school.models import Student
+from seeds import build_students, persist_entities
+
+
+def parse_server_timing(header: str) -> Dict[str, Dict[str, str]]:
+    metrics: Dict[str, Dict[str, str]] = {}
+    for metric in header.split(', '):
+        name, *params = metric.split(';')
+        metrics[name] = dict(param.split('=', 1) for param in params)
+
+    return metrics
+
+
+class RequestMetricsTestCase(SimpleTestCase):
+    def test_duplicates(self) -> None:
+        """Verify if only a query with the same SQL and parameters of an earlier one is a duplicate"""
+        metrics = RequestMetrics()
+        for params in [(1,), (2,), (1,), (1,)]:
+            metrics.add_query('SELECT 1 WHERE id = %s', params, 0.001)
+        metrics.add_query('SELECT 2 WHERE id = %s', (1,), 0.001)
+
+        self.assertEqual(len(metrics.queries), 5)
+        self.assertEqual(metrics.duplicates, 2)
+        self.assertAlmostEqual(metrics.db_time, 0.005)
+
+
+class InstrumentationTestCase(APITestCase):
+    def setUp(self) -> None:
+        caches['throttle'].clear()
+        caches['api'].clear()
+        self.addCleanup(caches['throttle'].clear)
+        self.addCleanup(caches['api'].clear)
+        REGISTRY.clear()
+        self.addCleanup(REGISTRY.clear)
+        self.admin: User = User.objects.create_superuser('admin')
+        self.client.force_authenticate(user=self.admin)
+        self.students: List[Student] = persist_entities(entities=build_students(total=12))
+
+    def test_server_timing(self) -> None:
+        """Verify if Server-Timing tells the queries of the request, and the time of DRF and fast serializers"""
+        for url in [reverse('Students-detail', kwargs={'pk': self.students[0].id}), reverse('Students-list') + '?version=v1']:
+            with CaptureQueriesContext(connection) as queries:
+                resp = self.client.get(url)
+            self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+            timing: Dict[str, Dict[str, str]] = parse_server_timing(resp['Server-Timing'])
+            self.assertEqual(set(timing), {'total', 'db', 'serializer'})
+            self.assertEqual(timing['db']['desc'], f'"{len(queries)} queries (0 duplicates)"')
+            self.assertGreater(float(timing['serializer']['dur']), 0)
+            self.assertGreaterEqual(float(timing['total']['dur']), float(timing['db']['dur']) + float(timing['serializer']['dur']))
+
+    @override_settings(SLOW_REQUEST_MS=0)
+    def test_slow_request_log(self) -> None:
+        """Verify if a request above SLOW_REQUEST_MS is logged with its SQL"""
+        with self.assertLogs('school.instrumentation', 'WARNING') as logs:
+            self.client.get(reverse('Students-list'), {'search': self.students[0].cpf})
+
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('Slow request GET /school/students/?search=', logs.output[0])
+        self.assertIn('FROM "school_student"', logs.output[0])
+        self.assertIn(self.students[0].cpf, logs.output[0])
+
+    def test_metrics(self) -> None:
+        """Verify if the metrics endpoint counts requests per view and API version, for admin users only"""
+        for version in ['v1', 'v1', 'V2', 'v9']:
+            self.client.get(reverse('Students-list'), {'version': version})
+        self.client.get(reverse('Courses-list'))
+
+        resp = self.client.get(reverse('Metrics'))
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        text: str = resp.content.decode()
+        self.assertIn('school_requests_total{view="Students-list",version="v1"} 2', text)
+        self.assertIn('school_requests_total{view="Students-list",version="v2"} 1', text)
+        self.assertIn('school_requests_total{view="Students-list",version="default"} 1', text)
+        self.assertIn('school_request_duration_seconds_count{view="Courses-list",version="default"} 1', text)
+        self.assertIn('school_request_duration_seconds_bucket{view="Courses-list",version="default",le="+Inf"} 1', text)
+        self.assertRegex(text, re.compile(r'^school_db_queries_total\{view="Students-list",version="v1"\} [1-9]', re.MULTILINE))
+
+        self.client.force_authenticate(user=User.objects.create_user('staff'))
+        self.assertEqual(self.client.get(reverse('Metrics')).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_shared_totals(self) -> None:
+        """Verify if totals are read from the metrics cache alias, not the memory of the registry that counted them"""
+        self.client.get(reverse('Courses-list'))
+        # the registry of another worker process, sharing the cache
+        other: MetricsRegistry = MetricsRegistry()
+        self.assertEqual(other.snapshot()[('Courses-list', 'default')]['requests'], 1)
+        self.assertEqual(other.snapshot(), REGISTRY.snapshot())
+
+        other.clear()
+        self.assertEqual(REGISTRY.snapshot(), {})
@@ -0,0 +1,242 @@
+import datetime
+import io
+from typing import Dict, List
+from unittest import mock
+
+from django.contrib.auth.models import Permission, User
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from validate_docbr import CPF
+
+from school import imports
+from school.jobs import JOB_HANDLERS, JobFailed, JobLost, claim_job, enqueue, finish_job, job_handler, requeue_stale_jobs, retry_job, run_job, run_worker, save_progress
+from school.models import Enrollment, Job, Student
+from school.stats import verify_enrollment_counters
+from school.tests.fixtures import DatasetTestCaseMixin, MediaRootMixin
+
+
+def students_csv(rows: List[str]) -> SimpleUploadedFile:
+    return SimpleUploadedFile('students.csv', '\n'.join(['name,rg,cpf,birthday,mobile,email', *rows]).encode(), 'text/csv')
+
+
+class JobQueueTestCase(TestCase):
+    def setUp(self) -> None:
+        @job_handler('test_flaky')
+        def flaky(job: Job) -> Dict:
+            if job.attempts < job.payload['succeed_at']:
+                raise ConnectionError('database went away')
+            return {'attempts': job.attempts}
+
+        @job_handler('test_invalid')
+        def invalid(job: Job) -> None:
+            raise JobFailed('bad input')
+
+        self.addCleanup(JOB_HANDLERS.pop, 'test_flaky')
+        self.addCleanup(JOB_HANDLERS.pop, 'test_invalid')
+
+    def test_retries(self) -> None:
+        """Verify if a failing job is retried later, up to its max attempts"""
+        succeeding: Job = enqueue('test_flaky', {'succeed_at': 2})
+        failing: Job = enqueue('test_flaky', {'succeed_at': 9}, max_attempts=3)
+        with self.settings(JOB_RETRY_DELAY=0), self.assertLogs('school.jobs', 'WARNING'):
+            self.assertEqual(run_worker(once=True), 5)
+
+        succeeding.refresh_from_db()
+        self.assertEqual((succeeding.status, succeeding.attempts, succeeding.result), ('SUCCEEDED', 2, {'attempts': 2}))
+        failing.refresh_from_db()
+        self.assertEqual((failing.status, failing.attempts, failing.error), ('FAILED', 3, 'ConnectionError: database went away'))
+
+    def test_retry_delay(self) -> None:
+        job: Job = enqueue('test_flaky', {'succeed_at': 2})
+        with self.assertLogs('school.jobs', 'WARNING'):
+            self.assertEqual(run_worker(once=True), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'PENDING')
+        self.assertGreater(job.run_after, timezone.now())
+        # not ready yet
+        self.assertEqual(run_worker(once=True), 0)
+
+    def test_job_failed(self) -> None:
+        """Verify if JobFailed fails a job at once"""
+        job: Job = enqueue('test_invalid', {})
+        run_worker(once=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.error), ('FAILED', 1, 'bad input'))
+
+    def test_claim(self) -> None:
+        """Verify if a job is claimed by one worker only"""
+        job: Job = enqueue('test_flaky', {'succeed_at': 1})
+        self.assertEqual(claim_job('first').pk, job.pk)
+        self.assertIsNone(claim_job('second'))
+        self.assertEqual(Job.objects.get(pk=job.pk).worker, 'first')
+
+    def test_stale(self) -> None:
+        """Verify if jobs of dead workers are queued again, or failed without attempts left"""
+        requeued: Job = enqueue('test_flaky', {'succeed_at': 1})
+        failed: Job = enqueue('test_flaky', {'succeed_at': 1}, max_attempts=1)
+        for _ in range(2):
+            claim_job('dead')
+        Job.objects.update(started_at=timezone.now() - datetime.timedelta(hours=2))
+        with self.settings(JOB_TIMEOUT=3600), self.assertLogs('school.jobs', 'WARNING'):
+            self.assertEqual(requeue_stale_jobs(), 2)
+        self.assertEqual(Job.objects.get(pk=requeued.pk).status, 'PENDING')
+        self.assertEqual(Job.objects.get(pk=failed.pk).status, 'FAILED')
+
+    def test_progress_heartbeat(self) -> None:
+        """Verify if a job saving its progress is not stale, however long ago it started"""
+        enqueue('test_flaky', {'succeed_at': 1})
+        job: Job = claim_job('slow')
+        Job.objects.update(started_at=timezone.now() - datetime.timedelta(hours=2))
+        save_progress(job, {'rows': 1000})
+        with self.settings(JOB_TIMEOUT=3600):
+            self.assertEqual(requeue_stale_jobs(), 0)
+        self.assertEqual(Job.objects.get(pk=job.pk).result, {'rows': 1000})
+
+    def test_lost(self) -> None:
+        """Verify if a worker whose job was requeued as stale, and claimed by another, writes nothing to it"""
+        enqueue('test_flaky', {'succeed_at': 1})
+        lost: Job = claim_job('slow')
+        Job.objects.update(started_at=timezone.now() - datetime.timedelta(hours=2))
+        with self.settings(JOB_TIMEOUT=3600), self.assertLogs('school.jobs', 'WARNING'):
+            requeue_stale_jobs()
+        claimed: Job = claim_job('other')
+        self.assertEqual(claimed.pk, lost.pk)
+
+        with self.assertRaises(JobLost):
+            save_progress(lost, {'rows': 1000})
+        with self.assertLogs('school.jobs', 'WARNING'):
+            finish_job(lost, 'SUCCEEDED', result={'attempts': 1})
+            retry_job(lost, 'ConnectionError: database went away')
+        # a handler saving its progress stops on JobLost, without storing anything either
+        with mock.patch.dict(JOB_HANDLERS, {'test_flaky': lambda job: save_progress(job, {'rows': 1000})}), self.assertLogs('school.jobs', 'WARNING') as logs:
+            run_job(lost)
+        self.assertIn('stopped', logs.output[0])
+        job: Job = Job.objects.get(pk=lost.pk)
+        self.assertEqual((job.status, job.worker, job.result, job.error), ('RUNNING', 'other', None, 'Timed out'))
+
+    def test_unknown_kind(self) -> None:
+        with self.assertRaises(ValueError):
+            enqueue('unknown', {})
+
+
+class ImportTestCase(DatasetTestCaseMixin, MediaRootMixin, APITestCase):
+    dataset_students = 10
+    dataset_courses = 3
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        super().setUpTestData()
+        cls.admin = User.objects.create_superuser('admin')
+        cls.user = User.objects.create_user('user')
+
+    def setUp(self) -> None:
+        super().setUp()
+        caches['throttle'].clear()
+        self.addCleanup(caches['throttle'].clear)
+        self.client.force_authenticate(user=self.admin)
+
+    def run_jobs(self) -> str:
+        stderr = io.StringIO()
+        call_command('run_jobs', '--once', stderr=stderr)
+
+        return stderr.getvalue()
+
+    def test_import_students(self) -> None:
+        """Verify if an import returns 202 at once, and the job imports valid rows and reports invalid ones"""
+        cpfs: List[str] = CPF().generate_list(3)
+        upload = students_csv([
+            f'Ana Lima,123456789,{cpfs[0]},2001-02-03,11 91234-5678,ana.lima@example.com',
+            f'Bruno Souza,223456789,{cpfs[1]},1999-12-31,,',
+            'Carla Dias,323456789,12345678900,2000-01-01,,',
+            f'Davi Rocha,423456789,{self.students[0].cpf},2000-01-01,,',
+            f'Eva 2,523456789,{cpfs[2]},2000-01-01,,',
+            f'Fabio Reis,623456789,{cpfs[0]},2000-01-01,,',
+        ])
+        resp = self.client.post(reverse('Imports', kwargs={'model': 'students'}), {'file': upload}, format='multipart')
+        self.assertEqual(resp.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(resp.json()['status'], 'PENDING')
+        self.assertTrue(resp['Location'].endswith(reverse('Jobs-detail', kwargs={'pk': resp.json()['id']})))
+        self.assertEqual(Student.objects.count(), 10)
+
+        self.assertIn('1 jobs run', self.run_jobs())
+        job: Dict = self.client.get(resp['Location']).json()
+        self.assertEqual(job['status'], 'SUCCEEDED')
+        self.assertEqual({key: job['result'][key] for key in ('rows', 'created', 'invalid')}, {'rows': 6, 'created': 2, 'invalid': 4})
+        self.assertEqual([error['line'] for error in job['result']['errors']], [4, 5, 6, 7])
+        self.assertIn('cpf', job['result']['errors'][0]['errors'])
+        self.assertIn('name', job['result']['errors'][2]['errors'])
+
+        created: Student = Student.objects.get(cpf=cpfs[1])
+        self.assertEqual((created.mobile, created.email), ('', None))
+        self.assertEqual(Student.objects.get(cpf=cpfs[0]).name, 'Ana Lima')
+        # the uploaded file is removed
+        self.assertEqual(self.media_files(), 0)
+
+    def test_import_enrollments(self) -> None:
+        rows: List[str] = [f'{student.pk},{self.courses[0].pk},MORNING' for student in self.students[:4]] + [f'{self.students[0].pk},{self.courses[0].pk},AFTERNOON', '999,1,MORNING']
+        upload = SimpleUploadedFile('enrollments.csv', '\n'.join(['student,course,period', *rows]).encode(), 'text/csv')
+        resp = self.client.post(reverse('Imports', kwargs={'model': 'enrollments'}), {'file': upload}, format='multipart')
+        self.assertEqual(resp.status_code, status.HTTP_202_ACCEPTED)
+
+        self.run_jobs()
+        job: Job = Job.objects.get(pk=resp.json()['id'])
+        self.assertEqual((job.status, job.result['created'], job.result['invalid']), ('SUCCEEDED', 4, 2))
+        self.assertEqual(Enrollment.objects.count(), 4)
+        self.assertEqual(verify_enrollment_counters(), [])
+
+    def test_resume(self) -> None:
+        """Verify if a retried import resumes after its last committed batch"""
+        cpfs: List[str] = CPF().generate_list(5)
+        job: Job = imports.enqueue_import('students', students_csv([f'Aluno Novo,12345678,{cpf},2000-01-01,,' for cpf in cpfs]))
+        import_batch = imports.import_batch
+        calls: List[int] = []
+
+        def interrupted(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 2:
+                raise ConnectionError('database went away')
+            return import_batch(*args, **kwargs)
+
+        with mock.patch.object(imports, 'IMPORT_BATCH_SIZE', 2), mock.patch.object(imports, 'import_batch', interrupted), self.settings(JOB_RETRY_DELAY=0), self.assertLogs('school.jobs', 'WARNING'):
+            self.run_jobs()
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.result['rows'], job.result['created']), ('SUCCEEDED', 2, 5, 5))
+        self.assertEqual(Student.objects.filter(cpf__in=cpfs).count(), 5)
+
+    def test_invalid_file(self) -> None:
+        upload = SimpleUploadedFile('students.csv', b'nome,cpf\nAna,123\n', 'text/csv')
+        resp = self.client.post(reverse('Imports', kwargs={'model': 'students'}), {'file': upload}, format='multipart')
+        self.run_jobs()
+        job: Job = Job.objects.get(pk=resp.json()['id'])
+        self.assertEqual((job.status, job.attempts), ('FAILED', 1))
+        self.assertIn('Missing columns: name, rg, birthday', job.error)
+
+        # retried on request, and fails again
+        resp = self.client.post(reverse('Jobs-retry', kwargs={'pk': job.pk}))
+        self.assertEqual(resp.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(resp.json()['status'], 'PENDING')
+        self.run_jobs()
+        self.assertEqual(self.client.post(reverse('Jobs-retry', kwargs={'pk': job.pk})).status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(self.client.post(reverse('Jobs-retry', kwargs={'pk': job.pk})).status_code, status.HTTP_409_CONFLICT)
+
+    def test_permissions(self) -> None:
+        """Verify if only users allowed to add students import them, and users only see their own jobs"""
+        self.client.force_authenticate(user=self.user)
+        url: str = reverse('Imports', kwargs={'model': 'students'})
+        self.assertEqual(self.client.post(url, {'file': students_csv([])}, format='multipart').status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.client.post(reverse('Imports', kwargs={'model': 'courses'}), {'file': students_csv([])}, format='multipart').status_code, status.HTTP_404_NOT_FOUND)
+
+        self.user.user_permissions.add(Permission.objects.get(codename='add_student'))
+        self.client.force_authenticate(user=User.objects.get(pk=self.user.pk))
+        self.assertEqual(self.client.post(url, {}, format='multipart').status_code, status.HTTP_400_BAD_REQUEST)
+        own: int = self.client.post(url, {'file': students_csv([])}, format='multipart').json()['id']
+        other: Job = imports.enqueue_import('students', students_csv([]), user=self.admin)
+        self.assertEqual([job['id'] for job in self.client.get(reverse('Jobs-list')).json()['results']], [own])
+        self.assertEqual(self.client.get(reverse('Jobs-detail', kwargs={'pk': other.pk})).status_code, status.HTTP_404_NOT_FOUND)
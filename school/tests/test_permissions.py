@@ -0,0 +1,67 @@
+from django.contrib.auth.models import Group, Permission, User
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+
+class PermissionCacheTestCase(APITestCase):
+    def setUp(self) -> None:
+        caches['default'].clear()
+        caches['throttle'].clear()
+        self.addCleanup(caches['default'].clear)
+        self.addCleanup(caches['throttle'].clear)
+        self.list_url: str = reverse('Students-list')
+
+        self.view_student: Permission = Permission.objects.get(codename='view_student')
+        self.group: Group = Group.objects.create(name='secretary')
+        self.group.permissions.add(self.view_student)
+        self.user: User = User.objects.create_user('secretary')
+        self.user.groups.add(self.group)
+
+    def get(self) -> int:
+        # a new user object per request, as basic authentication does
+        self.client.force_authenticate(User.objects.get(pk=self.user.pk))
+
+        return self.client.get(self.list_url).status_code
+
+    def test_cached(self) -> None:
+        """Verify if permissions are read from the cache, with no permission queries"""
+        self.assertEqual(self.get(), status.HTTP_200_OK)
+
+        user: User = User.objects.get(pk=self.user.pk)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(user.has_perm('school.view_student'))
+            self.assertFalse(user.has_perm('school.delete_student'))
+        self.assertEqual(len(queries), 0)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.get(), status.HTTP_200_OK)
+        self.assertFalse(any('auth_permission' in query['sql'] or 'auth_group' in query['sql'] for query in queries))
+
+    def test_invalidation(self) -> None:
+        """Verify if changes on either side of user groups, user permissions and group permissions apply at the next request"""
+        self.assertEqual(self.get(), status.HTTP_200_OK)
+        self.user.groups.remove(self.group)
+        self.assertEqual(self.get(), status.HTTP_403_FORBIDDEN)
+
+        self.group.user_set.add(self.user)
+        self.assertEqual(self.get(), status.HTTP_200_OK)
+        self.group.permissions.clear()
+        self.assertEqual(self.get(), status.HTTP_403_FORBIDDEN)
+
+        self.user.user_permissions.add(self.view_student)
+        self.assertEqual(self.get(), status.HTTP_200_OK)
+        self.view_student.user_set.remove(self.user)
+        self.assertEqual(self.get(), status.HTTP_403_FORBIDDEN)
+
+        self.group.permissions.add(self.view_student)
+        self.assertEqual(self.get(), status.HTTP_200_OK)
+        self.group.delete()
+        self.assertEqual(self.get(), status.HTTP_403_FORBIDDEN)
+
+        self.user.is_superuser = True
+        self.user.save()
+        self.assertEqual(self.get(), status.HTTP_200_OK)
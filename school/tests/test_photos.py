@@ -0,0 +1,119 @@
+import io
+from typing import Dict, Tuple
+
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import RequestFactory, SimpleTestCase
+from django.urls import reverse
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from school.models import Student
+from school.photos import find_photo_variants, photo_storage, process_student_photo, save_photo_variants, serve_media
+from school.tests.fixtures import DatasetTestCaseMixin, MediaRootMixin
+
+
+def make_image(color: Tuple[int, int, int], size: Tuple[int, int] = (800, 600), image_format: str = 'PNG') -> bytes:
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, image_format)
+
+    return buffer.getvalue()
+
+
+class PhotoTestCase(DatasetTestCaseMixin, MediaRootMixin, APITestCase):
+    dataset_students = 4
+    dataset_user = True
+
+    def setUp(self) -> None:
+        super().setUp()
+        caches['throttle'].clear()
+        self.addCleanup(caches['throttle'].clear)
+        self.client.force_authenticate(user=self.user)
+
+    def upload(self, student: Student, data: bytes, filename: str = 'photo.png') -> Dict:
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = self.client.patch(reverse('Students-detail', kwargs={'pk': student.pk}), {'photo': SimpleUploadedFile(filename, data, 'image/png')}, format='multipart')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK, resp.content)
+
+        return resp.json()
+
+    def test_upload(self) -> None:
+        """Verify if an uploaded photo gets a content hashed name and its WebP variants, returned as urls"""
+        data: Dict = self.upload(self.students[0], make_image((200, 30, 30)))
+        self.assertRegex(data['photo'], r'^http://testserver/media/photos/[0-9a-f]{32}\.png$')
+        # made after the commit
+        self.assertEqual(data['photo_variants'], {})
+
+        resp = self.client.get(reverse('Students-detail', kwargs={'pk': self.students[0].pk}))
+        variants: Dict = resp.json()['photo_variants']
+        self.assertEqual(set(variants), {'thumbnail', 'medium'})
+        for url in variants.values():
+            self.assertRegex(url, r'^http://testserver/media/photos/variants/[0-9a-f]{32}\.webp$')
+
+        stored: Dict = Student.objects.get(pk=self.students[0].pk).photo_variants
+        with photo_storage().open(stored['thumbnail']) as f:
+            thumbnail = Image.open(f)
+            self.assertEqual((thumbnail.format, thumbnail.size), ('WEBP', (128, 128)))
+        with photo_storage().open(stored['medium']) as f:
+            self.assertEqual(Image.open(f).size, (512, 384))
+
+        # the list (fast serializers) returns them too
+        listed: Dict = {student['id']: student for student in self.client.get(reverse('Students-list')).json()['results']}
+        self.assertEqual(listed[self.students[0].pk]['photo_variants'], variants)
+
+    def test_dedup(self) -> None:
+        """Verify if the same photo is stored once, and its variants made once"""
+        first: Dict = self.upload(self.students[0], make_image((30, 200, 30)))
+        files: int = self.media_files()
+        second: Dict = self.upload(self.students[1], make_image((30, 200, 30)))
+        self.assertEqual(second['photo'], first['photo'])
+        self.assertEqual(self.media_files(), files)
+        self.assertEqual(Student.objects.get(pk=self.students[0].pk).photo_variants, Student.objects.get(pk=self.students[1].pk).photo_variants)
+
+    def test_replaced(self) -> None:
+        """Verify if a replaced photo drops its variants, and late variants of the old one are not stored"""
+        self.upload(self.students[0], make_image((30, 30, 200)))
+        old: Dict = Student.objects.get(pk=self.students[0].pk).photo_variants
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            resp = self.client.patch(reverse('Students-detail', kwargs={'pk': self.students[0].pk}), {'photo': SimpleUploadedFile('new.png', make_image((90, 90, 90)), 'image/png')}, format='multipart')
+        self.assertEqual(resp.json()['photo_variants'], {})
+        self.assertEqual(save_photo_variants([(self.students[0].pk, old['source'], old)]), 0)
+
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(Student.objects.get(pk=self.students[0].pk).photo_variants['source'], old['source'])
+
+    def test_invalid_image(self) -> None:
+        name: str = photo_storage().save('photos/broken.png', ContentFile(b'not an image'))
+        Student.objects.filter(pk=self.students[0].pk).update(photo=name)
+        with self.assertLogs('school.photos', 'WARNING'):
+            self.assertFalse(process_student_photo(self.students[0].pk, name))
+        self.assertIsNone(find_photo_variants(name))
+
+    def test_command(self) -> None:
+        """Verify if process_photos makes the missing variants in a pool of processes, and only them"""
+        names = [photo_storage().save('photos/seed.png', ContentFile(make_image(color))) for color in [(1, 2, 3), (4, 5, 6), (4, 5, 6)]]
+        for student, name in zip(self.students, names):
+            Student.objects.filter(pk=student.pk).update(photo=name)
+
+        stderr = io.StringIO()
+        call_command('process_photos', '--processes', '2', stderr=stderr)
+        self.assertIn('2 photos of 3 students to process', stderr.getvalue())
+        self.assertIn('3 students updated, 0 photos failed', stderr.getvalue())
+        for student, name in zip(self.students, names):
+            self.assertEqual(Student.objects.get(pk=student.pk).photo_variants['source'], name)
+
+        stderr = io.StringIO()
+        call_command('process_photos', stderr=stderr)
+        self.assertIn('0 photos of 0 students to process', stderr.getvalue())
+
+
+class ServeMediaTestCase(MediaRootMixin, SimpleTestCase):
+    def test_cache_control(self) -> None:
+        name: str = photo_storage().save('photos/photo.png', ContentFile(make_image((5, 5, 5))))
+        response = serve_media(RequestFactory().get(f'/media/{name}'), name, document_root=self.media_root)
+        self.assertIn('immutable', response['Cache-Control'])
@@ -0,0 +1,107 @@
+import datetime
+import io
+import unittest
+import uuid
+from decimal import Decimal
+from typing import Any, Dict, List
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from school.models import Course, Enrollment, Student
+from school.parsers import MessagePackParser, ORJSONParser
+from school.renderers import MessagePackRenderer, ORJSONRenderer, msgpack
+from seeds import build_courses, build_enrollments, build_students, persist_entities
+
+
+DATA: Dict[str, Any] = {
+    'name': 'João   Silva',
+    'birthday': datetime.date(2000, 2, 29),
+    'created': datetime.datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+    'naive': datetime.datetime(2024, 5, 1, 12, 30),
+    'time': datetime.time(8, 15),
+    'grade': Decimal('9.75'),
+    'uuid': uuid.UUID(int=1),
+    'label': gettext_lazy('Morning'),
+    'ids': (1, 2),
+    1: None,
+}
+
+
+class RendererTestCase(unittest.TestCase):
+    def test_orjson(self) -> None:
+        """Verify if ORJSONRenderer renders the same bytes as JSONRenderer"""
+        self.assertEqual(ORJSONRenderer().render(DATA), JSONRenderer().render(DATA))
+        self.assertEqual(ORJSONRenderer().render(DATA, 'application/json; indent=2'), JSONRenderer().render(DATA, 'application/json; indent=2'))
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+    def test_orjson_parser(self) -> None:
+        self.assertEqual(ORJSONParser().parse(io.BytesIO('[{"name": "João"}]'.encode())), [{'name': 'João'}])
+        self.assertEqual(ORJSONParser().parse(io.BytesIO('{"name": "João"}'.encode('latin-1')), parser_context={'encoding': 'latin-1'}), {'name': 'João'})
+        for body in (b'{"name": ', b'[NaN]'):
+            with self.assertRaises(ParseError):
+                ORJSONParser().parse(io.BytesIO(body))
+
+    @unittest.skipIf(msgpack is None, 'msgpack is not installed')
+    def test_msgpack(self) -> None:
+        """Verify if MessagePack carries the values JSON does"""
+        content: bytes = MessagePackRenderer().render(DATA)
+        parsed: Dict[Any, Any] = MessagePackParser().parse(io.BytesIO(content))
+        # MessagePack keeps integer keys, JSON turns them into strings
+        self.assertEqual({str(key): value for key, value in parsed.items()}, ORJSONParser().parse(io.BytesIO(ORJSONRenderer().render(DATA))))
+        with self.assertRaises(ParseError):
+            MessagePackParser().parse(io.BytesIO(content[:-3]))
+
+
+class ContentNegotiationTestCase(APITestCase):
+    def setUp(self) -> None:
+        caches['throttle'].clear()
+        caches['api'].clear()
+        self.addCleanup(caches['throttle'].clear)
+        self.addCleanup(caches['api'].clear)
+        self.client.force_authenticate(user=User.objects.create_superuser('admin'))
+
+        self.students: List[Student] = persist_entities(entities=build_students(total=15))
+        self.students[0].photo = 'photos/student.png'
+        self.students[0].save()
+        self.courses: List[Course] = persist_entities(entities=build_courses(total=2))
+        persist_entities(entities=build_enrollments(total=3, courses=self.courses, students=list(self.students)))
+
+    def test_json(self) -> None:
+        resp = self.client.get(reverse('Students-list') + '?version=v4')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp['Content-Type'], 'application/json')
+        self.assertEqual(resp.content, JSONRenderer().render(resp.data))
+
+    @unittest.skipIf(msgpack is None, 'msgpack is not installed')
+    def test_msgpack(self) -> None:
+        """Verify if MessagePack is selected by Accept or ?format= and holds the JSON values (dates, photo urls)"""
+        url: str = reverse('Students-list') + '?version=v4'
+        expected: Dict[str, Any] = self.client.get(url).json()
+        for resp in (self.client.get(url, HTTP_ACCEPT='application/msgpack'), self.client.get(url + '&format=msgpack')):
+            self.assertEqual(resp.status_code, status.HTTP_200_OK)
+            self.assertEqual(resp['Content-Type'], 'application/msgpack')
+            self.assertEqual(msgpack.unpackb(resp.content)['results'], expected['results'])
+
+        self.assertTrue(expected['results'][0]['photo'].startswith('http://testserver/'))
+        resp = self.client.get(reverse('Students-detail', kwargs={'pk': 0}), HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(resp.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertIn('detail', msgpack.unpackb(resp.content))
+
+    @unittest.skipIf(msgpack is None, 'msgpack is not installed')
+    def test_msgpack_bulk(self) -> None:
+        students: List[Student] = list(Student.objects.filter(enrollment__isnull=True))
+        data: List[Dict] = [{'student': student.id, 'course': self.courses[0].id, 'period': Enrollment.Period.MORNING.name} for student in students]
+        resp = self.client.post(reverse('Enrollments-bulk'), data=msgpack.packb(data), content_type='application/msgpack', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(msgpack.unpackb(resp.content)), len(students))
+        self.assertEqual(Enrollment.objects.count(), 6 + len(students))
+
+        resp = self.client.post(reverse('Enrollments-bulk'), data=b'\x93\x01', content_type='application/msgpack')
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,43 @@
+from typing import List
+
+from django.test import TestCase
+from validate_docbr import CPF
+
+from school.models import Course, Enrollment, Student
+from school.stats import verify_enrollment_counters
+from seeds import build_courses, build_enrollments, build_students, bulk_persist_entities
+
+
+class SeedsTestCase(TestCase):
+    def test_students_are_reproducible(self) -> None:
+        """Verify if a seed gives the same students"""
+        first: List[Student] = build_students(total=20, seed=42)
+        second: List[Student] = build_students(total=20, seed=42)
+        self.assertEqual([(s.name, s.cpf, s.rg, s.birthday) for s in first], [(s.name, s.cpf, s.rg, s.birthday) for s in second])
+
+    def test_students_have_unique_valid_cpfs(self) -> None:
+        students: List[Student] = build_students(total=500, seed=1)
+        cpfs: List[str] = [student.cpf for student in students]
+        self.assertEqual(len(set(cpfs)), len(cpfs))
+        self.assertTrue(all(CPF().validate(cpf) for cpf in cpfs))
+
+    def test_courses_have_unique_codes(self) -> None:
+        courses: List[Course] = build_courses(total=200, seed=1)
+        self.assertEqual(len({course.course_code for course in courses}), 200)
+        self.assertEqual(len({course.description for course in courses}), 200)
+        with self.assertRaises(ValueError):
+            build_courses(total=10000)
+
+    def test_bulk_persist(self) -> None:
+        """Verify if students are enrolled once at most, with one INSERT per batch"""
+        with self.assertNumQueries(3 * 3):  # savepoint, INSERT and release per batch of 25 rows
+            students: List[Student] = bulk_persist_entities(build_students(total=60, seed=1), batch_size=25)
+        courses: List[Course] = bulk_persist_entities(build_courses(total=3, seed=1))
+        enrollments: List[Enrollment] = bulk_persist_entities(build_enrollments(total=15, courses=courses, students=students, seed=1), batch_size=25)
+
+        self.assertEqual(Student.objects.count(), 60)
+        self.assertEqual(Enrollment.objects.count(), 45)
+        self.assertEqual(len({enrollment.student_id for enrollment in enrollments}), 45)
+        self.assertEqual(verify_enrollment_counters(), [])
+        with self.assertRaises(ValueError):
+            build_enrollments(total=10, courses=courses)
@@ -0,0 +1,88 @@
+from collections import Counter
+from io import StringIO
+from typing import Dict, List
+
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from school.models import Course, Enrollment, EnrollmentCounter, Student
+from school.stats import add_enrollment_counts, enrollment_stats, stored_enrollment_counts, verify_enrollment_counters
+from school.tests.fixtures import DatasetTestCaseMixin
+from seeds import build_courses
+
+
+class EnrollmentStatsTestCase(DatasetTestCaseMixin, APITestCase):
+    dataset_students = 30
+    dataset_courses = 3
+    dataset_enrollments = 5
+    dataset_user = True
+
+    def setUp(self) -> None:
+        caches['throttle'].clear()
+        self.addCleanup(caches['throttle'].clear)
+        self.stats_url = reverse('Enrollments-stats')
+        self.client.force_authenticate(user=self.user)
+
+    def test_signals(self) -> None:
+        """Verify if counters follow creations, updates and deletions"""
+        self.assertEqual(verify_enrollment_counters(), [])
+
+        enrollment: Enrollment = self.enrollments[0]
+        enrollment.period = Enrollment.Period.AFTERNOON.name if enrollment.period != Enrollment.Period.AFTERNOON.name else Enrollment.Period.MORNING.name
+        enrollment.course = self.courses[-1] if enrollment.course_id != self.courses[-1].id else self.courses[0]
+        enrollment.save()
+        self.assertEqual(verify_enrollment_counters(), [])
+
+        self.enrollments[1].delete()
+        self.courses[-1].delete()
+        self.assertEqual(verify_enrollment_counters(), [])
+
+    def test_bulk(self) -> None:
+        students: List[Student] = list(Student.objects.filter(enrollment__isnull=True))
+        data: List[Dict] = [{'student': student.id, 'course': self.courses[i % 3].id, 'period': Enrollment.Period.MORNING.name} for i, student in enumerate(students)]
+        resp = self.client.post(reverse('Enrollments-bulk'), data=data, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(verify_enrollment_counters(), [])
+
+    def test_get(self) -> None:
+        """Verify if stats are read from the counters, whatever the number of enrollments"""
+        with self.assertNumQueries(2):
+            stats: Dict = enrollment_stats()
+
+        resp = self.client.get(self.stats_url)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.json(), stats)
+        self.assertEqual(stats['total'], 15)
+        self.assertEqual(sum(stats['by_period'].values()), 15)
+        self.assertEqual(sum(stats['by_level'].values()), 15)
+        for course in stats['courses']:
+            self.assertEqual(course['total'], 5)
+            self.assertEqual(sum(course['periods'].values()), 5)
+            self.assertEqual(course['total'], Enrollment.objects.filter(course_id=course['id']).count())
+
+    def test_rebuild(self) -> None:
+        EnrollmentCounter.objects.update(total=0)
+        Enrollment.objects.filter(id=self.enrollments[0].id).update(period='NIGHT' if self.enrollments[0].period != 'NIGHT' else 'MORNING')
+        with self.assertRaises(CommandError):
+            call_command('enrollment_stats', stdout=StringIO(), stderr=StringIO())
+
+        call_command('enrollment_stats', rebuild=True, stdout=StringIO())
+        self.assertEqual(verify_enrollment_counters(), [])
+
+
+class EnrollmentCountersTestCase(TestCase):
+    def test_many_counters(self) -> None:
+        """Verify if counts of more counters than SQLite allows terms in one expression are added (a CSV import batch)"""
+        courses: List[Course] = Course.objects.bulk_create(build_courses(total=400, seed=1))
+        counts: Counter = Counter({(course.id, period.name): index % 7 + 1 for index, course in enumerate(courses) for period in Enrollment.Period})
+        self.assertGreater(len(counts), 1000)
+
+        add_enrollment_counts(counts)
+        self.assertEqual(stored_enrollment_counts(), counts)
+        # every counter exists now: updated only
+        add_enrollment_counts({key: -1 for key in counts})
+        self.assertEqual(stored_enrollment_counts(), Counter({key: total - 1 for key, total in counts.items() if total > 1}))
@@ -1,9 +1,13 @@
+import json
 import random
+from base64 import urlsafe_b64encode
 from typing import Dict, List
 
-from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connection
 from django.urls import reverse
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from faker import Faker
 from rest_framework import status
 from rest_framework.test import APITestCase
@@ -11,14 +15,16 @@ from validate_docbr import CPF
 
 from school.models import Student
 from school.serializer import StudentSerializer, StudentSerializerV2, StudentSerializerV3, StudentSerializerV4
-from seeds import build_students, persist_entities
+from school.tests.fixtures import DatasetTestCaseMixin
+from seeds import build_students
 
 
-class StudentTestCase(APITestCase):
+class StudentTestCase(DatasetTestCaseMixin, APITestCase):
+    dataset_students = 20
+    dataset_user = True
+
     def setUp(self) -> None:
         self.list_url = reverse('Students-list')
-        self.user = User.objects.create_superuser("admin")
-        self.students: List[Student] = persist_entities(entities=build_students(total=20))
 
     def test_list(self) -> None:
         """Verify if HTTP GET is working"""
@@ -30,9 +36,175 @@ class StudentTestCase(APITestCase):
         self.assertNotEqual(len(self.students), len(resp.json()['results']), 'Pagination is correct!')
 
 
-class StudentModelTestCase(TestCase):
+class StudentCursorPaginationTestCase(DatasetTestCaseMixin, APITestCase):
+    dataset_students = 25
+    dataset_user = True
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        super().setUpTestData()
+        # force ties on name, id must break them
+        for student in cls.students[0:6]:
+            student.name = 'Maria da Silva'
+            student.save()
+
+    def setUp(self) -> None:
+        self.list_url = reverse('Students-list')
+        self.client.force_authenticate(user=self.user)
+        # a walk over every page must not be throttled, nor leave throttle history behind
+        caches['throttle'].clear()
+        self.addCleanup(caches['throttle'].clear)
+
+    def walk(self, url: str, link: str) -> List[List[int]]:
+        pages: List[List[int]] = []
+        while url is not None:
+            with CaptureQueriesContext(connection) as queries:
+                resp = self.client.get(url)
+            self.assertEqual(resp.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', resp.json())
+            self.assertFalse(any('COUNT(' in query['sql'] for query in queries))
+            pages.append([student['id'] for student in resp.json()['results']])
+            url = resp.json()[link]
+
+        return pages
+
+    def test_list(self) -> None:
+        """Verify if walking next and previous links returns every student once, in (name, id) order"""
+        expected: List[int] = list(Student.objects.order_by('name', 'id').values_list('id', flat=True))
+        pages: List[List[int]] = self.walk(f'{self.list_url}?pagination=cursor', link='next')
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertEqual([pk for page in pages for pk in page], expected)
+
+        last_page_url: str = self.client.get(f'{self.list_url}?pagination=cursor').json()['next']
+        last_page_url = self.client.get(last_page_url).json()['next']
+        backwards: List[List[int]] = self.walk(last_page_url, link='previous')
+        self.assertEqual([pk for page in reversed(backwards) for pk in page], expected)
+
+    def test_ordering(self) -> None:
+        """Verify if ?ordering= is kept by cursor links"""
+        expected: List[int] = list(Student.objects.order_by('-birthday', 'id').values_list('id', flat=True))
+        pages: List[List[int]] = self.walk(f'{self.list_url}?pagination=cursor&ordering=-birthday', link='next')
+        self.assertEqual([pk for page in pages for pk in page], expected)
+
+    def test_page_number(self) -> None:
+        """Verify if page number is still the default"""
+        resp = self.client.get(self.list_url, {'page': 2})
+        self.assertEqual(resp.json()['count'], len(self.students))
+        self.assertEqual(len(resp.json()['results']), 10)
+
+    def test_invalid_cursor(self) -> None:
+        resp = self.client.get(self.list_url, {'cursor': 'XPTO'})
+        self.assertEqual(resp.status_code, status.HTTP_404_NOT_FOUND)
+
+        # valid envelope, position values not matching the ordering fields
+        for position in (['x', 'notanint'], ['x', None], ['x'], 'x'):
+            cursor: str = urlsafe_b64encode(json.dumps({'r': 0, 'p': position}).encode()).decode('ascii')
+            resp = self.client.get(self.list_url, {'pagination': 'cursor', 'cursor': cursor})
+            self.assertEqual(resp.status_code, status.HTTP_404_NOT_FOUND, position)
+
+
+class StudentFieldsetTestCase(DatasetTestCaseMixin, APITestCase):
+    dataset_students = 15
+    dataset_user = True
+
+    def setUp(self) -> None:
+        self.list_url = reverse('Students-list')
+        self.client.force_authenticate(user=self.user)
+
+    def test_fields(self) -> None:
+        """Verify if only the requested fields are fetched and returned"""
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(self.list_url, {'fields': 'id,name'})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        for student in resp.json()['results']:
+            self.assertEqual(list(student), ['id', 'name'])
+
+        select: str = queries.captured_queries[-1]['sql']
+        self.assertIn('"school_student"."name"', select)
+        self.assertNotIn('"school_student"."email"', select)
+        self.assertNotIn('"school_student"."photo"', select)
+
+        resp = self.client.get(reverse('Students-detail', kwargs={'pk': self.students[0].id}), {'fields': 'cpf'})
+        self.assertEqual(resp.json(), {'cpf': self.students[0].cpf})
+
+    def test_omit(self) -> None:
+        resp = self.client.get(self.list_url, {'omit': 'photo,photo_variants,email', 'pagination': 'cursor'})
+        self.assertEqual(list(resp.json()['results'][0]), ['id', 'name', 'rg', 'cpf', 'birthday', 'mobile'])
+
+        next_page = self.client.get(resp.json()['next'])
+        self.assertEqual(len(next_page.json()['results']), 5)
+
+    def test_unknown_field(self) -> None:
+        resp = self.client.get(self.list_url, {'fields': 'id,email', 'version': 'v2'})
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('email', resp.json()['fields'][0])
+
+    def test_write_ignores_fieldset(self) -> None:
+        student: Student = self.students[0]
+        resp = self.client.patch(f"{reverse('Students-detail', kwargs={'pk': student.id})}?fields=id", {'mobile': '11 99999-9999'}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.json()['mobile'], '11 99999-9999')
+        self.assertEqual(Student.objects.get(pk=student.id).email, student.email)
+
+
+class StudentSearchTestCase(DatasetTestCaseMixin, APITestCase):
+    dataset_students = 10
+    dataset_user = True
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        super().setUpTestData()
+        cls.students[0].name = 'João Conceição'
+        cls.students[0].save()
+        cls.students[1].name = 'Joana Conceição Joaquina'
+        cls.students[1].save()
+
     def setUp(self) -> None:
-        self.students: List[Student] = persist_entities(entities=build_students(total=200))
+        self.list_url = reverse('Students-list')
+        self.client.force_authenticate(user=self.user)
+        self.joao: Student = self.students[0]
+        self.joana: Student = self.students[1]
+        caches['throttle'].clear()
+        caches['api'].clear()
+        self.addCleanup(caches['throttle'].clear)
+
+    def search(self, terms: str, **params: str) -> List[int]:
+        resp = self.client.get(self.list_url, {'search': terms, **params})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+        return [student['id'] for student in resp.json()['results']]
+
+    def test_name(self) -> None:
+        """Verify if name search is accent insensitive, by word prefix and kept in sync on save/delete"""
+        self.assertEqual(self.search('joao'), [self.joao.id])
+        self.assertEqual(set(self.search('CONCEICAO')), {self.joao.id, self.joana.id})
+        self.assertEqual(set(self.search('Jo Conc')), {self.joao.id, self.joana.id})
+
+        self.joao.name = 'Pedro Álvares'
+        self.joao.save()
+        self.assertEqual(self.search('joao'), [])
+        self.assertEqual(self.search('alvares'), [self.joao.id])
+
+        self.joana.delete()
+        self.assertEqual(self.search('joana'), [])
+
+    def test_rank(self) -> None:
+        """Verify if best match comes first, unless ordering is requested"""
+        self.assertEqual(self.search('Joaquina'), [self.joana.id])
+        self.assertEqual(self.search('Conceição')[0], self.joao.id)
+        self.assertEqual(self.search('Conceição', ordering='-name'), [self.joao.id, self.joana.id])
+
+    def test_documents(self) -> None:
+        """Verify if digit only terms are an exact match on CPF or RG"""
+        student: Student = self.students[2]
+        self.assertEqual(self.search(student.cpf), [student.id])
+        self.assertEqual(self.search(CPF().mask(student.cpf)), [student.id])
+        self.assertEqual(self.search(student.rg), [student.id])
+        self.assertEqual(self.search(student.cpf[0:5]), [])
+
+
+class StudentModelTestCase(DatasetTestCaseMixin, TestCase):
+    dataset_students = 200
 
     def test_create(self) -> None:
         student: Student = build_students(total=1)[0]
@@ -54,11 +226,11 @@ class StudentModelTestCase(TestCase):
         self.assertNotEqual(student_control.name, student_from_db.name)
 
 
-class StudentSerializerTestCase(TestCase):
-    def setUp(self) -> None:
-        self.entities: List[Student] = persist_entities(entities=build_students(total=20))
+class StudentSerializerTestCase(DatasetTestCaseMixin, TestCase):
+    dataset_students = 20
 
-        self.entity: Student = random.sample(self.entities, 1)[0]
+    def setUp(self) -> None:
+        self.entity: Student = random.sample(self.students, 1)[0]
         self.serializer = StudentSerializer(instance=self.entity)
         self.serializerv2 = StudentSerializerV2(instance=self.entity)
         self.serializerv3 = StudentSerializerV3(instance=self.entity)
@@ -90,7 +262,7 @@ class StudentSerializerTestCase(TestCase):
         self.assertEqual(datav2['mobile'], self.entity.mobile)
 
         datav3: Dict = self.serializerv3.data
-        self.assertEqual(set(datav3.keys()), set(['id', 'name', 'rg', 'cpf', 'birthday', 'mobile', 'photo']))
+        self.assertEqual(set(datav3.keys()), set(['id', 'name', 'rg', 'cpf', 'birthday', 'mobile', 'photo', 'photo_variants']))
         self.assertFalse('email' in set(datav3.keys()))
         self.assertEqual(datav3['id'], self.entity.id)
         self.assertEqual(datav3['name'], self.entity.name)
@@ -99,9 +271,10 @@ class StudentSerializerTestCase(TestCase):
         self.assertEqual(datav3['birthday'], self.entity.birthday.strftime('%Y-%m-%d'))
         self.assertEqual(datav3['mobile'], self.entity.mobile)
         self.assertEqual(datav3['photo'], self.entity.photo)
+        self.assertEqual(datav3['photo_variants'], {})
 
         datav4: Dict = self.serializerv4.data
-        self.assertEqual(set(datav4.keys()), set(['id', 'name', 'rg', 'cpf', 'birthday', 'mobile', 'photo', 'email']))
+        self.assertEqual(set(datav4.keys()), set(['id', 'name', 'rg', 'cpf', 'birthday', 'mobile', 'photo', 'photo_variants', 'email']))
         self.assertEqual(datav4['id'], self.entity.id)
         self.assertEqual(datav4['name'], self.entity.name)
         self.assertEqual(datav4['rg'], self.entity.rg)
@@ -109,6 +282,7 @@ class StudentSerializerTestCase(TestCase):
         self.assertEqual(datav4['birthday'], self.entity.birthday.strftime('%Y-%m-%d'))
         self.assertEqual(datav4['mobile'], self.entity.mobile)
         self.assertEqual(datav4['photo'], self.entity.photo)
+        self.assertEqual(datav4['photo_variants'], {})
         self.assertEqual(datav4['email'], self.entity.email)
 
     def test_is_valid(self) -> None:
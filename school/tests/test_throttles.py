@@ -0,0 +1,69 @@
+from typing import List
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from school.models import Student
+from school.throttles import SlidingWindowCounter, SlidingWindowUserRateThrottle
+from seeds import build_students, persist_entities
+
+
+class SlidingWindowCounterTestCase(SimpleTestCase):
+    def setUp(self) -> None:
+        caches['throttle'].clear()
+        self.addCleanup(caches['throttle'].clear)
+        self.counter = SlidingWindowCounter()
+
+    def test_window(self) -> None:
+        """Verify if refused requests are not counted and the previous window weighs what is left of it"""
+        self.assertEqual([self.counter.hit('key', 6000 + second, 60, 3)[0] for second in range(5)], [True, True, True, False, False])
+        self.assertEqual(self.counter.hit('key', 6059, 60, 3)[1:3], (3, 0))
+
+        # 30 s into the next window: 3 * 0.5 + 1 requests
+        allowed, current, previous, weight = self.counter.hit('key', 6090, 60, 3)
+        self.assertEqual((allowed, current, previous, weight), (True, 1, 3, 0.5))
+        self.assertFalse(self.counter.hit('key', 6090, 60, 3)[0])
+        self.assertTrue(self.counter.hit('key', 6119, 60, 3)[0])
+        self.assertTrue(self.counter.hit('other', 6090, 60, 3)[0])
+
+    def test_wait(self) -> None:
+        throttle = SlidingWindowUserRateThrottle()
+        throttle.num_requests, throttle.duration = 3, 60
+        throttle.now, throttle.current, throttle.previous, throttle.weight = 6090, 1, 3, 0.5
+        # 3 * (1 - elapsed / 60) <= 1 at elapsed 40
+        self.assertAlmostEqual(throttle.wait(), 10)
+        throttle.now, throttle.current, throttle.previous, throttle.weight = 6010, 3, 0, 50 / 60
+        # next window starts in 50 s, then 3 * (1 - elapsed / 60) <= 2 at elapsed 20
+        self.assertAlmostEqual(throttle.wait(), 70)
+
+
+class RateLimitHeadersTestCase(APITestCase):
+    def setUp(self) -> None:
+        caches['throttle'].clear()
+        self.addCleanup(caches['throttle'].clear)
+        self.client.force_authenticate(user=User.objects.create_superuser('admin'))
+        self.students: List[Student] = persist_entities(entities=build_students(total=3))
+
+    def test_headers(self) -> None:
+        """Verify if responses tell the limit of the user rate (30/minute), until it is exceeded"""
+        url: str = reverse('Students-detail', kwargs={'pk': self.students[0].id})
+        # 10 s into a window, whatever the test duration
+        timer = mock.patch.object(SlidingWindowUserRateThrottle, 'timer', mock.Mock(return_value=6010.0))
+        timer.start()
+        self.addCleanup(timer.stop)
+        for request in range(30):
+            resp = self.client.get(url)
+            self.assertEqual(resp.status_code, status.HTTP_200_OK)
+            self.assertEqual(resp['X-RateLimit-Limit'], '30')
+            self.assertEqual(resp['X-RateLimit-Remaining'], str(29 - request))
+            self.assertEqual(resp['X-RateLimit-Reset'], '50')
+
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(resp['X-RateLimit-Remaining'], '0')
+        self.assertEqual(resp['Retry-After'], str(50 + 2))
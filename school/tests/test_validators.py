@@ -0,0 +1,62 @@
+import random
+from typing import List
+from unittest import mock, skipIf
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from validate_docbr import CPF
+
+from school import validators
+from school.models import Student
+from school.validators import is_valid_cpf, validate_cpf, validate_cpf_batch
+from seeds import build_students, persist_entities
+
+
+def cpf_cases() -> List[str]:
+    cpf: CPF = CPF()
+    rng: random.Random = random.Random(10)
+    cases: List[str] = [cpf.generate(mask=i % 2 == 0) for i in range(300)]
+    cases += ['', '111.111.111-11', '00000000000', '191', '00000000191', '529.982.247-25', '52998224724', '1234567890123', '529 982 247 25', '529/982/247-25', '52a98224725']
+    cases += [''.join(rng.choice('0123456789.-') for _ in range(rng.randint(0, 14))) for _ in range(700)]
+
+    return cases
+
+
+class CPFValidatorTestCase(TestCase):
+    def test_same_as_validate_docbr(self) -> None:
+        """Verify if the check-digit routine agrees with validate_docbr"""
+        for case in cpf_cases():
+            self.assertEqual(is_valid_cpf(case), CPF().validate(case), case)
+
+    def test_memo(self) -> None:
+        validate_cpf.cache_clear()
+        self.assertTrue(validate_cpf('529.982.247-25'))
+        self.assertTrue(validate_cpf('529.982.247-25'))
+        self.assertEqual(validate_cpf.cache_info().hits, 1)
+
+    def test_batch(self) -> None:
+        cases: List[str] = cpf_cases()
+        expected: List[bool] = [is_valid_cpf(case) for case in cases]
+        self.assertEqual(validate_cpf_batch(cases), expected)
+        with mock.patch.object(validators, 'numpy', None):
+            self.assertEqual(validate_cpf_batch(cases), expected)
+
+    @skipIf(validators.numpy is None, 'NumPy is not installed')
+    def test_batch_numpy(self) -> None:
+        """Verify if the vectorized path is used on large batches"""
+        cases: List[str] = cpf_cases()
+        with mock.patch.object(validators, 'is_valid_cpf', side_effect=AssertionError):
+            self.assertEqual(len(validate_cpf_batch(cases)), len(cases))
+
+
+class CPFAdminActionTestCase(TestCase):
+    def test_validate_cpfs(self) -> None:
+        self.client.force_login(User.objects.create_superuser('admin'))
+        students: List[Student] = persist_entities(entities=build_students(total=3))
+        Student.objects.filter(id=students[0].id).update(cpf='52998224724')
+
+        resp = self.client.post(reverse('admin:school_student_changelist'), {'action': 'validate_cpfs', '_selected_action': [student.id for student in students]}, follow=True)
+        messages: List[str] = [str(message) for message in resp.context['messages']]
+        self.assertEqual(len(messages), 1)
+        self.assertIn('1 of 3 students have an invalid CPF', messages[0])
@@ -0,0 +1,25 @@
+from typing import Callable
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+
+
+class QueryCountGuardMixin:
+    """Guard for list endpoints: the number of queries must not grow with the number of rows in the page."""
+
+    def assertQueriesDoNotGrow(self, url: str, grow: Callable[[], None]) -> None:
+        with CaptureQueriesContext(connection) as before:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        rows_before: int = len(resp.json()['results'])
+
+        grow()
+
+        with CaptureQueriesContext(connection) as after:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        rows_after: int = len(resp.json()['results'])
+
+        self.assertGreater(rows_after, rows_before, 'Page must have more rows after grow() to detect N+1 queries')
+        self.assertEqual(len(before), len(after), f'Queries grew with page size ({rows_before} rows: {len(before)} queries, {rows_after} rows: {len(after)} queries)')
@@ -1,5 +1,140 @@
-from rest_framework.throttling import AnonRateThrottle
+import math
+from typing import Any, Dict, Optional, Tuple
 
+from django.core.cache import caches
+from rest_framework.request import Request
+from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
 
-class CourseAnonRateThrottle(AnonRateThrottle):
+
+THROTTLE_CACHE_ALIAS: str = 'throttle'
+
+# One call, atomic in Redis: read both windows, refuse or count the request.
+# KEYS: current window, previous window. ARGV: weight of the previous window, limit, expiry in seconds.
+SLIDING_WINDOW_SCRIPT: str = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+if previous * tonumber(ARGV[1]) + current + 1 > tonumber(ARGV[2]) then
+    return {0, current, previous}
+end
+current = redis.call('INCR', KEYS[1])
+if current == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+end
+return {1, current, previous}
+"""
+
+
+class SlidingWindowCounter:
+    """
+    Sliding window counter: two integers per throttle key (requests in the current and in the previous fixed window),
+    whatever the rate. Requests in the last duration are estimated as current + previous * (part of the previous
+    window still inside the sliding window). Refused requests are not counted.
+
+    On Redis (django_redis) the check and the increment are one Lua script, so limits hold across processes and
+    servers. Other caches (locmem in tests and development) use add/incr, atomic within a process only.
+    """
+
+    def __init__(self, alias: str = THROTTLE_CACHE_ALIAS) -> None:
+        self.cache = caches[alias]
+
+    def redis_client(self) -> Any:
+        client: Any = getattr(self.cache, 'client', None)
+
+        return client.get_client(write=True) if hasattr(client, 'get_client') else None
+
+    def hit(self, key: str, now: float, duration: int, limit: int) -> Tuple[bool, int, int, float]:
+        """Count a request at now, unless it exceeds limit. Returns (allowed, current, previous, weight of previous)."""
+        window: int = int(now // duration)
+        weight: float = 1 - (now - window * duration) / duration
+        current_key: str = f'{key}:{window}'
+        previous_key: str = f'{key}:{window - 1}'
+
+        redis: Any = self.redis_client()
+        if redis is not None:
+            script: Any = redis.register_script(SLIDING_WINDOW_SCRIPT)
+            allowed, current, previous = script(keys=[self.cache.make_key(current_key), self.cache.make_key(previous_key)], args=[weight, limit, 2 * duration])
+
+            return bool(allowed), int(current), int(previous), weight
+
+        counts: Dict[str, int] = self.cache.get_many([current_key, previous_key])
+        current: int = counts.get(current_key, 0)
+        previous: int = counts.get(previous_key, 0)
+        if previous * weight + current + 1 > limit:
+            return False, current, previous, weight
+
+        self.cache.add(current_key, 0, timeout=2 * duration)
+        try:
+            current = self.cache.incr(current_key)
+        except ValueError:
+            # expired between add and incr
+            self.cache.set(current_key, 1, timeout=2 * duration)
+            current = 1
+
+        return True, current, previous, weight
+
+
+class SlidingWindowRateThrottleMixin:
+    """
+    SimpleRateThrottle with O(1) state per key in the throttle cache alias, in place of the list of request times
+    DRF keeps (it grows with the rate). Sets X-RateLimit-Limit, X-RateLimit-Remaining and X-RateLimit-Reset (seconds
+    until the current window ends) on the response, from the most restrictive throttle of the view.
+    """
+    cache_alias: str = THROTTLE_CACHE_ALIAS
+
+    def allow_request(self, request: Request, view: Any) -> bool:
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        allowed, self.current, self.previous, self.weight = SlidingWindowCounter(self.cache_alias).hit(self.key, self.now, self.duration, self.num_requests)
+        self.set_rate_limit_headers(view)
+
+        return allowed
+
+    def estimate(self) -> float:
+        return self.previous * self.weight + self.current
+
+    def window_left(self) -> float:
+        return self.duration - self.now % self.duration
+
+    def set_rate_limit_headers(self, view: Any) -> None:
+        headers: Optional[Dict[str, str]] = getattr(view, 'headers', None)
+        if headers is None:
+            return
+
+        remaining: int = max(0, math.floor(self.num_requests - self.estimate()))
+        if 'X-RateLimit-Remaining' in headers and int(headers['X-RateLimit-Remaining']) <= remaining:
+            return
+
+        headers['X-RateLimit-Limit'] = str(self.num_requests)
+        headers['X-RateLimit-Remaining'] = str(remaining)
+        headers['X-RateLimit-Reset'] = str(math.ceil(self.window_left()))
+
+    def wait(self) -> Optional[float]:
+        """Seconds until the estimate leaves room for one more request (the previous window slides out)."""
+        room: float = self.num_requests - 1
+        if self.current <= room:
+            if not self.previous:
+                return 0.0
+            # previous * (1 - elapsed / duration) <= room - current
+            elapsed: float = self.duration * (1 - (room - self.current) / self.previous)
+            return max(0.0, elapsed - (self.duration - self.weight * self.duration))
+
+        # the current window becomes the previous one
+        return self.window_left() + self.duration * max(0.0, 1 - room / self.current)
+
+
+class SlidingWindowAnonRateThrottle(SlidingWindowRateThrottleMixin, AnonRateThrottle):
+    """AnonRateThrottle ('anon' rate) with a sliding window counter."""
+
+
+class SlidingWindowUserRateThrottle(SlidingWindowRateThrottleMixin, UserRateThrottle):
+    """UserRateThrottle ('user' rate) with a sliding window counter."""
+
+
+class CourseAnonRateThrottle(SlidingWindowAnonRateThrottle):
     rate = '5000/hour'
@@ -1,16 +1,32 @@
 from django.urls import path, include
 
+from rest_framework.authtoken.views import obtain_auth_token
 from rest_framework.routers import DefaultRouter
 
-from school.views import StudentViewSet, CourseViewSet, EnrollmentViewSet, ListEnrollmentsStudents, ListCoursesEnrollments
+from school.async_views import AsyncCourseView, AsyncEnrollmentView, AsyncListCoursesEnrollments, AsyncListEnrollmentsStudents, AsyncStudentView
+from school.views import StudentViewSet, CourseViewSet, EnrollmentViewSet, EnrollmentStatsView, ImportView, JobViewSet, ListEnrollmentsStudents, ListCoursesEnrollments, MetricsView
 
 router = DefaultRouter()
 router.register('students', StudentViewSet, basename='Students')
 router.register('courses', CourseViewSet, basename='Courses')
 router.register('enrollments', EnrollmentViewSet, basename='Enrollments')
+router.register('jobs', JobViewSet, basename='Jobs')
 
 urlpatterns = [
     path('', include(router.urls)),
-    path('students/<int:pk>/enrollments/', ListEnrollmentsStudents.as_view()),
-    path('courses/<int:pk>/enrollments/', ListCoursesEnrollments.as_view())
+    path('students/<int:pk>/enrollments/', ListEnrollmentsStudents.as_view(), name='Students-enrollments'),
+    path('courses/<int:pk>/enrollments/', ListCoursesEnrollments.as_view(), name='Courses-enrollments'),
+    path('stats/enrollments/', EnrollmentStatsView.as_view(), name='Enrollments-stats'),
+    path('auth/token/', obtain_auth_token, name='Auth-token'),
+    path('metrics/', MetricsView.as_view(), name='Metrics'),
+    path('imports/<str:model>/', ImportView.as_view(), name='Imports'),
+    # async (ASGI) read only twins of the routes above
+    path('async/students/', AsyncStudentView.as_view(), name='Students-async-list'),
+    path('async/students/<int:pk>/', AsyncStudentView.as_view(detail=True), name='Students-async-detail'),
+    path('async/students/<int:pk>/enrollments/', AsyncListEnrollmentsStudents.as_view(), name='Students-async-enrollments'),
+    path('async/courses/', AsyncCourseView.as_view(), name='Courses-async-list'),
+    path('async/courses/<int:pk>/', AsyncCourseView.as_view(detail=True), name='Courses-async-detail'),
+    path('async/courses/<int:pk>/enrollments/', AsyncListCoursesEnrollments.as_view(), name='Courses-async-enrollments'),
+    path('async/enrollments/', AsyncEnrollmentView.as_view(), name='Enrollments-async-list'),
+    path('async/enrollments/<int:pk>/', AsyncEnrollmentView.as_view(detail=True), name='Enrollments-async-detail'),
 ]
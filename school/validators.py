@@ -1,14 +1,30 @@
+import logging
 from datetime import date
-
-from validate_docbr import CPF
+from functools import lru_cache
+from typing import List, Sequence, Tuple
 
 from school.models import Course
 from school.models import Enrollment
 
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
 Level = Course.Level
 Period = Enrollment.Period
 
+logger = logging.getLogger(__name__)
+
+CPF_LENGTH: int = 11
+# CPF mask characters, removed before validation
+CPF_MASK = str.maketrans('', '', '.-')
+CPF_CACHE_SIZE: int = 65536
+# Below this size the NumPy setup costs more than the pure Python loop
+CPF_NUMPY_THRESHOLD: int = 256
+
 
 def validate_allowed_period(period: str, level: str, birthday: date) -> bool:
     """No student under legal age (18 year old) can start a basic course at night. Only who are already studing can go on."""
@@ -17,13 +33,80 @@ def validate_allowed_period(period: str, level: str, birthday: date) -> bool:
         assert not (Period[period] == Period.NIGHT and Level[level] == Level.BASIC and birthday > date(date.today().year - 18, date.today().month, date.today().day))
     except Exception as e:
         is_valid = False
-        # TODO use a logger instead print
-        # print(f"A course level {Level[level]} can'to be taught at period {Period[period]} for ones under legal age (birthday: {birthday}) - Exception was: {e}")
+        logger.debug("A course level %s can't be taught at period %s for ones under legal age (birthday: %s) - Exception was: %r", level, period, birthday, e)
 
     return is_valid
 
 
+def validate_allowed_periods(enrollments: Sequence[Tuple[str, str, date]]) -> List[bool]:
+    """Batch version of validate_allowed_period. Each item is a tuple (period, level, birthday) and the legal age limit is computed only once for the whole batch."""
+    today: date = date.today()
+    try:
+        legal_age: date = date(today.year - 18, today.month, today.day)
+    except ValueError:
+        # today is february 29 and 18 years ago was not a leap year
+        legal_age = date(today.year - 18, today.month, today.day - 1)
+
+    night: str = Period.NIGHT.name
+    basic: str = Level.BASIC.name
+
+    return [not (period == night and level == basic and birthday > legal_age) for period, level, birthday in enrollments]
+
+
+def cpf_check_digits(digits: str) -> Tuple[int, int]:
+    """(first, second) check digits of a CPF from its 9 first (ASCII) digits."""
+    first: int = 0
+    second: int = 0
+    for index in range(9):
+        digit: int = ord(digits[index]) - 48
+        first += digit * (10 - index)
+        second += digit * (11 - index)
+    first = first * 10 % 11 % 10
+    second = (second + first * 2) * 10 % 11 % 10
+
+    return first, second
+
+
+def normalize_cpf(cpf_number: str) -> str:
+    """11 digits of a CPF without mask (dots and hyphen), left padded with zeros. Empty when it can not be a CPF."""
+    digits: str = cpf_number.translate(CPF_MASK)
+    if len(digits) > CPF_LENGTH or not (digits.isascii() and digits.isdigit()):
+        return ''
+
+    return digits.zfill(CPF_LENGTH)
+
+
+def is_valid_cpf(cpf_number: str) -> bool:
+    """Same rules as validate_docbr CPF().validate: mask allowed, repeated digits (like 111.111.111-11) are invalid."""
+    digits: str = normalize_cpf(cpf_number)
+    if not digits or digits.count(digits[0]) == CPF_LENGTH:
+        return False
+
+    first, second = cpf_check_digits(digits)
+
+    return ord(digits[9]) - 48 == first and ord(digits[10]) - 48 == second
+
+
+@lru_cache(maxsize=CPF_CACHE_SIZE)
 def validate_cpf(cpf_number: str) -> bool:
-    cpf: CPF = CPF()
+    """is_valid_cpf memoized: the same CPFs are validated again on every PUT."""
+    return is_valid_cpf(cpf_number)
+
+
+def validate_cpf_batch(cpf_numbers: Sequence[str]) -> List[bool]:
+    """Validate a whole column of CPFs (imports, admin), vectorized with NumPy when it is installed."""
+    if numpy is None or len(cpf_numbers) < CPF_NUMPY_THRESHOLD:
+        return [is_valid_cpf(cpf_number) for cpf_number in cpf_numbers]
+
+    normalized: List[str] = [normalize_cpf(cpf_number) for cpf_number in cpf_numbers]
+    well_formed = numpy.array([bool(digits) for digits in normalized])
+    # malformed ones are replaced by a repeated (so invalid) CPF, keeping one row per input
+    text: str = ''.join(digits or '0' * CPF_LENGTH for digits in normalized)
+    digits = numpy.frombuffer(text.encode('ascii'), dtype=numpy.uint8).reshape(-1, CPF_LENGTH).astype(numpy.int64) - 48
+
+    first = digits[:, :9] @ numpy.arange(10, 1, -1) * 10 % 11 % 10
+    second = (digits[:, :9] @ numpy.arange(11, 2, -1) + first * 2) * 10 % 11 % 10
+    repeated = (digits == digits[:, :1]).all(axis=1)
+    valid = well_formed & ~repeated & (digits[:, 9] == first) & (digits[:, 10] == second)
 
-    return cpf.validate(cpf_number)
+    return valid.tolist()
@@ -1,47 +1,68 @@
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
+import logging
+
+from django.http import Http404
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.decorators import action
 from rest_framework.generics import ListAPIView
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.status import HTTP_201_CREATED, HTTP_500_INTERNAL_SERVER_ERROR
-from rest_framework.viewsets import ModelViewSet
+from rest_framework.status import HTTP_201_CREATED, HTTP_202_ACCEPTED, HTTP_400_BAD_REQUEST, HTTP_409_CONFLICT, HTTP_500_INTERNAL_SERVER_ERROR
+from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
-from django.utils.translation import get_language
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import OrderingFilter, SearchFilter
-from rest_framework.throttling import UserRateThrottle
-
-from school.models import Student, Course, Enrollment
+from rest_framework.views import APIView
+
+from school.cache import CachedResponseMixin, ConditionalGetMixin
+from school.exports import ExportMixin
+from school.fast_serializers import FastListMixin
+from school.imports import IMPORTS, enqueue_import
+from school.instrumentation import REGISTRY
+from school.mixins import RelatedQuerysetMixin, SparseFieldsetMixin
+from school.models import Student, Course, Enrollment, EnrollmentCounter, Job
+from school.pagination import SchoolPagination
+from school.search import StudentSearchFilter
 from school.permissions import StrictDjangoModelPermissions
-from school.serializer import CourseSerializer, EnrollmentSerializer, ListEnrollmentsStudentsSerializer, ListCoursesEnrollmentsSerializer, StudentSerializer, StudentSerializerV2, StudentSerializerV3, StudentSerializerV4
-from school.throttles import CourseAnonRateThrottle
+from school.renderers import PrometheusRenderer
+from school.stats import enrollment_stats
+from school.serializer import BulkEnrollmentSerializer, CourseSerializer, EnrollmentSerializer, JobSerializer, ListEnrollmentsStudentsSerializer, ListCoursesEnrollmentsSerializer, StudentSerializer, StudentSerializerV2, StudentSerializerV3, StudentSerializerV4
+from school.throttles import CourseAnonRateThrottle, SlidingWindowUserRateThrottle
+
+
+logger = logging.getLogger(__name__)
 
 
-class StudentViewSet(ModelViewSet):
+class StudentViewSet(ConditionalGetMixin, FastListMixin, SparseFieldsetMixin, ModelViewSet):
     """
     Endpoint of student's CRUD.
 
     Description of ViewSet:
     - Ordering by name (default) and birthday
-    - Search by cpf, rg and name
+    - Search by cpf, rg (exact, only digits) and name (ranked, accent insensitive, prefix of words)
     - Allowed methods: full CRUD REST
+    - Pagination: page number (default) or keyset with ?pagination=cursor
+    - Sparse fieldsets: ?fields=id,name or ?omit=photo,email (only these columns are loaded)
+    - Conditional GET: ETag and Last-Modified, 304 Not Modified to If-None-Match or If-Modified-Since
 
     Serializer and version implementation:
     - version = [v1 | v2 | v3 | v4]. Default v4.
     - v1: Basic data
     - v2: added mobile
-    - v3: added photo
+    - v3: added photo, and photo_variants: urls of its WebP thumbnail and medium sizes, once made (school.photos)
     - v4: added email
     """
-    queryset = Student.objects.all().order_by('name')
+    queryset = Student.objects.all().order_by('name', 'id')
+    pagination_class = SchoolPagination
     permission_classes = [IsAuthenticated, StrictDjangoModelPermissions]
-    filter_backends = [DjangoFilterBackend, OrderingFilter, SearchFilter]
+    filter_backends = [DjangoFilterBackend, OrderingFilter, StudentSearchFilter]
     ordering_fields = ['name', 'birthday']
     search_fields = ['cpf', 'rg', 'name']
+    cache_models = [Student]
 
     def get_serializer_class(self):
-        # TODO implement log file
-        # print(f"version of student's api is: {self.request.version}")
+        logger.debug("version of student's api is: %s", self.request.version)
 
         if self.request.version is not None:
             if self.request.version.lower() == 'v1':
@@ -56,10 +77,12 @@ class StudentViewSet(ModelViewSet):
         return StudentSerializerV4
 
 
-class CourseViewSet(ModelViewSet):
+class CourseViewSet(ConditionalGetMixin, FastListMixin, SparseFieldsetMixin, ModelViewSet):
     """
     API without auth. Only GET is allowed.
 
+    Conditional GET: ETag and Last-Modified, 304 Not Modified to If-None-Match or If-Modified-Since.
+
     Throttle Classes:
     - CourseAnonRateThrottle: limit responses for anonymous user. Default 5/hour. Global default is 150/day.
 
@@ -73,29 +96,35 @@ class CourseViewSet(ModelViewSet):
     ordering_fields = ['level']
     search_fields = ['course_code']
     throttle_classes = [CourseAnonRateThrottle]
+    cache_models = [Course]
 
-    def get(self, request):
-        print("Idioma ativo:", get_language())
-
-        return Response({'mensagem': 'Teste de idioma'})
 
-
-class EnrollmentViewSet(ModelViewSet):
+class EnrollmentViewSet(ConditionalGetMixin, ExportMixin, CachedResponseMixin, FastListMixin, SparseFieldsetMixin, ModelViewSet):
     """
     Endpoint for enrollment's CRUD.
 
     Description of ModelViewSet:
     - Only authenticated can acess
+    - Pagination: page number (default) or keyset with ?pagination=cursor
+    - GET responses are cached per user until an enrollment, student or course changes
+    - Conditional GET: ETag and Last-Modified, 304 Not Modified to If-None-Match or If-Modified-Since
+    - Sparse fieldsets: ?fields=id,student or ?omit=period (also applied to exports)
+    - Export all (filtered) enrollments with ?export=csv or ?export=ndjson (streamed, not paginated)
+    - POST bulk/ receives a list of enrollments and creates all of them in one transaction (or none, reporting errors per item)
+    - Large loads: POST imports/enrollments/ with a CSV file, imported by a background job (see ImportView)
 
     Throttle Classes:
-    - UserRateThrottle: limit responses for authenticated users. Default is 30/minute.
+    - SlidingWindowUserRateThrottle: limit responses for authenticated users. Default is 30/minute.
     """
-    queryset = Enrollment.objects.all().order_by('course__id')
+    queryset = Enrollment.objects.all().order_by('course__id', 'id')
     serializer_class = EnrollmentSerializer
+    pagination_class = SchoolPagination
     filter_backends = [DjangoFilterBackend, OrderingFilter, SearchFilter]
     ordering_fields = ['period', 'course__course_code']
     search_fields = ['course__course_code']
-    throttle_classes = [UserRateThrottle]
+    throttle_classes = [SlidingWindowUserRateThrottle]
+    cache_models = [Enrollment, Student, Course]
+    export_fields = [('id', 'id'), ('student', 'student_id'), ('course', 'course_id'), ('period', 'period')]
 
     def create(self, request):
         serializer = self.serializer_class(data=request.data)
@@ -109,40 +138,165 @@ class EnrollmentViewSet(ModelViewSet):
 
         return response
 
-    @method_decorator(cache_page(20))
-    def dispatch(self, *args, **kwargs):
-        return super(EnrollmentViewSet, self).dispatch(*args, **kwargs)
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        serializer = BulkEnrollmentSerializer(data=request.data, allow_empty=False)
+
+        if serializer.is_valid():
+            enrollments = serializer.save()
+            response = Response(EnrollmentSerializer(enrollments, many=True).data, status=HTTP_201_CREATED)
+        else:
+            response = Response({'errors': serializer.errors}, status=HTTP_400_BAD_REQUEST)
+
+        return response
 
 
-class ListEnrollmentsStudents(ListAPIView):
+class ListEnrollmentsStudents(ConditionalGetMixin, CachedResponseMixin, FastListMixin, SparseFieldsetMixin, RelatedQuerysetMixin, ListAPIView):
     """
     Endpoint to get enrollments by student.
 
     Parameters used:
     - pk (int): identification for object. Must be an integer.
+    - pagination (str): cursor for keyset pagination. Default is page number.
+    - fields, omit (str): comma separated fields to return or to leave out.
+
+    Conditional GET: ETag and Last-Modified, 304 Not Modified to If-None-Match or If-Modified-Since.
     """
     serializer_class = ListEnrollmentsStudentsSerializer
+    pagination_class = SchoolPagination
+    select_related_fields = ['course', 'student']
+    cache_models = [Enrollment, Student, Course]
+    only_fields = ['id', 'period', 'course', 'course__description', 'student', 'student__name']
 
     def get_queryset(self):
         # code just for schema generation metadata
         if getattr(self, 'swagger_fake_view', False):
             return Enrollment.objects.none()
 
-        return Enrollment.objects.filter(student_id=self.kwargs['pk']).order_by('id')
+        return self.select_relations(Enrollment.objects.filter(student_id=self.kwargs['pk']).order_by('id'))
 
 
-class ListCoursesEnrollments(ListAPIView):
+class ListCoursesEnrollments(ConditionalGetMixin, ExportMixin, CachedResponseMixin, FastListMixin, SparseFieldsetMixin, RelatedQuerysetMixin, ListAPIView):
     """
     Endpoint to get enrollments by course.
 
     Parameters used:
     - pk (int): identification for object. Must be an integer.
+    - pagination (str): cursor for keyset pagination. Default is page number.
+    - export (str): csv or ndjson to stream the whole roster of the course.
+    - fields, omit (str): comma separated fields to return (or export) or to leave out.
+
+    Conditional GET: ETag and Last-Modified, 304 Not Modified to If-None-Match or If-Modified-Since.
     """
     serializer_class = ListCoursesEnrollmentsSerializer
+    pagination_class = SchoolPagination
+    select_related_fields = ['course', 'student']
+    cache_models = [Enrollment, Student, Course]
+    only_fields = ['id', 'course', 'course__description', 'student', 'student__name', 'student__cpf', 'student__rg', 'student__birthday', 'student__mobile', 'student__email']
+    export_fields = [
+        ('course', 'course__description'), ('student_id', 'student_id'), ('student_name', 'student__name'), ('student_cpf', 'student__cpf'), ('student_rg', 'student__rg'),
+        ('student_birthday', 'student__birthday'), ('student_mobile', 'student__mobile'), ('student_email', 'student__email'),
+    ]
 
     def get_queryset(self):
         # code just for schema generation metadata
         if getattr(self, 'swagger_fake_view', False):
             return Enrollment.objects.none()
 
-        return Enrollment.objects.filter(course_id=self.kwargs['pk']).order_by('id')
+        return self.select_relations(Enrollment.objects.filter(course_id=self.kwargs['pk']).order_by('id'))
+
+    def get_export_filename(self) -> str:
+        return f"course-{self.kwargs['pk']}-enrollments"
+
+
+class EnrollmentStatsView(APIView):
+    """
+    Endpoint of enrollment statistics for dashboards.
+
+    Enrollments in total, per period, per course level and per course (with its periods), read from the enrollment
+    counters (updated on every enrollment change): the cost grows with the number of courses, not of enrollments.
+    """
+    queryset = EnrollmentCounter.objects.all()
+
+    def get(self, request):
+        return Response(enrollment_stats())
+
+
+class MetricsView(APIView):
+    """
+    Endpoint of request metrics in Prometheus text format: requests, wall time histogram, database time, queries,
+    duplicated queries and serializer time per view and API version (see school.instrumentation).
+
+    Totals are shared by every worker process (metrics cache alias, Redis in production). Only admin users can acess.
+    """
+    permission_classes = [IsAdminUser]
+    renderer_classes = [PrometheusRenderer]
+    throttle_classes = []
+
+    def get(self, request):
+        return Response(REGISTRY.exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class ImportView(APIView):
+    """
+    Endpoint of CSV imports, run by the job workers (manage.py run_jobs): POST imports/students/ or imports/enrollments/
+    with the file (multipart field 'file') returns 202 Accepted with the job at once. GET jobs/<id>/ reports its
+    progress, then created rows and invalid ones (line and errors).
+
+    Columns (header row): students name, rg, cpf, birthday (YYYY-MM-DD), mobile and email (optional). Enrollments
+    student, course (ids) and period (MORNING, AFTERNOON, NIGHT). Only users allowed to add them can import.
+    """
+    permission_classes = [IsAuthenticated, StrictDjangoModelPermissions]
+    parser_classes = [MultiPartParser]
+
+    def get_queryset(self):
+        # code just for schema generation metadata
+        if getattr(self, 'swagger_fake_view', False):
+            return Student.objects.none()
+
+        if self.kwargs['model'] not in IMPORTS:
+            raise Http404(f"Unknown import '{self.kwargs['model']}'. Available: {', '.join(IMPORTS)}")
+
+        return IMPORTS[self.kwargs['model']][0].objects.none()
+
+    def post(self, request, model):
+        upload = request.data.get('file')
+        if not upload:
+            return Response({'file': ['A CSV file is required.']}, status=HTTP_400_BAD_REQUEST)
+
+        job: Job = enqueue_import(model, upload, user=request.user)
+        response = Response(JobSerializer(job).data, status=HTTP_202_ACCEPTED)
+        response['Location'] = request.build_absolute_uri(reverse('Jobs-detail', kwargs={'pk': job.pk}))
+
+        return response
+
+
+class JobViewSet(ReadOnlyModelViewSet):
+    """
+    Endpoint of background jobs (CSV imports): status, attempts, progress (result while running), result and error.
+
+    Users see their own jobs, staff all of them. POST jobs/<id>/retry/ queues a failed job again (an import resumes
+    after its last committed batch).
+    """
+    serializer_class = JobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        # code just for schema generation metadata
+        if getattr(self, 'swagger_fake_view', False):
+            return Job.objects.none()
+
+        queryset = Job.objects.order_by('-id')
+
+        return queryset if self.request.user.is_staff else queryset.filter(created_by=self.request.user)
+
+    @action(detail=True, methods=['post'])
+    def retry(self, request, pk=None):
+        job: Job = self.get_object()
+        queued: int = Job.objects.filter(pk=job.pk, status=Job.Status.FAILED.name).update(status=Job.Status.PENDING.name, attempts=0, error='', run_after=timezone.now(), finished_at=None)
+        if not queued:
+            return Response({'status': [f'Only failed jobs can be retried, job {job.pk} is {job.status}.']}, status=HTTP_409_CONFLICT)
+
+        job.refresh_from_db()
+
+        return Response(JobSerializer(job).data, status=HTTP_202_ACCEPTED)
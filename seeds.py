@@ -1,79 +1,144 @@
+import argparse
 import datetime
-import json
+import multiprocessing
 import os
 import random
-from typing import List, Optional
+import time
+from itertools import chain
+from typing import Iterator, List, Optional, Sequence, Set, Tuple
 
 import django
-from django.core.serializers import serialize
 from faker import Faker
-from faker.providers import DynamicProvider
-from validate_docbr import CPF
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'setup.settings')
 django.setup()
 
+from django.db import transaction  # noqa: E402
+
+from school.cache import invalidate_model  # noqa: E402
+from school.fixture_streams import FixtureWriter, open_fixture, split_path  # noqa: E402
 from school.models import Course, Enrollment, Student  # noqa: E402
+from school.stats import add_enrollment_counts, count_enrollments  # noqa: E402
+from school.validators import cpf_check_digits  # noqa: E402
 
 
-course_provider: DynamicProvider = DynamicProvider(provider_name='courses', elements=['Python Basic', 'Python Intermmediate', 'Python Advanced', 'Python Specialist', 'Python for Dummies'])
+COURSES: List[str] = ['Python Basic', 'Python Intermmediate', 'Python Advanced', 'Python Specialist', 'Python for Dummies']
+COURSE_CODE_LETTERS: str = 'ABCDEF'
+FAKER_SEED: int = 10
 GENERATED_PREFIX: str = datetime.datetime.now().strftime('%Y-%m-%dT%H-%M-%S')
+# Students built by each task. Chunks (not processes) define the random streams, so a seed gives the same data whatever the number of processes.
+CHUNK_SIZE: int = 10000
+
+
+def cpf_from_base(base: int) -> str:
+    """Valid CPF (11 digits) from its first 9 digits."""
+    digits: str = f'{base:09d}'
+    first, second = cpf_check_digits(digits)
+
+    return f'{digits}{first}{second}'
+
+
+def chunk_seed(seed: Optional[int], index: int) -> Optional[str]:
+    return None if seed is None else f'{seed}-{index}'
+
 
+def _build_students_chunk(spec: Tuple[int, Optional[int], Sequence[int]]) -> List[Student]:
+    index, seed, cpf_bases = spec
+    rng: random.Random = random.Random(chunk_seed(seed, index))
+    fake: Faker = Faker('pt_BR')
+    fake.seed_instance((FAKER_SEED if seed is None else seed) + index)
+    today: datetime.date = datetime.date.today()
 
-def build_students(total: int) -> List[Student]:
     students: List[Student] = []
-    fake = Faker('pt_BR')
-    Faker.seed(10)
-    for _ in range(total):
-        cpf: CPF = CPF()
-        name: str = fake.name()
-        rg: str = f'{random.randrange(10, 99)}{random.randrange(100, 999)}{random.randrange(100, 999)}{random.randrange(0, 9)}'
-        cpf_number: str = cpf.generate()
-        birthday: datetime.datetime = fake.date_between(start_date='-35y', end_date='today')
-        mobile: str = fake.phone_number()
-        photo: Optional[str] = None
-        email = fake.email()
-        student: Student = Student(name=name, rg=rg, cpf=cpf_number, birthday=birthday, mobile=mobile, photo=photo, email=email)
-        students.append(student)
+    for cpf_base in cpf_bases:
+        students.append(Student(
+            name=fake.name(),
+            rg=f'{rng.randrange(10, 99)}{rng.randrange(100, 999)}{rng.randrange(100, 999)}{rng.randrange(0, 9)}',
+            cpf=cpf_from_base(cpf_base),
+            birthday=today - datetime.timedelta(days=rng.randrange(0, 35 * 365)),
+            mobile=fake.phone_number(),
+            photo=None,
+            email=fake.email(),
+        ))
 
     return students
 
 
-def build_courses(total: int) -> List[Course]:
+def iter_students(total: int, seed: Optional[int] = None, processes: int = 1, exclude_cpfs: Optional[Set[str]] = None) -> Iterator[List[Student]]:
+    """
+    Build students in chunks of CHUNK_SIZE, with processes > 1 spreading Faker generation over a process pool.
+
+    CPFs are unique: their 9 first digits are sampled without replacement. exclude_cpfs (e.g. CPFs already in the database) are skipped.
+    """
+    rng: random.Random = random.Random(seed)
+    cpf_bases: List[int] = rng.sample(range(1, 10 ** 9), total)
+    specs: List[Tuple[int, Optional[int], Sequence[int]]] = [(index, seed, cpf_bases[start:start + CHUNK_SIZE]) for index, start in enumerate(range(0, total, CHUNK_SIZE))]
+
+    if processes > 1 and len(specs) > 1:
+        with multiprocessing.Pool(processes) as pool:
+            chunks: Iterator[List[Student]] = pool.imap(_build_students_chunk, specs)
+            for chunk in chunks:
+                yield [student for student in chunk if not exclude_cpfs or student.cpf not in exclude_cpfs]
+    else:
+        for spec in specs:
+            yield [student for student in _build_students_chunk(spec) if not exclude_cpfs or student.cpf not in exclude_cpfs]
+
+
+def build_students(total: int, seed: Optional[int] = None, processes: int = 1) -> List[Student]:
+    return list(chain.from_iterable(iter_students(total=total, seed=seed, processes=processes)))
+
+
+def build_courses(total: int, seed: Optional[int] = None, exclude_codes: Optional[Set[str]] = None) -> List[Course]:
+    """Course codes (like A12-3) are sampled without replacement, so they are unique. Descriptions are numbered after the 5 available ones."""
+    rng: random.Random = random.Random(seed)
+    codes: List[str] = [f'{letter}{number}-{digit}' for letter in COURSE_CODE_LETTERS for number in range(10, 99) for digit in range(0, 9)]
+    if exclude_codes:
+        codes = [code for code in codes if code not in exclude_codes]
+    if total > len(codes):
+        raise ValueError(f'Only {len(codes)} course codes are available, {total} requested')
+
+    descriptions: List[str] = rng.sample(COURSES, len(COURSES))
+    levels: List[str] = [e.name for e in Course.Level]
     courses: List[Course] = []
-    fake = Faker('pt_BR')
-    fake.add_provider(course_provider)
-    Faker.seed(10)
-    for _ in range(total):
-        course_code: str = f'{random.choice("ABCDEF")}{random.randrange(10, 99)}-{random.randrange(0, 9)}'
-        description: str = fake.unique.courses()
-        level: str = random.choice([e.name for e in Course.Level])
-        course: Course = Course(course_code=course_code, description=description, level=level)
-        courses.append(course)
+    for index, course_code in enumerate(rng.sample(codes, total)):
+        description: str = descriptions[index % len(descriptions)]
+        if index >= len(descriptions):
+            description = f'{description} {index // len(descriptions) + 1}'
+        courses.append(Course(course_code=course_code, description=description, level=rng.choice(levels)))
 
     return courses
 
 
-def build_enrollments(total: int, courses: Optional[List[Course]] = None, students: Optional[List[Student]] = None) -> List[Enrollment]:
-    enrollments: List[Enrollment] = []
+def build_enrollments(total: int, courses: Optional[List[Course]] = None, students: Optional[List[Student]] = None, seed: Optional[int] = None) -> List[Enrollment]:
+    """
+    Enroll total students per course. A student is enrolled in one course at most.
+
+    Students are shuffled once and sliced per course: sampling without replacement in O(1) per enrollment.
+    Without students, the ones not enrolled yet are loaded from the database.
+    """
+    rng: random.Random = random.Random(seed)
     if courses is None:
-        courses: List[Course] = list(Course.objects.all())
+        courses = list(Course.objects.all())
 
     if students is None:
-        students: List[Student] = list(Student.objects.all())
+        students = list(Student.objects.filter(enrollment__isnull=True).only('id'))
 
-    for course in courses:
-        sample_students: List[Student] = random.sample(students, total)
-        for student in sample_students:
-            students.remove(student)
-            period: str = random.choice([e.name for e in Enrollment.Period])
-            enrollment: Enrollment = Enrollment(course=course, student=student, period=period)
-            enrollments.append(enrollment)
+    if total * len(courses) > len(students):
+        raise ValueError(f'{len(students)} students can not fill {len(courses)} courses with {total} enrollments each')
+
+    pool: List[Student] = list(students)
+    rng.shuffle(pool)
+    periods: List[str] = [e.name for e in Enrollment.Period]
+    enrollments: List[Enrollment] = []
+    for index, course in enumerate(courses):
+        for student in pool[index * total:(index + 1) * total]:
+            enrollments.append(Enrollment(course=course, student=student, period=rng.choice(periods)))
 
     return enrollments
 
 
 def persist_entities(entities: List) -> List:
+    """Save one by one (model signals are sent for each entity). For large datasets see bulk_persist_entities."""
     persisted_entities: List = []
     for entity in entities:
         entity.save()
@@ -82,24 +147,72 @@ def persist_entities(entities: List) -> List:
     return persisted_entities
 
 
+def bulk_persist_entities(entities: List, batch_size: int = 1000) -> List:
+    """
+    INSERT batch_size rows per statement and commit each batch in its own transaction.
+
+    bulk_create does not send model signals, so enrollment counters are updated and cached responses of the model are invalidated here.
+    """
+    if not entities:
+        return entities
+
+    model = type(entities[0])
+    for start in range(0, len(entities), batch_size):
+        with transaction.atomic():
+            batch: List = model.objects.bulk_create(entities[start:start + batch_size], batch_size=batch_size)
+            if model is Enrollment:
+                add_enrollment_counts(count_enrollments(batch))
+    invalidate_model(model)
+
+    return entities
+
+
 def save_fixtures(entities: List, filename: str) -> None:
-    with open(filename, 'w') as f:
-        serialized_data = json.loads(serialize('json', entities))
-        for entity in serialized_data:
-            entity['fields']['id'] = entity['pk']
+    """Streamed as written: JSON array as school/fixtures (or NDJSON by suffix, .gz/.zst compressed). See manage.py load_fixtures."""
+    with open_fixture(filename, 'w') as f:
+        writer = FixtureWriter(f, split_path(filename)[0] or 'json')
+        writer.write(entities)
+        writer.finish()
 
-        json.dump(serialized_data, f, indent=4)
 
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Seed the database with fake students, courses and enrollments.')
+    parser.add_argument('--students', type=int, default=500)
+    parser.add_argument('--courses', type=int, default=5)
+    parser.add_argument('--enrollments', type=int, default=10, help='Enrollments per course')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Rows per INSERT and per transaction')
+    parser.add_argument('--processes', type=int, default=1, help='Processes generating fake students')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed, for reproducible runs')
+    parser.add_argument('--no-fixtures', action='store_true', help=f'Do not save generated entities in school/fixtures/generated/{GENERATED_PREFIX}_*.json')
 
-if __name__ == "__main__":
-    print('Creating students')
-    students: List[Student] = persist_entities(entities=build_students(total=500))
-    save_fixtures(entities=students, filename=f'school/fixtures/generated/{GENERATED_PREFIX}_students.json')
+    return parser.parse_args()
 
-    print('Creating courses')
-    courses: List[Course] = persist_entities(entities=build_courses(total=5))
-    save_fixtures(entities=courses, filename=f'school/fixtures/generated/{GENERATED_PREFIX}_courses.json')
 
-    print('Creating Enrollments with dependencies')
-    enrollments: List[Enrollment] = persist_entities(entities=build_enrollments(total=10))
-    save_fixtures(entities=enrollments, filename=f'school/fixtures/generated/{GENERATED_PREFIX}_enrollments.json')
+if __name__ == "__main__":
+    args: argparse.Namespace = parse_args()
+    started: float = time.perf_counter()
+
+    print(f'Creating {args.students} students')
+    existing_cpfs: Set[str] = set(Student.objects.values_list('cpf', flat=True))
+    # kept only to be written as fixtures: otherwise each chunk is dropped once persisted
+    students: List[Student] = []
+    created: int = 0
+    for chunk in iter_students(total=args.students, seed=args.seed, processes=args.processes, exclude_cpfs=existing_cpfs):
+        bulk_persist_entities(entities=chunk, batch_size=args.batch_size)
+        created += len(chunk)
+        if not args.no_fixtures:
+            students.extend(chunk)
+        print(f'  {created} students ({time.perf_counter() - started:.1f}s)')
+
+    print(f'Creating {args.courses} courses')
+    courses: List[Course] = bulk_persist_entities(entities=build_courses(total=args.courses, seed=args.seed, exclude_codes=set(Course.objects.values_list('course_code', flat=True))), batch_size=args.batch_size)
+
+    print(f'Creating {args.enrollments} enrollments per course')
+    enrollments: List[Enrollment] = bulk_persist_entities(entities=build_enrollments(total=args.enrollments, courses=courses, seed=args.seed), batch_size=args.batch_size)
+
+    if not args.no_fixtures:
+        save_fixtures(entities=students, filename=f'school/fixtures/generated/{GENERATED_PREFIX}_students.json')
+        save_fixtures(entities=courses, filename=f'school/fixtures/generated/{GENERATED_PREFIX}_courses.json')
+        save_fixtures(entities=enrollments, filename=f'school/fixtures/generated/{GENERATED_PREFIX}_enrollments.json')
+
+    print(f'Done in {time.perf_counter() - started:.1f}s')
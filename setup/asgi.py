@@ -14,3 +14,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'setup.settings')
 
 application = get_asgi_application()
+
+from school.checks import ensure_cache_backends  # noqa: E402
+
+ensure_cache_backends()
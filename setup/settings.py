@@ -11,7 +11,11 @@ https://docs.djangoproject.com/en/4.1/ref/settings/
 """
 
 import os
+import sys
+import tempfile
+from importlib.util import find_spec
 from pathlib import Path
+from typing import Optional
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -50,6 +54,7 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
 
     'rest_framework',
+    'rest_framework.authtoken',
     'django_filters',
     'drf_yasg',
 
@@ -58,6 +63,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # first: its wall time covers every other middleware
+    'school.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -118,6 +125,47 @@ DATABASES = {
 # }
 
 
+# ModelBackend with permissions shared through the cache (users are rebuilt on every basic auth request)
+AUTHENTICATION_BACKENDS = ['school.permissions.CachedModelBackend']
+
+# Seconds verified basic auth credentials are trusted without hashing the password again (0 hashes every request)
+BASIC_AUTH_CACHE_TIMEOUT = int(os.getenv('BASIC_AUTH_CACHE_TIMEOUT', 60))
+# Seconds an API token (and its user) is cached
+TOKEN_CACHE_TIMEOUT = int(os.getenv('TOKEN_CACHE_TIMEOUT', 300))
+
+# Requests slower than this (ms) are logged with their SQL by the 'school.instrumentation' logger
+SLOW_REQUEST_MS = int(os.getenv('SLOW_REQUEST_MS', 500))
+# Server-Timing header (total, db, serializer) on every response
+SERVER_TIMING = bool(int(os.getenv('SERVER_TIMING', 1)))
+
+# Threads of each web process making the WebP variants of uploaded photos (school.photos), 0 makes them during the request
+PHOTO_WORKERS = int(os.getenv('PHOTO_WORKERS', 2))
+
+# Background jobs (school.jobs, run by manage.py run_jobs): attempts of a failing job, seconds before its first retry
+# (doubled after each one), seconds a job may run before it is taken for dead, seconds between polls of idle workers
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+JOB_RETRY_DELAY = int(os.getenv('JOB_RETRY_DELAY', 30))
+JOB_TIMEOUT = int(os.getenv('JOB_TIMEOUT', 3600))
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', 1))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'verbose': {'format': '{asctime} {levelname} {name}: {message}', 'style': '{'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'verbose'},
+    },
+    'loggers': {
+        'school': {'handlers': ['console'], 'level': os.getenv('SCHOOL_LOG_LEVEL', 'INFO')},
+    },
+}
+if os.getenv('SLOW_REQUEST_LOG'):
+    # slow requests (and their SQL) also in a log file
+    LOGGING['handlers']['slow_requests'] = {'class': 'logging.handlers.WatchedFileHandler', 'filename': os.getenv('SLOW_REQUEST_LOG'), 'formatter': 'verbose'}
+    LOGGING['loggers']['school.instrumentation'] = {'handlers': ['slow_requests'], 'level': 'WARNING'}
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -164,25 +212,33 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'DEFAULT_VERSIONING_CLASS': 'rest_framework.versioning.QueryParameterVersioning',
     'DEFAULT_PERMISSION_CLASSES': ['rest_framework.permissions.IsAuthenticated', 'rest_framework.permissions.DjangoModelPermissions'],
-    'DEFAULT_AUTHENTICATION_CLASSES': ['rest_framework.authentication.BasicAuthentication'],
-    'DEFAULT_THROTTLE_CLASSES': ['rest_framework.throttling.AnonRateThrottle', 'rest_framework.throttling.UserRateThrottle'],
+    # basic auth with verified credentials cached (short TTL), and tokens from POST school/auth/token/
+    'DEFAULT_AUTHENTICATION_CLASSES': ['school.authentication.CachedBasicAuthentication', 'school.authentication.CachedTokenAuthentication'],
+    # sliding window counters in the 'throttle' cache alias (Redis in production: limits shared by every worker)
+    'DEFAULT_THROTTLE_CLASSES': ['school.throttles.SlidingWindowAnonRateThrottle', 'school.throttles.SlidingWindowUserRateThrottle'],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '150/day',
         'user': '30/minute',
     },
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
-    # 'DEFAULT_PARSER_CLASSES': [
-    #     'rest_framework.parsers.JSONParser',
-    #     # 'rest_framework_xml.parsers.XMLParser',
-    #     # 'rest_framework_yaml.parsers.YAMLParser',
-    # ],
-    # 'DEFAULT_RENDERER_CLASSES': [
-    #     'rest_framework.renderers.JSONRenderer',
-    #     # 'rest_framework.renderers.BrowsableAPIRenderer',
-    #     # 'rest_framework_xml.renderers.XMLRenderer',
-    #     # 'rest_framework_yaml.renderers.YAMLRenderer',
-    # ],
+    # orjson encodes JSON (same bytes as JSONRenderer). MessagePack is offered when msgpack is installed, through
+    # 'Accept: application/msgpack' or ?format=msgpack, and accepted as request body (bulk POSTs)
+    'DEFAULT_PARSER_CLASSES': [
+        'school.parsers.ORJSONParser',
+        *(['school.parsers.MessagePackParser'] if find_spec('msgpack') else []),
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+        # 'rest_framework_xml.parsers.XMLParser',
+        # 'rest_framework_yaml.parsers.YAMLParser',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'school.renderers.ORJSONRenderer',
+        *(['school.renderers.MessagePackRenderer'] if find_spec('msgpack') else []),
+        'rest_framework.renderers.BrowsableAPIRenderer',
+        # 'rest_framework_xml.renderers.XMLRenderer',
+        # 'rest_framework_yaml.renderers.YAMLRenderer',
+    ],
 }
 
 # CORS_ORIGIN_ALLOW_ALL = True  # alternative conf
@@ -191,18 +247,55 @@ CORS_ALLOWED_ORIGINS = [
     "http://localhost:8042"
 ]
 
-# Redis conf
-CACHE = {
-    "default": {
-        "BACKEND": "django_redis.cache.RedisCache",
-        "LOCATION": "redis://127.0.0.1:6379/1",
-        "OPTIONS": {
-            "CLIENt_CLASS": "django_redis.client.DefaultClient",
+# Cache conf
+# CACHE_BACKEND = [redis | locmem | file]. Tests always run with locmem, so no Redis is needed to run them.
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test' or 'pytest' in sys.modules
+CACHE_BACKEND = 'locmem' if TESTING else os.getenv('CACHE_BACKEND', 'locmem')
+REDIS_URL = os.getenv('REDIS_URL', 'redis://127.0.0.1:6379')
+CACHE_DIR = os.getenv('CACHE_DIR', os.path.join(tempfile.gettempdir(), 'drf-school-cache'))
+
+
+def cache_alias(db: int, timeout: Optional[int]) -> dict:
+    """Configuration of one cache alias. Each alias has its own Redis database (or directory / memory area) and timeout in seconds."""
+    if CACHE_BACKEND == 'redis':
+        return {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': f'{REDIS_URL}/{db}',
+            'TIMEOUT': timeout,
+            'OPTIONS': {
+                'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            }
+        }
+    elif CACHE_BACKEND == 'file':
+        return {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.path.join(CACHE_DIR, str(db)),
+            'TIMEOUT': timeout,
         }
+
+    return {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': f'drf-school-{db}',
+        'TIMEOUT': timeout,
     }
+
+
+CACHES = {
+    'default': cache_alias(db=1, timeout=int(os.getenv('CACHE_TIMEOUT', 300))),
+    'sessions': cache_alias(db=2, timeout=int(os.getenv('SESSION_CACHE_TIMEOUT', 1209600))),
+    'api': cache_alias(db=3, timeout=int(os.getenv('API_CACHE_TIMEOUT', 3600))),
+    'throttle': cache_alias(db=4, timeout=int(os.getenv('THROTTLE_CACHE_TIMEOUT', 86400))),
+    # request metrics of every process (school.instrumentation), never expired: Prometheus counters
+    'metrics': cache_alias(db=5, timeout=None),
 }
 
+if TESTING:
+    # tests check their logs with assertLogs: slow requests (password hashing) would print between the dots
+    LOGGING['loggers']['school']['level'] = 'ERROR'
+    # the test database is only seen by the connection of the test thread
+    PHOTO_WORKERS = 0
+
 SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
-SESSION_CACHE_ALIAS = "default"
+SESSION_CACHE_ALIAS = 'sessions'
 
 LOCALE_PATHS = (os.path.join(BASE_DIR, 'locale/'),)